@@ -2,6 +2,8 @@ import boto3
 import time
 import os
 
+from fleet_inventory import FleetInventory
+
 class AutoOpsAgent:
     def __init__(self, region="us-west-2"):
         self.region = region
@@ -15,6 +17,10 @@ class AutoOpsAgent:
         self.security_group = "sg-05b93c1804021efe6"
 
         # self.security_group = ["sg-05b93c1804021efe6"]      # must allow inbound SSH + relevant ports
+
+        # Only AutoOps-tagged instances, fetched with server-side filters and
+        # cached; call self.inventory.start() to keep it fresh in the background.
+        self.inventory = FleetInventory(self.client)
         
         
 
@@ -126,10 +132,12 @@ nohup python3 monitor.py > /home/ec2-user/healer.log 2>&1 &
 #         return instance
 
     def describe_instances(self):
-        """List all running AutoOps instances."""
-        for i in self.ec2.instances.all():
-            if i.state["Name"] == "running":
-                print(f"{i.id} | {i.public_ip_address} | {i.tags}")
+        """List all running AutoOps instances with their status checks."""
+        self.inventory.refresh_if_stale()
+        for i in self.inventory.instances():
+            if i["state"] == "running":
+                print(f"{i['instance_id']} | {i['public_ip']} | {i['service']} | "
+                      f"system {i['system_status']} / instance {i['instance_status']} | {i['tags']}")
 
     def terminate_instance(self, instance_id):
         """Stop and terminate a specific instance."""
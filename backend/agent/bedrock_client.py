@@ -0,0 +1,172 @@
+# backend/agent/bedrock_client.py
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+
+
+class BedrockUnavailable(Exception):
+    """The call was not attempted: the circuit is open or no slot freed up in time."""
+
+
+class BedrockTimeout(Exception):
+    """No reply arrived before the per-call deadline."""
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures.
+
+    While open every call is refused. After `reset_timeout` seconds one
+    trial call is let through (half-open); its success closes the circuit
+    and its failure opens it again for another `reset_timeout`.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = BREAKER_CLOSED
+        self.failures = 0
+        self.opens = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == BREAKER_CLOSED:
+                return True
+            if self.state == BREAKER_OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = BREAKER_HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = BREAKER_CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == BREAKER_HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != BREAKER_OPEN:
+                    self.opens += 1
+                self.state = BREAKER_OPEN
+                self._opened_at = time.monotonic()
+
+
+class ResilientBedrockClient:
+    """Wraps bedrock-runtime invoke_model with a deadline, a breaker and hedging.
+
+    invoke() takes the request body as a dict and returns the decoded
+    response body. It never waits longer than `deadline` seconds: at most
+    `max_concurrency` calls run at once, and a call that can't get a slot
+    in time fails the same way a slow one does. If `hedge_after` is set, a
+    call that hasn't answered by then is sent a second time and whichever
+    reply arrives first wins. Failures feed the circuit breaker, and while
+    it is open invoke() raises BedrockUnavailable straight away so the
+    caller can fall back to a local decision.
+
+    invoke_async() is the same call for asyncio code, bounded by the same
+    concurrency limit. `latency`, a metrics.Histogram, receives every
+    call's duration labelled by outcome.
+    """
+
+    def __init__(self, client, model_id, deadline=10.0, max_concurrency=4, hedge_after=None,
+                 failure_threshold=5, reset_timeout=30.0, latency=None):
+        self.client = client
+        self.model_id = model_id
+        self.deadline = deadline
+        self.max_concurrency = max_concurrency
+        self.hedge_after = hedge_after
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.latency = latency
+
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        # Room for a hedge per call, plus calls abandoned at their deadline
+        # that are still waiting on the socket.
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrency * 3, thread_name_prefix="bedrock-call")
+        self._async_slots = None  # (loop, asyncio.Semaphore)
+        self._stats_lock = threading.Lock()   # invoke() runs on several threads at once
+        self.stats = {"calls": 0, "succeeded": 0, "failed": 0, "timeouts": 0,
+                      "rejected": 0, "hedges": 0, "hedge_wins": 0, "last_latency_ms": None}
+
+    def _count(self, key, n=1):
+        with self._stats_lock:
+            self.stats[key] += n
+
+    def invoke(self, body):
+        start = time.monotonic()
+        # Slot first: allow() may turn the breaker half-open, and that trial
+        # call must then actually run and report back.
+        if not self._slots.acquire(timeout=self.deadline):
+            self._count("rejected")
+            raise BedrockUnavailable(f"no free call slot within {self.deadline}s")
+        if not self.breaker.allow():
+            self._slots.release()
+            self._count("rejected")
+            raise BedrockUnavailable(f"circuit open after {self.breaker.failures} consecutive failures")
+
+        self._count("calls")
+        try:
+            result = self._call_with_deadline(body, start + self.deadline)
+        except Exception as e:
+            self._count("failed")
+            self.breaker.record_failure()
+            self._observe(start, "timeout" if isinstance(e, BedrockTimeout) else "error")
+            raise
+        finally:
+            self._slots.release()
+
+        with self._stats_lock:
+            self.stats["succeeded"] += 1
+            self.stats["last_latency_ms"] = round((time.monotonic() - start) * 1000, 1)
+        self._observe(start, "ok")
+        self.breaker.record_success()
+        return result
+
+    def _observe(self, start, outcome):
+        if self.latency is not None:
+            self.latency.observe(time.monotonic() - start, outcome=outcome)
+
+    async def invoke_async(self, body):
+        loop = asyncio.get_running_loop()
+        if self._async_slots is None or self._async_slots[0] is not loop:
+            self._async_slots = (loop, asyncio.Semaphore(self.max_concurrency))
+        async with self._async_slots[1]:
+            return await loop.run_in_executor(None, self.invoke, body)
+
+    def _invoke_once(self, body):
+        response = self.client.invoke_model(modelId=self.model_id, body=json.dumps(body))
+        return json.loads(response['body'].read())
+
+    def _call_with_deadline(self, body, deadline):
+        first = self._pool.submit(self._invoke_once, body)
+        pending = {first}
+        if self.hedge_after is not None and self.hedge_after < self.deadline:
+            done, _ = wait(pending, timeout=self.hedge_after)
+            if not done:
+                self._count("hedges")
+                pending.add(self._pool.submit(self._invoke_once, body))
+
+        error = None
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is not first:
+                        self._count("hedge_wins")
+                    return future.result()
+                error = future.exception()
+
+        if pending:
+            self._count("timeouts")
+            raise BedrockTimeout(f"no reply within {self.deadline}s")
+        raise error
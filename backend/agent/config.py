@@ -0,0 +1,20 @@
+# backend/agent/config.py
+import json
+import os
+
+# Shared by the monitor, the healer and the sharded monitor.
+DATA_DIR = os.environ.get('AUTOOPS_DATA_DIR', os.path.join(os.path.dirname(__file__), '..', '..', 'data'))
+
+SERVERS = {
+    "payment": "http://127.0.0.1:5002/health",
+    # "inventory": "http://127.0.0.1:5002/health"
+    # "payment": "http://54.186.48.127:3000/health"
+}
+
+# A JSON file of {service_name: health_url} replaces SERVERS, e.g. for
+# benchmarks. The healer's supervisor rewrites it when a service moves port,
+# and the monitor picks up changes while running.
+TARGETS_FILE = os.environ.get('AUTOOPS_TARGETS_FILE', os.path.join(DATA_DIR, 'targets.json'))
+if os.path.exists(TARGETS_FILE):
+    with open(TARGETS_FILE, 'r') as f:
+        SERVERS = json.load(f)
@@ -0,0 +1,82 @@
+# backend/agent/decision_cache.py
+import copy
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+# Upper bounds (ms) of the latency classes used in fingerprints.
+LATENCY_BUCKETS = [(250, "fast"), (1000, "ok"), (2000, "slow")]
+
+
+def latency_class(latency_ms):
+    if latency_ms is None:
+        return "none"
+    for bound, name in LATENCY_BUCKETS:
+        if latency_ms < bound:
+            return name
+    return "stalled"
+
+
+def service_pattern(records):
+    """Run-length encoded status/latency pattern, e.g. '200/fast*12 CRASHED*3'."""
+    runs = []
+    for r in records:
+        status = r.get("status_code")
+        token = "CRASHED" if status == "CRASHED" else f"{status}/{latency_class(r.get('latency_ms'))}"
+        if runs and runs[-1][0] == token:
+            runs[-1][1] += 1
+        else:
+            runs.append([token, 1])
+    return " ".join(f"{token}*{count}" for token, count in runs)
+
+
+def fingerprint_window(window, drifting=()):
+    """Canonical fingerprint of a {service: [records]} window.
+
+    Timestamps, URLs, response bodies and exact latencies are dropped, so
+    two windows that only differ in when they happened hash the same.
+    `drifting` names services whose latency is flagged as anomalous.
+    """
+    canonical = {service: service_pattern(records) for service, records in sorted(window.items())}
+    if drifting:
+        # Same probes, but latency now off baseline: a different incident.
+        canonical = [canonical, sorted(drifting)]
+    return hashlib.sha1(json.dumps(canonical, sort_keys=True).encode()).hexdigest()
+
+
+class DecisionCache:
+    """TTL + LRU memo of parsed model decisions, keyed by window fingerprint."""
+
+    def __init__(self, max_entries=256, ttl_seconds=120):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+
+    def get(self, key):
+        """Return a copy of the cached decision, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            stored_at, decision = entry
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return copy.deepcopy(decision)
+
+    def put(self, key, decision):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), copy.deepcopy(decision))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
@@ -0,0 +1,154 @@
+# backend/agent/event_channel.py
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from multiprocessing.connection import Client, Listener
+
+RECONNECT_INTERVAL = 2.0   # seconds between publisher reconnect attempts
+WINDOWS_ADDRESS = ("127.0.0.1", 6010)
+
+
+def default_address(data_dir):
+    """Unix socket next to the data files, or a localhost port where AF_UNIX is missing."""
+    if os.environ.get("AUTOOPS_EVENT_ADDRESS"):
+        host, _, port = os.environ["AUTOOPS_EVENT_ADDRESS"].rpartition(":")
+        return (host, int(port)) if host else os.environ["AUTOOPS_EVENT_ADDRESS"]
+    if hasattr(os, "fork"):
+        return os.path.join(data_dir, "healer.sock")
+    return WINDOWS_ADDRESS
+
+
+class EventPublisher(threading.Thread):
+    """Pushes probe records to the healer without ever blocking the probe loop.
+
+    publish() only enqueues. This thread sends whatever has queued up as one
+    JSON message, and if the healer isn't listening the events are dropped
+    (the probe store still has them) and the connection is retried later.
+    """
+
+    def __init__(self, address, max_queue=10000):
+        super().__init__(name="event-publisher", daemon=True)
+        self.address = address
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.stats = {"published": 0, "dropped": 0, "connects": 0}
+        self._conn = None
+        self._next_connect = 0.0
+
+    def publish(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.stats["dropped"] += 1
+
+    def run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < 1000:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            conn = self._connection()
+            if conn is None:
+                self.stats["dropped"] += len(batch)
+                continue
+            try:
+                conn.send_bytes(json.dumps(batch).encode())
+                self.stats["published"] += len(batch)
+            except (OSError, EOFError):
+                self.stats["dropped"] += len(batch)
+                self._conn = None
+
+    def _connection(self):
+        if self._conn is None and time.monotonic() >= self._next_connect:
+            try:
+                self._conn = Client(self.address)
+                self.stats["connects"] += 1
+            except OSError:
+                self._next_connect = time.monotonic() + RECONNECT_INTERVAL
+        return self._conn
+
+
+class EventSubscriber:
+    """Healer side of the channel: keeps recent probes per service and flags failures.
+
+    Any non-200 probe marks its service as triggered; wait() returns the set
+    of triggered services as soon as there is one, so the healer can act on
+    a healthy→CRASHED transition within milliseconds instead of at its next
+    sweep.
+    """
+
+    def __init__(self, address, window=15):
+        self.address = address
+        self.window = window
+        self.stats = {"events": 0, "transitions": 0, "recoveries": 0, "publishers": 0}
+        self._recent = {}
+        self._last_status = {}
+        self._triggered = set()
+        self._cond = threading.Condition()
+        self._listener = None
+
+    def start(self):
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.unlink(self.address)  # stale socket from a previous run
+        self._listener = Listener(self.address)
+        threading.Thread(target=self._accept, name="event-accept", daemon=True).start()
+        return self
+
+    def recent(self, service):
+        with self._cond:
+            return list(self._recent.get(service, ()))
+
+    def wait(self, timeout):
+        """Block until some service is triggered or timeout passes; returns the set."""
+        with self._cond:
+            if not self._triggered:
+                self._cond.wait(timeout)
+            triggered, self._triggered = self._triggered, set()
+            return triggered
+
+    def _accept(self):
+        while True:
+            try:
+                conn = self._listener.accept()
+            except OSError:
+                return
+            self.stats["publishers"] += 1
+            threading.Thread(target=self._read, args=(conn,), name="event-reader", daemon=True).start()
+
+    def _read(self, conn):
+        with conn:
+            while True:
+                try:
+                    events = json.loads(conn.recv_bytes())
+                except (EOFError, OSError, ValueError):
+                    return
+                self._ingest(events)
+
+    def _ingest(self, events):
+        with self._cond:
+            for event in events:
+                service = event.get("service")
+                status = event.get("status_code")
+                previous = self._last_status.get(service)
+                self._last_status[service] = status
+
+                recent = self._recent.get(service)
+                if recent is None:
+                    recent = self._recent[service] = deque(maxlen=self.window)
+                recent.append(event)
+                self.stats["events"] += 1
+
+                if status != 200:
+                    if previous == 200:
+                        self.stats["transitions"] += 1
+                    self._triggered.add(service)
+                elif previous is not None and previous != 200:
+                    self.stats["recoveries"] += 1
+
+            if self._triggered:
+                self._cond.notify_all()
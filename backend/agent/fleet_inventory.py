@@ -0,0 +1,220 @@
+# backend/agent/fleet_inventory.py
+import datetime
+import json
+import os
+import threading
+import time
+
+from botocore.exceptions import ClientError
+
+SERVICE_TAG = "AutoOpsService"   # set on every instance launched for a service
+STATUS_BATCH = 100               # describe_instance_status accepts up to 100 ids
+DEFAULT_STATES = ["pending", "running"]
+# Instances launched with only a "<service>-instance" Name tag (autoops_agent.py)
+# are matched by a second query; EC2 ANDs the filters within one request.
+DEFAULT_TAG_FILTERS = [{SERVICE_TAG: []}, {"Name": ["*-instance"]}]
+
+
+def _service_of(tags):
+    if tags.get(SERVICE_TAG):
+        return tags[SERVICE_TAG]
+    name = tags.get("Name", "")
+    return name[:-len("-instance")] if name.endswith("-instance") else None
+
+
+def _worst_status(entries):
+    worst = None
+    for i in entries:
+        for status in (i["system_status"], i["instance_status"]):
+            if status and status not in ("ok", "not-applicable"):
+                return status
+            worst = worst or status
+    return worst
+
+
+def read_snapshot(path):
+    """Inventory snapshot written by another process's FleetInventory, or None."""
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def snapshot_targets(snapshot, port=3000, path="/health"):
+    """{service: health_url} for the running instances in a snapshot.
+
+    A service with several instances gets one target per instance,
+    named "<service>@<instance id>".
+    """
+    running = [i for i in (snapshot or {}).get("instances", [])
+               if i.get("service") and i.get("state") == "running" and i.get("public_ip")]
+    counts = {}
+    for i in running:
+        counts[i["service"]] = counts.get(i["service"], 0) + 1
+    return {
+        (i["service"] if counts[i["service"]] == 1 else f"{i['service']}@{i['instance_id']}"):
+            f"http://{i['public_ip']}:{port}{path}"
+        for i in running
+    }
+
+
+class FleetInventory:
+    """Cached view of the AutoOps EC2 fleet and its instance status checks.
+
+    refresh() asks EC2 only for instances in `states` that carry the AutoOps
+    tags (server-side Filters, paginated; one query per entry of
+    `tag_filters`, merged by instance id), then fetches their status checks
+    in batches of STATUS_BATCH ids. An instance terminated in between is
+    dropped rather than failing the refresh. The result is kept for `ttl` seconds;
+    queries only ever read that cache, so the monitor and healer can call
+    them on their hot paths. start() refreshes from a background thread,
+    and with `snapshot_path` set each refresh is also written to disk for
+    other processes (see read_snapshot).
+    """
+
+    def __init__(self, client, ttl=60.0, states=None, tag_filters=None, snapshot_path=None):
+        self.client = client
+        self.ttl = ttl
+        self.states = states or DEFAULT_STATES
+        # {tag key: [values]}, or a list of them to match any one; an empty
+        # list matches any value of that key.
+        tag_filters = tag_filters if tag_filters is not None else DEFAULT_TAG_FILTERS
+        self.tag_filters = [tag_filters] if isinstance(tag_filters, dict) else list(tag_filters)
+        self.snapshot_path = snapshot_path
+
+        self._instances = {}
+        self._by_service = {}
+        self._host_status = {}
+        self._refreshed_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = threading.Lock()
+        self._stopped = threading.Event()
+        self.stats = {"refreshes": 0, "describe_pages": 0, "status_calls": 0, "errors": 0}
+
+    # ------------------------------------------------------------
+    # Fetching
+    # ------------------------------------------------------------
+    def _filters(self, tag_filters):
+        filters = [{"Name": "instance-state-name", "Values": self.states}]
+        for key, values in tag_filters.items():
+            if values:
+                filters.append({"Name": f"tag:{key}", "Values": list(values)})
+            else:
+                filters.append({"Name": "tag-key", "Values": [key]})
+        return filters
+
+    def refresh(self):
+        """Fetch the fleet from EC2 and replace the cache."""
+        instances = {}
+        pages = (page for tag_filters in self.tag_filters
+                 for page in self.client.get_paginator("describe_instances").paginate(Filters=self._filters(tag_filters)))
+        for page in pages:
+            self.stats["describe_pages"] += 1
+            for reservation in page["Reservations"]:
+                for i in reservation["Instances"]:
+                    tags = {t["Key"]: t["Value"] for t in i.get("Tags", [])}
+                    instances[i["InstanceId"]] = {
+                        "instance_id": i["InstanceId"],
+                        "service": _service_of(tags),
+                        "state": i["State"]["Name"],
+                        "public_ip": i.get("PublicIpAddress"),
+                        "private_ip": i.get("PrivateIpAddress"),
+                        "launch_time": i["LaunchTime"].isoformat() if i.get("LaunchTime") else None,
+                        "tags": tags,
+                        "instance_status": None,
+                        "system_status": None,
+                    }
+
+        ids = list(instances)
+        for start in range(0, len(ids), STATUS_BATCH):
+            for status in self._statuses(ids[start:start + STATUS_BATCH], instances):
+                entry = instances.get(status["InstanceId"])
+                if entry is not None:
+                    entry["instance_status"] = status.get("InstanceStatus", {}).get("Status")
+                    entry["system_status"] = status.get("SystemStatus", {}).get("Status")
+
+        by_service = {}
+        for entry in instances.values():
+            if entry["service"]:
+                by_service.setdefault(entry["service"], []).append(entry)
+
+        host_status = {service: _worst_status(entries) for service, entries in by_service.items()}
+
+        with self._lock:
+            self._instances = instances
+            self._by_service = by_service
+            self._host_status = host_status
+            self._refreshed_at = time.monotonic()
+        self.stats["refreshes"] += 1
+        self._write_snapshot(instances)
+        return instances
+
+    def _statuses(self, ids, instances):
+        self.stats["status_calls"] += 1
+        try:
+            return self.client.describe_instance_status(InstanceIds=ids, IncludeAllInstances=True)["InstanceStatuses"]
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") != "InvalidInstanceID.NotFound":
+                raise
+        if len(ids) == 1:
+            # Terminated since describe_instances listed it.
+            instances.pop(ids[0], None)
+            return []
+        return [status for i in ids for status in self._statuses([i], instances)]
+
+    def _write_snapshot(self, instances):
+        if not self.snapshot_path:
+            return
+        tmp = self.snapshot_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"refreshed_at": datetime.datetime.now().isoformat(),
+                       "instances": list(instances.values())}, f)
+        os.replace(tmp, self.snapshot_path)
+
+    def refresh_if_stale(self):
+        """Refresh if the cache is older than `ttl`; never raises."""
+        # Only the first caller to find the cache stale refreshes; the rest
+        # keep answering from the old data meanwhile.
+        fresh = self._refreshed_at and time.monotonic() - self._refreshed_at < self.ttl
+        if fresh or not self._refreshing.acquire(blocking=False):
+            return
+        try:
+            self.refresh()
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"⚠️ Fleet inventory refresh failed: {e}")
+        finally:
+            self._refreshing.release()
+
+    def start(self):
+        """Keep the cache fresh from a background thread."""
+        def loop():
+            while not self._stopped.is_set():
+                self.refresh_if_stale()
+                self._stopped.wait(max(1.0, self.ttl / 2))
+        threading.Thread(target=loop, name="fleet-inventory", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+
+    # ------------------------------------------------------------
+    # Queries (cache only)
+    # ------------------------------------------------------------
+    def instances(self):
+        with self._lock:
+            return list(self._instances.values())
+
+    def age(self):
+        """Seconds since the last successful refresh."""
+        return time.monotonic() - self._refreshed_at if self._refreshed_at else None
+
+    def by_service(self):
+        with self._lock:
+            return {service: list(entries) for service, entries in self._by_service.items()}
+
+    def host_status(self, service):
+        """Worst status check across a service's instances ('ok', 'impaired', ...), or None."""
+        with self._lock:
+            return self._host_status.get(service)
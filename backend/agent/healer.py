@@ -1,119 +1,524 @@
 # backend/agent/healer.py
 import boto3
+from botocore.config import Config
 import json
 import time
-import subprocess
 import os
 import datetime 
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+import metrics
+from bedrock_client import (BREAKER_CLOSED, BREAKER_HALF_OPEN, BREAKER_OPEN, BedrockUnavailable,
+                            ResilientBedrockClient)
+from decision_cache import DecisionCache, fingerprint_window
+from event_channel import EventSubscriber, default_address
+from fleet_inventory import FleetInventory
+from history import ProbeHistory
+from latency_stats import StatsReader
+from merged_store import open_probe_store
+from prompt_builder import TokenMeter, build_digest, chunk_window, estimate_tokens, parse_batch_reply
+from remediation import NotSupervised, RemediationExecutor
+from retention import ArchiveView, compress_segments, expire_segments, rotate_log
+from rules import RuleEngine
+from supervisor import ServiceSupervisor
+from tail_reader import TailReader
+from tracing import TRACE_FILE, TRACE_SEGMENT_DIR, Tracer, new_incident_id
 
 
 BEDROCK_REGION = 'us-east-1' 
 BEDROCK_MODEL_ID = 'anthropic.claude-3-sonnet-20240229-v1:0'
+# Point at a local stand-in (e.g. backend/benchmarks/stub_bedrock.py) instead of AWS.
+BEDROCK_ENDPOINT_URL = os.environ.get('BEDROCK_ENDPOINT_URL')
 
 BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+SIMULATED_SERVERS_DIR = os.path.join(BACKEND_DIR, "..", "simulated_servers")
 
-DATA_DIR = os.path.join(BACKEND_DIR, '..', '..', 'data')
+DATA_DIR = config.DATA_DIR
 LOG_FILE = os.path.join(DATA_DIR, 'logs.json')
 ACTION_LOG_FILE = os.path.join(DATA_DIR, 'agent_actions.json')
+INVENTORY_FILE = os.path.join(DATA_DIR, 'inventory.json')
+ACTION_SEGMENT_DIR = os.path.join(DATA_DIR, 'action_segments')
+TRACE_PATH = os.path.join(DATA_DIR, TRACE_FILE)   # incident spans, shared with the monitor
+TRACE_SEGMENT_PATH = os.path.join(DATA_DIR, TRACE_SEGMENT_DIR)
 
 LOGS_TO_ANALYZE = 15 
+ANALYSIS_WINDOW_SECONDS = 300   # how far back to look for each service
+DECISION_CACHE_TTL = 120        # seconds a model decision stays reusable
+DECISION_CACHE_SIZE = 256
+HEALER_INTERVAL = float(os.environ.get('AUTOOPS_HEALER_INTERVAL', 15))
+EVENT_CHANNEL_ADDRESS = default_address(DATA_DIR)
+EVENT_COOLDOWN = 5.0            # min seconds between event-driven decisions per service
+REMEDIATION_WORKERS = 8         # restarts that can run in parallel
+RESTART_ATTEMPTS = 3            # tries per remediation before giving up
+MODEL_BATCH_SIZE = 50           # services per Bedrock call
+MODEL_PARALLEL_CALLS = 4        # chunks of a large fleet analysed concurrently
+BEDROCK_DEADLINE = 20.0         # seconds a model call may take, queueing included
+BEDROCK_HEDGE_AFTER = None      # seconds before re-sending a slow call; None disables hedging
+BREAKER_FAILURES = 3            # consecutive failures that open the circuit
+BREAKER_RESET = 60.0            # seconds before a trial call is let through again
+EC2_INVENTORY = os.environ.get('AUTOOPS_EC2_INVENTORY') == '1'   # track EC2 hosts and their status checks
+EC2_REGION = 'us-west-2'
+INVENTORY_TTL = 60.0            # seconds between EC2 inventory refreshes
+WARM_STANDBYS = True            # keep an idle replacement process per supervised service
+SERVICE_READY_TIMEOUT = 15.0    # seconds a restarted service has to pass /health
+ACTION_LOG_MAX_AGE = 86400      # rotate agent_actions.json once its first record is this old
+ACTION_LOG_MAX_BYTES = 16 * 1024 * 1024
+ACTION_ARCHIVE_DAYS = 30        # closed action segments are gzipped after a day, deleted after this
+RETENTION_INTERVAL = 600.0      # seconds between action log retention passes
+# Prometheus text format on http://127.0.0.1:<port>/metrics; 0 turns it off.
+METRICS_PORT = int(os.environ.get('AUTOOPS_HEALER_METRICS_PORT', 9100))
+
+# Services the healer can restart locally: script + args ("{port}" is
+# substituted) and the ports it alternates between. A JSON file of the same
+# shape can replace this.
+SUPERVISED_SERVICES = {
+    "payment": {"command": [os.path.join(SIMULATED_SERVERS_DIR, "app_payment.py"), "{port}"], "ports": [5001, 5011]},
+    "inventory": {"command": [os.path.join(SIMULATED_SERVERS_DIR, "app_inventory.py"), "{port}"], "ports": [5002, 5012]},
+}
+if os.environ.get('AUTOOPS_SERVICES_FILE'):
+    with open(os.environ['AUTOOPS_SERVICES_FILE'], 'r') as f:
+        SUPERVISED_SERVICES = json.load(f)
 
 if not os.path.exists(DATA_DIR):
     os.makedirs(DATA_DIR)
 
+registry = metrics.Registry()
+bedrock_latency = registry.histogram("bedrock_call_seconds", "Bedrock invocations, queueing included.",
+                                     buckets=metrics.SLOW_BUCKETS, labels=("outcome",))
+remediation_duration = registry.histogram("remediation_seconds", "Restart plus health confirmation, per remediation.",
+                                          buckets=metrics.SLOW_BUCKETS, labels=("result",))
+decision_duration = registry.histogram("decision_cycle_seconds", "From wake-up to recorded decisions.",
+                                       buckets=metrics.FAST_BUCKETS + metrics.SLOW_BUCKETS[3:], labels=("trigger",))
+sweep_lag = registry.histogram("sweep_lag_seconds", "How late each periodic sweep started.",
+                               buckets=metrics.FAST_BUCKETS + metrics.SLOW_BUCKETS[3:])
+
 try:
-    bedrock_runtime = boto3.client(service_name='bedrock-runtime', region_name=BEDROCK_REGION)
+    bedrock_runtime = boto3.client(service_name='bedrock-runtime', region_name=BEDROCK_REGION,
+                                   endpoint_url=BEDROCK_ENDPOINT_URL,
+                                   # The wrapper below owns deadlines and retries.
+                                   config=Config(connect_timeout=5, read_timeout=BEDROCK_DEADLINE,
+                                                 retries={"max_attempts": 1}))
+    bedrock = ResilientBedrockClient(
+        bedrock_runtime,
+        BEDROCK_MODEL_ID,
+        deadline=BEDROCK_DEADLINE,
+        max_concurrency=MODEL_PARALLEL_CALLS,
+        hedge_after=BEDROCK_HEDGE_AFTER,
+        failure_threshold=BREAKER_FAILURES,
+        reset_timeout=BREAKER_RESET,
+        latency=bedrock_latency,
+    )
     print(f"Successfully connected to Bedrock in {BEDROCK_REGION}.")
 except Exception as e:
     print(f"Error connecting to Bedrock: {e}")
     print("Please ensure your AWS credentials and region are configured correctly.")
     exit()
 
-def analyze_logs_with_ai(log_data):
-    """Sends logs to Bedrock and asks for an action."""
+def analyze_logs_with_ai(window, anomalies=None):
+    """Sends a per-service digest of the window to Bedrock and asks for one action per service."""
     system_prompt = """
-    You are an expert AI Site Reliability Engineer named "AutoOps". Your task is to analyze server logs and decide on a corrective action.
-    - A service is considered 'unhealthy' if it has a status_code other than 200 multiple times.
-    - A service is 'crashed' if its status_code is 'CRASHED'.
-    - If a service is crashed or consistently unhealthy, you must issue a 'restart' command.
-    - ONLY respond with a single, valid JSON object and nothing else.
-
-    If a restart is needed, respond in this format:
-    {"action": "restart", "service_name": "payment", "reason": "Service is unresponsive with multiple CRASHED logs."}
+    You are an expert AI Site Reliability Engineer named "AutoOps". Your task is to analyze a health-check digest and decide on a corrective action.
+    Each line summarises one service's recent probes:
+      <service> probes=<n> status=<code>:<count>,... streak=<trailing failures> p50=<ms> p95=<ms> max=<ms> last_error=<class> [host=<EC2 status check>] [baseline=<ms> z=<score>]
+    - A host status other than 'ok' points at an OS-level failure on the service's instance.
+    - baseline/z appear when latency has drifted well above the service's normal (baseline) latency; a degrading service may need a restart before it starts failing.
+    - A service is considered 'unhealthy' if it has a status other than 200 multiple times.
+    - A service is 'crashed' if it has CRASHED probes, especially a non-zero streak.
+    - If a service is crashed or consistently unhealthy, you must issue a 'restart' command for it.
+    - Several services may need a restart at once; decide on every service in the digest.
+    - ONLY respond with a single, valid JSON object and nothing else, in this format:
 
-    If everything is okay, respond with:
-    {"action": "none", "reason": "All services are operating normally."}
+    {"actions": [
+      {"service_name": "payment", "action": "restart", "reason": "Service is unresponsive with multiple CRASHED logs."},
+      {"service_name": "inventory", "action": "none", "reason": "Occasional 500s but recovering."}
+    ]}
     """
-    
-    messages = [{"role": "user", "content": f"Analyze these recent logs and provide a corrective action JSON:\n\n{log_data}"}]
+
+    hosts = {service: inventory.host_status(service) for service in window} if inventory else None
+    digest = build_digest(window, hosts, anomalies)
+    messages = [{"role": "user", "content": f"Analyze this health-check digest and provide the corrective actions JSON:\n\n{digest}"}]
+    estimated_tokens = estimate_tokens(system_prompt) + estimate_tokens(messages[0]["content"])
+
+    bedrock_start = time.time()
+    try:
+        result_body = bedrock.invoke({
+            "anthropic_version": "bedrock-2023-05-31",
+            "max_tokens": 128 + 64 * len(window),
+            "system": system_prompt,
+            "messages": messages
+        })
+    except BedrockUnavailable as e:
+        trace_window(window, "bedrock", bedrock_start, outcome="unavailable")
+        # Circuit open: no call was made, so don't wait on the model at all.
+        print(f"Bedrock unavailable ({e}); deciding locally.")
+        return rules.fallback(window)
+    except Exception as e:
+        trace_window(window, "bedrock", bedrock_start, outcome="error")
+        token_meter.record(estimated_tokens, None, services=len(window))
+        print(f"Error communicating with Bedrock: {e}; deciding locally.")
+        return rules.fallback(window)
+
+    trace_window(window, "bedrock", bedrock_start, outcome="ok", services=len(window))
+    usage = result_body.get('usage') or {}
+    token_meter.record(estimated_tokens, usage, services=len(window))
+    print(f"Bedrock call for {len(window)} service(s) in {bedrock.stats['last_latency_ms']} ms: "
+          f"{usage.get('input_tokens', '?')} input tokens (~{estimated_tokens} estimated), "
+          f"{usage.get('output_tokens', '?')} output tokens")
 
     try:
-        response = bedrock_runtime.invoke_model(
-            modelId=BEDROCK_MODEL_ID,
-            body=json.dumps({
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 512,
-                "system": system_prompt,
-                "messages": messages
-            })
-        )
-        result_body = json.loads(response['body'].read())
         ai_response_text = result_body['content'][0]['text']
-        return json.loads(ai_response_text)
-    
+        return parse_batch_reply(ai_response_text, window)
     except Exception as e:
-        print(f"Error communicating with Bedrock or parsing its response: {e}")
-        return {"action": "none", "reason": f"AI analysis failed: {e}"}
+        print(f"Error parsing Bedrock's response: {e}; deciding locally.")
+        return rules.fallback(window)
+
+def collect_recent_probes(history):
+    """Recent probes grouped per service, so every service gets its own context."""
+    history.refresh()
+    window = {}
+    for service in history.services():
+        records = history.recent(service, ANALYSIS_WINDOW_SECONDS, limit=LOGS_TO_ANALYZE)
+        if records:
+            window[service] = records
+    return window
+
+def group_log_lines(lines):
+    """Group raw JSON log lines into a {service: [records]} window."""
+    window = {}
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        window.setdefault(record.get("service"), []).append(record)
+    return window
 
-def restart_service(service_name):
-    """Kills and restarts a simulated service based on its name."""
+tracer = Tracer(TRACE_PATH)
+open_incidents = {}   # service -> incident ID the healer is acting on
+
+supervisor = ServiceSupervisor(
+    SUPERVISED_SERVICES,
+    registry_path=config.TARGETS_FILE,
+    registry_seed=config.SERVERS,
+    ready_timeout=SERVICE_READY_TIMEOUT,
+    warm_standby=WARM_STANDBYS,
+    tracer=tracer,
+)
+
+def restart_service(service_name, incident=None):
+    """Replaces a supervised service's process; True once its /health passes."""
     print(f"--- ACTION: RESTARTING {service_name.upper()} SERVICE ---")
-    
-    if service_name == "payment":
-        script_path = os.path.join(BACKEND_DIR, "..", "simulated_servers", "app_payment.py")
-    elif service_name == "inventory":
-        script_path = os.path.join(BACKEND_DIR, "..", "simulated_servers", "app_inventory.py")
-    else:
-        print(f"Warning: Unknown service name '{service_name}' provided for restart.")
-        return
+
+    if not supervisor.supervises(service_name):
+        raise NotSupervised(f"no local process is supervised for '{service_name}'")
 
     try:
-        venv_python_path = os.path.join(BACKEND_DIR, "..", "venv", "Scripts", "python.exe")
-        python_executable = venv_python_path if os.path.exists(venv_python_path) else "py"
-        subprocess.Popen([python_executable, script_path])
-        print(f"Restart command issued for {script_path}")
-        
+        if supervisor.restart(service_name, incident=incident):
+            print(f"{service_name} restarted and healthy at {supervisor.url(service_name)}")
+            return True
+        print(f"{service_name} did not come back healthy.")
+        return False
+
     except Exception as e:
         print(f"Failed to restart service: {e}")
+        return False
 
-print("Starting AI Healer agent...")
-while True:
-    try:
-        with open(LOG_FILE, "r") as f:
-            recent_logs = "".join(f.readlines()[-LOGS_TO_ANALYZE:])
-        
-        if not recent_logs:
-            print(f"Log file '{LOG_FILE}' is empty. Waiting for data...")
-            time.sleep(10)
+action_log_lock = threading.Lock()
+health_urls = {}   # service -> last probed /health URL
+
+def record_action(entry):
+    """Append one record to the agent action log (safe from worker threads)."""
+    with action_log_lock:
+        with open(ACTION_LOG_FILE, 'a') as f:
+            f.write(json.dumps(entry) + '\n')
+
+def action_log_retention():
+    """Rotate, compress and expire the action log; closed segments stay readable via retention.read_segments."""
+    with action_log_lock:
+        rotate_log(ACTION_LOG_FILE, ACTION_SEGMENT_DIR, "agent_actions",
+                   max_age=ACTION_LOG_MAX_AGE, max_bytes=ACTION_LOG_MAX_BYTES)
+    # Nothing keeps the trace file open, so it rotates the same way.
+    rotate_log(TRACE_PATH, TRACE_SEGMENT_PATH, "traces",
+               max_age=ACTION_LOG_MAX_AGE, max_bytes=ACTION_LOG_MAX_BYTES)
+    for segment_dir in (ACTION_SEGMENT_DIR, TRACE_SEGMENT_PATH):
+        if os.path.isdir(segment_dir):
+            compress_segments(segment_dir, time.time() - ACTION_LOG_MAX_AGE)
+            expire_segments(segment_dir, time.time() - ACTION_ARCHIVE_DAYS * 86400)
+
+def track_incidents(window, seen_at, trigger):
+    """Follow the monitor's incident IDs for the services in a window.
+
+    A failing service keeps the ID its probes carry, whether they arrived
+    as events or were read back from the probe store. Only probes without
+    one (e.g. rows written before the store kept incident IDs) get an ID
+    minted by the healer.
+    The first time the healer acts on an incident it marks a "seen" span.
+    """
+    for service, records in window.items():
+        if not records:
             continue
+        if records[-1].get("status_code") == 200:
+            open_incidents.pop(service, None)
+            continue
+        incident = records[-1].get("incident_id") or open_incidents.get(service)
+        minted = incident is None
+        if minted:
+            incident = new_incident_id()
+        if open_incidents.get(service) != incident:
+            open_incidents[service] = incident
+            tracer.emit(incident, "seen", seen_at, seen_at, service=service, trigger=trigger,
+                        **({"minted_by": "healer"} if minted else {}))
+
+def trace_window(window, stage, start, **attrs):
+    """One span per open incident among the window's services (e.g. a shared Bedrock call)."""
+    end = time.time()
+    for service in window:
+        tracer.emit(open_incidents.get(service), stage, start, end, service=service, **attrs)
+
+def on_remediation_complete(service, ok, attempts, duration_s, incident=None):
+    """Record whether a restart brought the service's /health back to 200.
+
+    ok is None when the service is not supervised by this healer: nothing
+    was restarted, so the result is neither healthy nor unhealthy.
+    """
+    if ok is None:
+        outcome, result = "not supervised here", "unsupervised"
+        reason = "No restart attempted; this healer does not supervise the service."
+    else:
+        outcome, result = ("healthy again", "healthy") if ok else ("still unhealthy", "unhealthy")
+        reason = f"Service {outcome} after {attempts} restart attempt(s)."
+    remediation_duration.observe(duration_s, result=result)
+    print(f"Remediation of {service} finished: {outcome} after {attempts} attempt(s)")
+    record_action({
+        "action": "restart_result",
+        "source": "remediation",
+        "service_name": service,
+        "incident_id": incident,
+        "ok": ok,
+        "attempts": attempts,
+        "duration_ms": round(duration_s * 1000),
+        "reason": reason,
+        "timestamp": datetime.datetime.now().isoformat(),
+    })
+
+rules = RuleEngine()
+latency_stats = StatsReader(DATA_DIR)   # the monitor's quantile sketches and baselines
+inventory = None   # FleetInventory when EC2_INVENTORY is on
+token_meter = TokenMeter()
+decision_cache = DecisionCache(max_entries=DECISION_CACHE_SIZE, ttl_seconds=DECISION_CACHE_TTL)
+remediation = RemediationExecutor(
+    restart_service,
+    # After a failover the service answers on its new port before the
+    # monitor's next probe reports it.
+    health_url_for=lambda service: supervisor.url(service) or health_urls.get(service),
+    on_complete=on_remediation_complete,
+    max_workers=REMEDIATION_WORKERS,
+    max_attempts=RESTART_ATTEMPTS,
+    tracer=tracer,
+)
+
+model_pool = ThreadPoolExecutor(max_workers=MODEL_PARALLEL_CALLS, thread_name_prefix="bedrock")
+
+def export_metrics():
+    """Callbacks over the components' stats dicts, read at scrape time."""
+    registry.stats("bedrock_calls", "Bedrock client events.", bedrock.stats,
+                   counters=("calls", "succeeded", "failed", "timeouts", "rejected", "hedges", "hedge_wins"))
+    registry.callback("bedrock_breaker_state", "1 for the circuit breaker's current state.",
+                      lambda: {state: int(bedrock.breaker.state == state)
+                               for state in (BREAKER_CLOSED, BREAKER_OPEN, BREAKER_HALF_OPEN)},
+                      labels=("state",))
+    registry.stats("bedrock_tokens", "Bedrock usage.", token_meter.stats,
+                   counters=("input_tokens", "output_tokens", "estimated_input_tokens", "services"))
+    registry.stats("rules", "Rule engine outcomes.", rules.stats,
+                   counters=("windows", "settled_healthy", "settled_restart", "escalated",
+                             "model_calls_avoided", "fallbacks"))
+    registry.stats("decision_cache", "Decision cache lookups.", decision_cache.stats,
+                   counters=("hits", "misses", "expired", "evictions"))
+    registry.stats("remediation", "Remediation executor events.", remediation.stats,
+                   counters=("submitted", "skipped_in_flight", "succeeded", "failed", "retries"))
+    registry.callback("remediations_in_flight", "Services currently being remediated.",
+                      lambda: len(remediation.in_flight()))
+    registry.stats("supervisor", "Service supervisor events.", supervisor.stats,
+                   counters=("restarts", "failovers", "cold_starts", "kills", "failed"))
+
+def latency_anomalies(window):
+    """{service: stats} for services in the window whose latency has drifted above baseline."""
+    stats = latency_stats.get()
+    return stats.anomalies(window) if stats else {}
+
+def decide_chunk(window, anomalies=None):
+    """Decision cache first, then one Bedrock call for the whole chunk."""
+    anomalies = {s: a for s, a in (anomalies or {}).items() if s in window}
+    # Same incident state as a recent cycle: reuse that answer.
+    fingerprint = fingerprint_window(window, anomalies)
+    actions = decision_cache.get(fingerprint)
+    if actions is not None:
+        for action in actions:
+            action["source"] = "cache"
+        print(f"Decision cache hit ({decision_cache.stats['hits']} hits, {decision_cache.stats['misses']} misses)")
+        return actions
+
+    actions = analyze_logs_with_ai(window, anomalies)
+    for action in actions:
+        action.setdefault("source", "bedrock")
+    # Local fallbacks stand in for an unreachable model; don't remember them.
+    if all(action.get("source") == "bedrock" for action in actions):
+        decision_cache.put(fingerprint, actions)
+    return actions
+
+def decide(window):
+    """Rule engine first, then batched model calls for whatever it can't settle.
 
-        ai_decision = analyze_logs_with_ai(recent_logs)
-        decision_timestamp = datetime.datetime.now().isoformat()
+    Returns a list of per-service action dicts.
+    """
+    # Healthy services and clear crashes are settled locally; only
+    # ambiguous ones (including all-200 services whose latency has
+    # drifted) are worth a Bedrock round-trip.
+    anomalies = latency_anomalies(window)
+    actions, ambiguous = rules.triage(window, anomalies)
+    if not ambiguous:
+        print(f"Rule engine settled window locally ({rules.stats['model_calls_avoided']} model calls avoided so far)")
+        return actions
+
+    # One call per chunk of services, not per failing service.
+    chunks = chunk_window(ambiguous, MODEL_BATCH_SIZE)
+    for chunk_actions in model_pool.map(decide_chunk, chunks, [anomalies] * len(chunks)):
+        actions.extend(chunk_actions)
+    return actions
+
+def handle_window(window, cycle_start, trigger):
+    """Decide on a window, record the decisions and hand any restarts to the executor."""
+    for service, records in window.items():
+        if records and records[-1].get("url"):
+            health_urls[service] = records[-1]["url"]
+    cycle_wall_start = time.time() - (time.perf_counter() - cycle_start)
+    track_incidents(window, cycle_wall_start, trigger)
+
+    actions = decide(window)
+    decision_timestamp = datetime.datetime.now().isoformat()
+    cycle_s = time.perf_counter() - cycle_start
+    cycle_ms = round(cycle_s * 1000, 1)
+    decision_duration.observe(cycle_s, trigger=trigger)
+
+    # Every restart is its own record; services left alone
+    # collapse into a single "none" entry so the action log stays readable.
+    recorded = [a for a in actions if a.get("action") == "restart"]
+    if not recorded:
+        no_action = [a for a in actions if a.get("action") == "none"]
+        reason = (no_action[0]["reason"] if len(no_action) == 1
+                  else "All services are operating normally." if not no_action
+                  else f"No action needed for {len(no_action)} services.")
+        recorded = [{"action": "none", "reason": reason,
+                     "source": no_action[0]["source"] if no_action else "rules"}]
+
+    for ai_decision in recorded:
         ai_decision['timestamp'] = decision_timestamp
-        
+        ai_decision['trigger'] = trigger
+        ai_decision['cycle_ms'] = cycle_ms
+        incident = open_incidents.get(ai_decision.get("service_name"))
+        if incident:
+            ai_decision['incident_id'] = incident
+            tracer.emit(incident, "decide", cycle_wall_start, service=ai_decision["service_name"],
+                        action=ai_decision.get("action"), source=ai_decision.get("source"), trigger=trigger)
         print(f"AI Decision: {ai_decision.get('reason')}")
+        record_action(ai_decision)
 
-        with open(ACTION_LOG_FILE, 'a') as f:
-            f.write(json.dumps(ai_decision) + '\n')
-        
         if ai_decision.get("action") == "restart":
             service_to_restart = ai_decision.get("service_name")
             if service_to_restart:
-                restart_service(service_to_restart)
+                remediation.submit(service_to_restart, ai_decision.get("incident_id"))
 
-    except FileNotFoundError:
-        print(f"Log file '{LOG_FILE}' not found. Waiting for monitor to create it...")
-    except Exception as e:
-        print(f"An error occurred in the main loop: {e}")
+def main():
+    global inventory
+    print("Starting AI Healer agent...")
+    supervisor.start_standbys()
+    export_metrics()
+    metrics.serve(registry, METRICS_PORT)
+    if EC2_INVENTORY:
+        # Refreshed in the background; decisions only read the cache. The
+        # snapshot file lets the monitor probe the instances it finds.
+        inventory = FleetInventory(boto3.client("ec2", region_name=EC2_REGION), ttl=INVENTORY_TTL,
+                                   snapshot_path=INVENTORY_FILE).start()
+    try:
+        events = EventSubscriber(EVENT_CHANNEL_ADDRESS, window=LOGS_TO_ANALYZE).start()
+        print(f"Listening for monitor events on {EVENT_CHANNEL_ADDRESS}")
+    except OSError as e:
+        print(f"Event channel unavailable ({e}); falling back to periodic sweeps only.")
+        events = None
+
+    log_tail = TailReader(LOG_FILE, backfill=LOGS_TO_ANALYZE)
+    log_window = deque(maxlen=LOGS_TO_ANALYZE)
+    history = None
+    last_event_cycle = {}
+    next_sweep = time.monotonic()
+    next_retention = time.monotonic()
+
+    while True:
+        timeout = max(0.0, next_sweep - time.monotonic())
+        if events is not None:
+            triggered = events.wait(timeout)
+        else:
+            time.sleep(timeout)
+            triggered = set()
+        cycle_start = time.perf_counter()
+
+        try:
+            # Pushed failures: decide on just those services, right now,
+            # from the probes the monitor sent us.
+            now = time.monotonic()
+            triggered = {s for s in triggered if now - last_event_cycle.get(s, 0) >= EVENT_COOLDOWN}
+            triggered -= remediation.in_flight()
+            # All of them go into one batched decision; the restarts it
+            # returns run in parallel on the remediation executor.
+            if triggered:
+                for service in triggered:
+                    last_event_cycle[service] = now
+                handle_window({service: events.recent(service) for service in triggered}, cycle_start, "event")
+
+            if time.monotonic() < next_sweep:
+                continue
+            sweep_lag.observe(time.monotonic() - next_sweep)
+            next_sweep = time.monotonic() + HEALER_INTERVAL
+
+            if time.monotonic() >= next_retention:
+                next_retention = time.monotonic() + RETENTION_INTERVAL
+                action_log_retention()
 
-    time.sleep(15)
\ No newline at end of file
+            # Periodic sweep over the whole fleet catches slow trends.
+            if history is None:
+                # Single-monitor store or the merged view over sharded workers.
+                store = open_probe_store(DATA_DIR)
+                if store is not None:
+                    history = ProbeHistory(store, archives=ArchiveView(DATA_DIR))
+
+            if history is not None:
+                window = collect_recent_probes(history)
+            else:
+                # Monitors still writing the legacy JSON-lines log.
+                log_window.extend(log_tail.read_new())
+                window = group_log_lines(log_window)
+
+            if not window:
+                print(f"Log file '{LOG_FILE}' is empty. Waiting for data...")
+                next_sweep = time.monotonic() + 10
+                continue
+
+            handle_window(window, cycle_start, "sweep")
+
+        except FileNotFoundError:
+            print(f"Log file '{LOG_FILE}' not found. Waiting for monitor to create it...")
+        except Exception as e:
+            print(f"An error occurred in the main loop: {e}")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("AI Healer agent stopped.")
+    finally:
+        # Restarted services keep running; only the idle standbys go.
+        supervisor.stop_standbys()
@@ -0,0 +1,295 @@
+# backend/agent/history.py
+import array
+import bisect
+import datetime
+import math
+import threading
+import time
+
+from probe_store import ProbeStore, STATUS_CRASHED, STATUS_MISSING, LATENCY_MISSING, INCIDENT_NONE, from_epoch_us
+
+BUCKET_SECONDS = 60
+EXACT_PERCENTILE_LIMIT = 4096   # windows with more samples use bucket histograms
+LATENCY_GAMMA = 1.05            # histogram bins are ~5% wide
+
+
+def _to_epoch_us(t):
+    if isinstance(t, datetime.datetime):
+        t = t.timestamp()
+    return int(t * 1_000_000)
+
+
+def _latency_bin(latency_ms):
+    if latency_ms <= 1:
+        return 0
+    return int(math.log(latency_ms) / math.log(LATENCY_GAMMA)) + 1
+
+
+def _bin_value(b):
+    if b == 0:
+        return 1.0
+    return LATENCY_GAMMA ** (b - 0.5)
+
+
+class _Series:
+    """Per-service columns plus a time-bucket index over them."""
+
+    def __init__(self):
+        self.ts = array.array("q")
+        self.status = array.array("h")
+        self.latency = array.array("I")
+        self.body = array.array("I")
+        self.url = array.array("H")
+        self.incident = array.array("I")
+        # prefix sums: errors[i] = non-200 probes among the first i rows
+        self.errors = array.array("q", [0])
+        self.crashed = array.array("q", [0])
+        # time buckets: key = ts // bucket, first = row where it begins
+        self.bucket_keys = array.array("q")
+        self.bucket_first = array.array("q")
+        self.bucket_hist = []
+
+    def add(self, ts, status, latency, body, url, incident, bucket_us):
+        row = len(self.ts)
+        self.ts.append(ts)
+        self.status.append(status)
+        self.latency.append(latency)
+        self.body.append(body)
+        self.url.append(url)
+        self.incident.append(incident)
+        self.errors.append(self.errors[-1] + (status != 200))
+        self.crashed.append(self.crashed[-1] + (status == STATUS_CRASHED))
+
+        key = ts // bucket_us
+        if not self.bucket_keys or key > self.bucket_keys[-1]:
+            self.bucket_keys.append(key)
+            self.bucket_first.append(row)
+            self.bucket_hist.append({})
+        if latency != LATENCY_MISSING:
+            hist = self.bucket_hist[-1]
+            b = _latency_bin(latency)
+            hist[b] = hist.get(b, 0) + 1
+
+    def trim(self, before_us, bucket_us):
+        """Drop whole time buckets that end at or before `before_us`."""
+        b = bisect.bisect_left(self.bucket_keys, before_us // bucket_us)
+        if b == 0:
+            return 0
+        cut = self.bucket_first[b] if b < len(self.bucket_keys) else len(self.ts)
+        for name in ("ts", "status", "latency", "body", "url", "incident"):
+            setattr(self, name, getattr(self, name)[cut:])
+        for name in ("errors", "crashed"):
+            prefix = getattr(self, name)
+            setattr(self, name, array.array("q", (v - prefix[cut] for v in prefix[cut:])))
+        self.bucket_keys = self.bucket_keys[b:]
+        self.bucket_first = array.array("q", (first - cut for first in self.bucket_first[b:]))
+        self.bucket_hist = self.bucket_hist[b:]
+        return cut
+
+    def span(self, since_us, until_us):
+        """Row range [i, j) with since <= ts < until."""
+        i = bisect.bisect_left(self.ts, since_us)
+        j = bisect.bisect_left(self.ts, until_us, lo=i)
+        return i, j
+
+
+class ProbeHistory:
+    """Time-indexed query layer over a ProbeStore (or a MergedProbeStore).
+
+    Rows are split per service as they are loaded, with prefix sums for
+    error counts and per-minute latency histograms, so the usual questions
+    ("payment over the last 5 minutes", "error rate since T", "p95 over a
+    window") cost a binary search plus the size of the answer rather than a
+    scan of the whole history. Call refresh() to pick up new rows.
+
+    Once retention compacts the store, rows it dropped are dropped here too.
+    With `rollups` (a retention.RollupView), error_rates() covers the
+    compacted range from the per-minute rollups, so uptime over days or
+    weeks costs little more than over minutes. With `archives` (a
+    retention.ArchiveView), window() and recent() return the compacted
+    range's raw probes from the gzip archives too. Latency percentiles only
+    cover the store's hot window.
+    """
+
+    def __init__(self, store, bucket_seconds=BUCKET_SECONDS, rollups=None, archives=None):
+        self.store = store
+        self.bucket_us = bucket_seconds * 1_000_000
+        self.rollups = rollups
+        self.archives = archives
+        self._series = {}
+        self._cursor = None
+        self._compacted_before = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open(cls, store_dir, **kwargs):
+        return cls(ProbeStore(store_dir), **kwargs)
+
+    def refresh(self):
+        """Index rows appended to the store since the last call."""
+        with self._lock:
+            cols, self._cursor = self.store.columns_since(self._cursor)
+            names = self.store.services
+
+            ts, svc, status, latency, body, url, incident = (
+                cols["timestamp"], cols["service"], cols["status"],
+                cols["latency"], cols["body"], cols["url"], cols["incident"])
+            for i in range(len(ts)):
+                name = names[svc[i]]
+                series = self._series.get(name)
+                if series is None:
+                    series = self._series[name] = _Series()
+                series.add(ts[i], status[i], latency[i], body[i], url[i], incident[i], self.bucket_us)
+
+            compacted_before = self.store.compacted_before()
+            if compacted_before > self._compacted_before:
+                self._compacted_before = compacted_before
+                for series in self._series.values():
+                    series.trim(compacted_before, self.bucket_us)
+
+            return len(ts)
+
+    def services(self):
+        return sorted(self._series)
+
+    # ------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------
+    def _bounds(self, since, until):
+        until_us = _to_epoch_us(time.time() if until is None else until) + 1
+        return _to_epoch_us(since), until_us
+
+    def _selected(self, services):
+        names = self._series if services is None else services
+        return [(name, self._series[name]) for name in names if name in self._series]
+
+    def window(self, service, since, until=None, limit=None):
+        """Probe records for one service with since <= timestamp <= until."""
+        since_us, until_us = self._bounds(since, until)
+        series = self._series.get(service)
+        records = []
+        if series is not None:
+            i, j = series.span(since_us, until_us)
+            if limit is not None:
+                i = max(i, j - limit)
+            records = [self._record(service, series, k) for k in range(i, j)]
+
+        # Rows retention dropped from the store are read back from archive/.
+        if (self.archives is not None and since_us < self._compacted_before
+                and (limit is None or len(records) < limit)):
+            cold = self.archives.records(service, since_us / 1_000_000,
+                                         min(until_us, self._compacted_before) / 1_000_000)
+            if limit is not None:
+                cold = cold[max(0, len(cold) - (limit - len(records))):]
+            records = cold + records
+        return records
+
+    def recent(self, service, seconds=300, limit=None, now=None):
+        """Probe records for one service over the last `seconds`."""
+        now = time.time() if now is None else now
+        return self.window(service, now - seconds, now, limit=limit)
+
+    def last(self, service, n=1):
+        series = self._series.get(service)
+        if series is None:
+            return []
+        total = len(series.ts)
+        return [self._record(service, series, k) for k in range(max(0, total - n), total)]
+
+    def error_rates(self, since, until=None, services=None):
+        """{service: {"probes", "errors", "crashed", "error_rate"}} over a window."""
+        since_us, until_us = self._bounds(since, until)
+        counts = {}
+        for name, series in self._selected(services):
+            i, j = series.span(since_us, until_us)
+            counts[name] = [j - i, series.errors[j] - series.errors[i], series.crashed[j] - series.crashed[i]]
+
+        # The part of the window that retention has compacted comes from rollups.
+        if self.rollups is not None and since_us < self._compacted_before:
+            cold = self.rollups.error_counts(since_us / 1_000_000, min(until_us, self._compacted_before) / 1_000_000,
+                                             None if services is None else set(services))
+            for name, (probes, errors, crashed) in cold.items():
+                c = counts.setdefault(name, [0, 0, 0])
+                c[0] += probes
+                c[1] += errors
+                c[2] += crashed
+
+        return {
+            name: {"probes": probes, "errors": errors, "crashed": crashed,
+                   "error_rate": errors / probes if probes else None}
+            for name, (probes, errors, crashed) in counts.items()
+        }
+
+    def latency_percentile(self, pct, since, until=None, services=None):
+        """{service: latency_ms} at the given percentile (e.g. 95) over a window.
+
+        Small windows are exact; large ones merge per-minute histograms and
+        are accurate to within ~5%. Only the store's hot window is covered.
+        """
+        since_us, until_us = self._bounds(since, until)
+        out = {}
+        for name, series in self._selected(services):
+            i, j = series.span(since_us, until_us)
+            if j - i <= EXACT_PERCENTILE_LIMIT:
+                out[name] = self._exact_percentile(series, i, j, pct)
+            else:
+                out[name] = self._histogram_percentile(series, i, j, pct)
+        return out
+
+    @staticmethod
+    def _exact_percentile(series, i, j, pct):
+        values = sorted(v for v in series.latency[i:j] if v != LATENCY_MISSING)
+        if not values:
+            return None
+        rank = max(1, math.ceil(pct / 100 * len(values)))
+        return values[rank - 1]
+
+    @staticmethod
+    def _histogram_percentile(series, i, j, pct):
+        hist = {}
+
+        def add_rows(lo, hi):
+            for v in series.latency[lo:hi]:
+                if v != LATENCY_MISSING:
+                    b = _latency_bin(v)
+                    hist[b] = hist.get(b, 0) + 1
+
+        # Whole buckets inside [i, j) come from their histograms; the
+        # partial buckets at either edge are binned row by row.
+        first = series.bucket_first
+        b_lo = bisect.bisect_left(first, i)
+        b_hi = bisect.bisect_right(first, j) - 1
+        if b_lo >= b_hi:
+            add_rows(i, j)
+        else:
+            add_rows(i, first[b_lo])
+            for b in range(b_lo, b_hi):
+                for k, count in series.bucket_hist[b].items():
+                    hist[k] = hist.get(k, 0) + count
+            add_rows(first[b_hi], j)
+
+        total = sum(hist.values())
+        if not total:
+            return None
+        rank = max(1, math.ceil(pct / 100 * total))
+        seen = 0
+        for b in sorted(hist):
+            seen += hist[b]
+            if seen >= rank:
+                return round(_bin_value(b))
+        return None
+
+    def _record(self, service, series, k):
+        status = series.status[k]
+        latency = series.latency[k]
+        record = {
+            "service": service,
+            "url": self.store.tables["url"][series.url[k]],
+            "timestamp": from_epoch_us(series.ts[k]),
+            "status_code": "CRASHED" if status == STATUS_CRASHED else (None if status == STATUS_MISSING else status),
+            "response_body": self.store.tables["body"][series.body[k]],
+            "latency_ms": None if latency == LATENCY_MISSING else latency,
+        }
+        if series.incident[k] != INCIDENT_NONE:
+            record["incident_id"] = self.store.tables["incident"][series.incident[k]]
+        return record
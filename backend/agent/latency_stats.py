@@ -0,0 +1,310 @@
+# backend/agent/latency_stats.py
+import glob
+import math
+import os
+import threading
+import time
+
+import numpy as np
+
+from merged_store import SHARDS_DIRNAME
+
+SKETCH_GAMMA = 1.05          # sketch bins are ~5% wide
+SKETCH_MAX_MS = 120_000      # anything slower lands in the last bin
+NUM_BINS = int(math.ceil(math.log(SKETCH_MAX_MS) / math.log(SKETCH_GAMMA))) + 2
+SKETCH_WINDOW = 300.0        # seconds per sketch window; quantiles cover the last one or two
+
+LATENCY_FLOOR_MS = 10.0      # EWMAs track log(latency + floor), so 2 ms -> 4 ms is not news
+RECENT_ALPHA = 0.3           # fast EWMA: "how slow is it right now"
+BASELINE_ALPHA = 0.02        # slow EWMA: "how slow is it normally"
+MIN_STD = 0.1                # floor on the baseline's log-space standard deviation
+ANOMALY_Z = 3.0              # recent vs baseline z-score that flags a service
+MIN_SAMPLES = 20             # probes before a baseline is trusted
+ANOMALY_DAMPING = 0.1        # baseline learning rate multiplier for outlying probes
+
+STATS_FILE = "latency_stats.npz"
+
+# Per-service float64 state, one array each.
+_FLOAT_FIELDS = ("baseline_mean", "baseline_var", "recent", "error_rate", "z")
+
+
+def latency_bins(latency_ms):
+    """Sketch bin index for each latency (ms); bin 0 holds everything <= 1 ms."""
+    latency_ms = np.asarray(latency_ms, dtype=np.float64)
+    bins = np.floor(np.log(np.maximum(latency_ms, 1.0)) / math.log(SKETCH_GAMMA)).astype(np.int64) + 1
+    bins[latency_ms <= 1] = 0
+    return np.minimum(bins, NUM_BINS - 1)
+
+
+# Midpoint of each bin, in ms.
+BIN_VALUES = np.concatenate(([1.0], SKETCH_GAMMA ** (np.arange(1, NUM_BINS) - 0.5)))
+
+
+def stats_path(data_dir, shard_id=None):
+    if shard_id is None:
+        return os.path.join(data_dir, STATS_FILE)
+    return os.path.join(data_dir, SHARDS_DIRNAME, shard_id, STATS_FILE)
+
+
+class LatencyStats:
+    """Streaming latency statistics for every probed service, in NumPy arrays.
+
+    Each service owns one row of:
+      - a log-bucket histogram sketch (bins ~5% wide) for the current and
+        the previous `window`, so p50/p95/p99 reflect the last 5-10 minutes
+        and memory stays at 2 x NUM_BINS counters per service however long
+        the monitor runs. Sketches merge by addition.
+      - a fast and a slow EWMA of log latency, plus the slow one's variance.
+        The z-score of the fast EWMA against the slow baseline flags a
+        service whose latency has drifted, well before it starts failing.
+      - an EWMA of the error rate.
+
+    add() only buffers a probe; flush() folds the buffer into the arrays in
+    a few vectorized passes. The monitor calls save() periodically and
+    readers (healer, dashboard) load the snapshot with StatsReader.
+    """
+
+    def __init__(self, window=SKETCH_WINDOW):
+        self.window = window
+        self.names = []
+        self._rows = {}
+        self.current = np.zeros((0, NUM_BINS), dtype=np.uint32)
+        self.previous = np.zeros((0, NUM_BINS), dtype=np.uint32)
+        self.samples = np.zeros(0, dtype=np.int64)
+        for field in _FLOAT_FIELDS:
+            setattr(self, field, np.zeros(0, dtype=np.float64))
+        self.window_started = time.time()
+        self.saved_at = None
+        self._pending = []
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------
+    # Updating
+    # ------------------------------------------------------------
+    def _row_ids(self, services):
+        new = [s for s in dict.fromkeys(services) if s not in self._rows]
+        if new:
+            for s in new:
+                self._rows[s] = len(self.names)
+                self.names.append(s)
+            self._grow(len(self.names))
+        return np.fromiter((self._rows[s] for s in services), dtype=np.int64, count=len(services))
+
+    def _grow(self, n):
+        extra = n - len(self.samples)
+        if extra <= 0:
+            return
+        self.current = np.vstack([self.current, np.zeros((extra, NUM_BINS), dtype=np.uint32)])
+        self.previous = np.vstack([self.previous, np.zeros((extra, NUM_BINS), dtype=np.uint32)])
+        self.samples = np.concatenate([self.samples, np.zeros(extra, dtype=np.int64)])
+        for field in _FLOAT_FIELDS:
+            setattr(self, field, np.concatenate([getattr(self, field), np.zeros(extra)]))
+
+    def add(self, log_entry):
+        """Buffer one monitor log entry; cheap enough for the probe callback."""
+        self._pending.append((log_entry["service"], log_entry.get("latency_ms"), log_entry.get("status_code") == 200))
+
+    def flush(self, now=None):
+        """Fold buffered probes into the sketches and EWMAs."""
+        pending, self._pending = self._pending, []
+        with self._lock:
+            self._rotate(time.time() if now is None else now)
+            if not pending:
+                return 0
+            services, latencies, ok = zip(*pending)
+            rows = self._row_ids(services)
+            latency = np.array([np.nan if v is None else v for v in latencies], dtype=np.float64)
+            self._update(rows, latency, np.array(ok, dtype=bool))
+            return len(pending)
+
+    def _rotate(self, now):
+        if now - self.window_started < self.window:
+            return
+        # Two windows gone: nothing recent is left at all.
+        self.previous = self.current if now - self.window_started < 2 * self.window else np.zeros_like(self.current)
+        self.current = np.zeros_like(self.previous)
+        self.window_started = now
+
+    def _update(self, rows, latency, ok):
+        has_latency = ~np.isnan(latency)
+        np.add.at(self.current, (rows[has_latency], latency_bins(latency[has_latency])), 1)
+
+        # EWMAs are order-dependent, so a batch holding several probes of
+        # the same service is applied in rounds: each round takes at most
+        # one probe per service, in arrival order.
+        order = np.argsort(rows, kind="stable")
+        sorted_rows = rows[order]
+        starts = np.r_[True, sorted_rows[1:] != sorted_rows[:-1]]
+        positions = np.arange(len(rows))
+        rank = np.empty_like(positions)
+        rank[order] = positions - np.maximum.accumulate(np.where(starts, positions, 0))
+
+        for r in range(rank.max() + 1):
+            pick = rank == r
+            self._ewma(rows[pick], latency[pick], ok[pick])
+
+    def _ewma(self, rows, latency, ok):
+        # Errors count towards the error rate whether or not they had a latency.
+        self.error_rate[rows] += RECENT_ALPHA * (~ok - self.error_rate[rows])
+
+        keep = ~np.isnan(latency)
+        rows, x = rows[keep], np.log(latency[keep] + LATENCY_FLOOR_MS)
+        first = self.samples[rows] == 0
+
+        mean, var = self.baseline_mean[rows], self.baseline_var[rows]
+        std = np.maximum(np.sqrt(var), MIN_STD)
+        recent = np.where(first, x, self.recent[rows] + RECENT_ALPHA * (x - self.recent[rows]))
+        # Scored against the baseline as it was before this probe.
+        self.z[rows] = np.where(first, 0.0, (recent - mean) / std)
+
+        # Outlying probes barely move the baseline once it is trusted, so a
+        # sustained slowdown stays flagged until it has clearly become the
+        # new normal instead of being absorbed within a few dozen probes.
+        delta = x - mean
+        outlier = (np.abs(delta) >= ANOMALY_Z * std) & (self.samples[rows] >= MIN_SAMPLES)
+        alpha = np.where(outlier, BASELINE_ALPHA * ANOMALY_DAMPING, BASELINE_ALPHA)
+        self.baseline_mean[rows] = np.where(first, x, mean + alpha * delta)
+        self.baseline_var[rows] = np.where(first, 0.0, (1 - alpha) * (var + alpha * delta * delta))
+        self.recent[rows] = recent
+        self.samples[rows] += 1
+
+    # ------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------
+    def _select(self, services):
+        if services is None:
+            return list(self.names), np.arange(len(self.names))
+        names = [s for s in services if s in self._rows]
+        return names, np.array([self._rows[s] for s in names], dtype=np.int64)
+
+    def quantiles(self, pcts=(50, 95, 99), services=None):
+        """{service: {"p50": ms, ...}} from the last one or two sketch windows."""
+        with self._lock:
+            names, rows = self._select(services)
+            counts = self.current[rows].astype(np.int64) + self.previous[rows]
+        cumulative = np.cumsum(counts, axis=1)
+        total = cumulative[:, -1]
+
+        out = {name: {} for name in names}
+        for pct in pcts:
+            rank = np.maximum(1, np.ceil(pct / 100 * total))
+            idx = np.argmax(cumulative >= rank[:, None], axis=1)
+            values = np.where(total > 0, np.round(BIN_VALUES[idx]), np.nan)
+            for name, value in zip(names, values):
+                out[name][f"p{pct}"] = None if np.isnan(value) else int(value)
+        return out
+
+    def baselines(self, services=None):
+        """{service: {"baseline_ms", "recent_ms", "z", "error_rate", "samples", "anomalous"}}."""
+        with self._lock:
+            names, rows = self._select(services)
+            mean, recent, z = self.baseline_mean[rows], self.recent[rows], self.z[rows]
+            error_rate, samples = self.error_rate[rows], self.samples[rows]
+        baseline_ms = np.exp(mean) - LATENCY_FLOOR_MS
+        recent_ms = np.exp(recent) - LATENCY_FLOOR_MS
+        anomalous = (samples >= MIN_SAMPLES) & (z >= ANOMALY_Z)
+        return {
+            name: {
+                "baseline_ms": round(float(baseline_ms[i]), 1) if samples[i] else None,
+                "recent_ms": round(float(recent_ms[i]), 1) if samples[i] else None,
+                "z": round(float(z[i]), 2),
+                "error_rate": round(float(error_rate[i]), 3),
+                "samples": int(samples[i]),
+                "anomalous": bool(anomalous[i]),
+            }
+            for i, name in enumerate(names)
+        }
+
+    def anomalies(self, services=None):
+        """The baselines() entries of services whose latency is well above normal."""
+        return {name: b for name, b in self.baselines(services).items() if b["anomalous"]}
+
+    def summary(self, services=None):
+        """quantiles() and baselines() in one dict per service."""
+        quantiles = self.quantiles(services=services)
+        return {name: dict(quantiles[name], **b) for name, b in self.baselines(services).items()}
+
+    # ------------------------------------------------------------
+    # Merging and persistence
+    # ------------------------------------------------------------
+    def merge(self, other):
+        """Fold another LatencyStats in (e.g. another monitor shard's).
+
+        Sketches add. A service present on both sides (briefly, while the
+        shards rebalance) keeps the EWMA state with more samples behind it.
+        """
+        with self._lock:
+            rows = self._row_ids(other.names)
+            self.current[rows] += other.current
+            self.previous[rows] += other.previous
+            take = other.samples > self.samples[rows]
+            for field in _FLOAT_FIELDS:
+                getattr(self, field)[rows[take]] = getattr(other, field)[take]
+            self.samples[rows] = np.maximum(self.samples[rows], other.samples)
+            self.window_started = max(self.window_started, other.window_started)
+        return self
+
+    def save(self, path):
+        """Write an atomic snapshot of the arrays for other processes."""
+        with self._lock:
+            arrays = {field: getattr(self, field).copy() for field in _FLOAT_FIELDS}
+            arrays.update(names=np.array(self.names, dtype=str), current=self.current.copy(),
+                          previous=self.previous.copy(), samples=self.samples.copy(),
+                          meta=np.array([self.window, self.window_started, time.time()]))
+        tmp = f"{path}.{threading.get_ident()}.tmp.npz"
+        np.savez(tmp, **arrays)
+        os.replace(tmp, path)
+        self.saved_at = float(arrays["meta"][2])
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            window, window_started, saved_at = data["meta"]
+            stats = cls(window=float(window))
+            stats.names = [str(n) for n in data["names"]]
+            stats._rows = {name: i for i, name in enumerate(stats.names)}
+            stats.current, stats.previous, stats.samples = data["current"], data["previous"], data["samples"]
+            for field in _FLOAT_FIELDS:
+                setattr(stats, field, data[field])
+        stats.window_started = float(window_started)
+        stats.saved_at = float(saved_at)
+        return stats
+
+
+class StatsReader:
+    """Read side of the monitor's snapshots under a data directory.
+
+    Loads data/latency_stats.npz, or merges every sharded worker's snapshot,
+    and only re-reads when a file has changed since the last get().
+    """
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self._mtimes = None
+        self._stats = None
+        self._lock = threading.Lock()
+
+    def _paths(self):
+        shards = sorted(glob.glob(stats_path(self.data_dir, "*")))
+        return shards or [p for p in [stats_path(self.data_dir)] if os.path.exists(p)]
+
+    def get(self):
+        """The latest LatencyStats, or None if no monitor has written one yet."""
+        with self._lock:
+            paths = self._paths()
+            try:
+                mtimes = [(p, os.path.getmtime(p)) for p in paths]
+            except FileNotFoundError:
+                return self._stats
+            if mtimes == self._mtimes:
+                return self._stats
+            try:
+                loaded = [LatencyStats.load(p) for p in paths]
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Ignoring unreadable latency stats: {e}")
+                return self._stats
+            stats = loaded[0] if loaded else None
+            for other in loaded[1:]:
+                stats.merge(other)
+            self._stats, self._mtimes = stats, mtimes
+            return stats
@@ -0,0 +1,230 @@
+# backend/agent/log_writer.py
+import datetime
+import json
+import os
+import queue
+import threading
+import time
+
+FSYNC_NEVER = "never"        # leave durability to the OS page cache
+FSYNC_BATCH = "batch"        # fsync after every group commit
+FSYNC_INTERVAL = "interval"  # fsync at most once per fsync_interval seconds
+
+MANIFEST_NAME = "manifest.json"
+
+_STOP = object()
+
+
+def read_manifest(segment_dir):
+    """Return the list of closed segments recorded in a segment directory."""
+    path = os.path.join(segment_dir, MANIFEST_NAME)
+    try:
+        with open(path, "r") as f:
+            return json.load(f).get("segments", [])
+    except (FileNotFoundError, ValueError):
+        return []
+
+
+def write_manifest(segment_dir, segments):
+    """Atomically replace the manifest of a segment directory."""
+    path = os.path.join(segment_dir, MANIFEST_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"segments": segments}, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+class LogWriter(threading.Thread):
+    """Background thread that group-commits probe records and rotates segments.
+
+    Producers call write() which only enqueues; serialization, file I/O,
+    fsync and rotation all happen on this thread. Each batch goes to the
+    columnar ProbeStore when one is given, and to the JSON-lines log at
+    `path` unless path is None. The active JSON-lines segment is always
+    `path`, so existing readers keep working. When it grows past
+    max_segment_bytes or max_segment_age seconds it is moved into
+    segment_dir and recorded in the manifest.
+
+    `flush_duration`, a metrics.Histogram, receives the time each group
+    commit takes. `maintenance`, if given, is called with the store every
+    maintenance_interval seconds on this thread, between batches, so it
+    can rewrite the store (see retention.ProbeCompactor) without racing
+    an append.
+    """
+
+    def __init__(self, path, segment_dir, flush_interval=1.0, max_batch=1000,
+                 fsync=FSYNC_INTERVAL, fsync_interval=5.0,
+                 max_segment_bytes=16 * 1024 * 1024, max_segment_age=3600,
+                 max_queue=100000, store=None, maintenance=None, maintenance_interval=600.0,
+                 flush_duration=None):
+        super().__init__(name="log-writer", daemon=True)
+        self.path = path
+        self.segment_dir = segment_dir
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_age = max_segment_age
+        self.store = store
+        self.maintenance = maintenance
+        self.flush_duration = flush_duration
+        self.maintenance_interval = maintenance_interval
+
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.stats = {"written": 0, "dropped": 0, "batches": 0, "segments": 0,
+                      "last_flush_ms": 0.0}
+
+        if self.path:
+            os.makedirs(self.segment_dir, exist_ok=True)
+        self._file = None
+        self._last_fsync = time.monotonic()
+        self._last_maintenance = time.monotonic()
+
+    # ------------------------------------------------------------
+    # Producer side
+    # ------------------------------------------------------------
+    def write(self, record):
+        """Enqueue a record without blocking; drops (and counts) when full."""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.stats["dropped"] += 1
+
+    def close(self, timeout=10.0):
+        """Flush everything still queued and stop the thread."""
+        self.queue.put(_STOP)
+        self.join(timeout)
+
+    # ------------------------------------------------------------
+    # Writer thread
+    # ------------------------------------------------------------
+    def run(self):
+        if self.path:
+            self._open_active()
+        running = True
+        while running:
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    record = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if record is _STOP:
+                    running = False
+                    break
+                batch.append(record)
+
+            try:
+                if batch:
+                    self._commit(batch)
+                if self._should_rotate():
+                    self._rotate()
+            except Exception as e:
+                print(f"Log writer failed to commit {len(batch)} records: {e}")
+
+            if self.maintenance and time.monotonic() - self._last_maintenance >= self.maintenance_interval:
+                self._last_maintenance = time.monotonic()
+                try:
+                    self.maintenance(self.store)
+                except Exception as e:
+                    print(f"Log writer maintenance failed: {e}")
+
+        self._sync()
+        if self._file:
+            self._file.close()
+        if self.store is not None:
+            self.store.close()
+
+    def _open_active(self):
+        self._file = open(self.path, "a")
+        self._opened_at = time.time()
+        self._segment_records = 0
+        self._first_ts = None
+        self._last_ts = None
+
+        # Resuming onto an existing active file: count what is already there
+        # so the manifest entry is accurate when it eventually rotates.
+        if self._file.tell() > 0:
+            with open(self.path, "r") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    self._segment_records += 1
+                    if self._first_ts is None:
+                        try:
+                            self._first_ts = json.loads(line).get("timestamp")
+                        except ValueError:
+                            pass
+            # The segment's age counts from its first record, not from this
+            # restart; otherwise a writer that restarts often never rotates.
+            try:
+                self._opened_at = datetime.datetime.fromisoformat(self._first_ts).timestamp()
+            except (TypeError, ValueError):
+                self._opened_at = os.path.getmtime(self.path)
+
+    def _commit(self, batch):
+        start = time.perf_counter()
+        if self.store is not None:
+            self.store.append(batch)
+        if self._file:
+            self._file.write("".join(json.dumps(record) + "\n" for record in batch))
+            self._file.flush()
+            if self._first_ts is None:
+                self._first_ts = batch[0].get("timestamp")
+            self._last_ts = batch[-1].get("timestamp")
+            self._segment_records += len(batch)
+
+        if self.fsync == FSYNC_BATCH:
+            self._sync()
+        elif self.fsync == FSYNC_INTERVAL and time.monotonic() - self._last_fsync >= self.fsync_interval:
+            self._sync()
+
+        self.stats["written"] += len(batch)
+        self.stats["batches"] += 1
+        elapsed = time.perf_counter() - start
+        self.stats["last_flush_ms"] = round(elapsed * 1000, 3)
+        if self.flush_duration is not None:
+            self.flush_duration.observe(elapsed)
+
+    def _sync(self):
+        if self.fsync != FSYNC_NEVER:
+            if self._file:
+                os.fsync(self._file.fileno())
+            if self.store is not None:
+                self.store.sync()
+        self._last_fsync = time.monotonic()
+
+    def _should_rotate(self):
+        if not self._file or self._segment_records == 0:
+            return False
+        if self._file.tell() >= self.max_segment_bytes:
+            return True
+        return time.time() - self._opened_at >= self.max_segment_age
+
+    def _rotate(self):
+        self._sync()
+        size = self._file.tell()
+        self._file.close()
+
+        segments = read_manifest(self.segment_dir)
+        seq = segments[-1]["seq"] + 1 if segments else 1
+        name = f"logs-{seq:06d}.json"
+        os.replace(self.path, os.path.join(self.segment_dir, name))
+
+        segments.append({
+            "seq": seq,
+            "file": name,
+            "records": self._segment_records,
+            "bytes": size,
+            "first_timestamp": self._first_ts,
+            "last_timestamp": self._last_ts,
+        })
+        write_manifest(self.segment_dir, segments)
+        self.stats["segments"] += 1
+
+        self._open_active()
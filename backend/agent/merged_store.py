@@ -0,0 +1,117 @@
+# backend/agent/merged_store.py
+import array
+import heapq
+import json
+import os
+
+from probe_store import ProbeStore, COLUMNS
+
+SHARDS_DIRNAME = "shards"
+PROBES_DIRNAME = "probes"
+
+
+def shard_store_dir(data_dir, shard_id):
+    return os.path.join(data_dir, SHARDS_DIRNAME, shard_id, PROBES_DIRNAME)
+
+
+def probe_store_exists(data_dir):
+    return (os.path.isdir(os.path.join(data_dir, SHARDS_DIRNAME))
+            or ProbeStore.exists(os.path.join(data_dir, PROBES_DIRNAME)))
+
+
+def open_probe_store(data_dir):
+    """The merged view if a sharded monitor is writing, else the single store, else None."""
+    shards_dir = os.path.join(data_dir, SHARDS_DIRNAME)
+    if os.path.isdir(shards_dir):
+        return MergedProbeStore(shards_dir)
+    single = os.path.join(data_dir, PROBES_DIRNAME)
+    if ProbeStore.exists(single):
+        return ProbeStore(single)
+    return None
+
+
+class MergedProbeStore:
+    """Read-only union of the per-worker shard stores written by sharded_monitor.py.
+
+    Each shard interns its own services, URLs, bodies and incident IDs; this view remaps
+    them into one global dictionary and merges new rows from all shards by
+    timestamp, so ProbeHistory and the dashboard see a single stream. Shards
+    that appear later (a worker added to the pool) are picked up on refresh.
+    """
+
+    def __init__(self, shards_dir):
+        self.shards_dir = shards_dir
+        self.tables = {"service": [], "url": [], "body": [None], "incident": [None]}
+        self._index = {"service": {}, "url": {}, "body": {json.dumps(None): 0}, "incident": {json.dumps(None): 0}}
+        self._shards = {}   # shard id -> ProbeStore
+        self._remap = {}    # shard id -> {table: [global id by local id]}
+        self.refresh()
+
+    @property
+    def services(self):
+        return self.tables["service"]
+
+    def _discover(self):
+        if not os.path.isdir(self.shards_dir):
+            return
+        for shard_id in sorted(os.listdir(self.shards_dir)):
+            path = os.path.join(self.shards_dir, shard_id, PROBES_DIRNAME)
+            if shard_id not in self._shards and ProbeStore.exists(path):
+                self._shards[shard_id] = ProbeStore(path)
+                self._remap[shard_id] = {table: [] for table in self.tables}
+
+    def _sync_tables(self, shard_id):
+        store = self._shards[shard_id]
+        remap = self._remap[shard_id]
+        for table, values in store.tables.items():
+            ids = remap[table]
+            for value in values[len(ids):]:
+                key = json.dumps(value)
+                idx = self._index[table].get(key)
+                if idx is None:
+                    idx = len(self.tables[table])
+                    self._index[table][key] = idx
+                    self.tables[table].append(value)
+                ids.append(idx)
+
+    def refresh(self):
+        self._discover()
+        for shard_id, store in self._shards.items():
+            store.refresh()
+            self._sync_tables(shard_id)
+
+    def __len__(self):
+        return sum(len(store) for store in self._shards.values())
+
+    def columns_since(self, cursor=None):
+        """New rows from every shard since `cursor`, merged by timestamp."""
+        cursor = dict(cursor or {})
+        self._discover()
+
+        merged = {name: array.array(code) for name, (code, _) in COLUMNS.items()}
+        for shard_id, store in self._shards.items():
+            cols, cursor[shard_id] = store.columns_since(cursor.get(shard_id))
+            self._sync_tables(shard_id)
+            remap = self._remap[shard_id]
+            for name in ("service", "url", "body", "incident"):
+                ids = remap[name]
+                cols[name] = array.array(merged[name].typecode, (ids[i] for i in cols[name]))
+            for name in merged:
+                merged[name].extend(cols[name])
+
+        ts = merged["timestamp"]
+        if len(self._shards) > 1 and any(ts[i] > ts[i + 1] for i in range(len(ts) - 1)):
+            order = sorted(range(len(ts)), key=ts.__getitem__)
+            merged = {name: array.array(col.typecode, (col[i] for i in order)) for name, col in merged.items()}
+        return merged, cursor
+
+    def compacted_before(self):
+        """Latest compaction cutoff across shards (epoch microseconds, 0 if none)."""
+        self._discover()
+        return max((store.compacted_before() for store in self._shards.values()), default=0)
+
+    def tail(self, n):
+        """The last n rows across all shards as logs.json-style dicts."""
+        self._discover()
+        streams = [store.tail(n) for store in self._shards.values()]
+        return list(heapq.merge(*streams, key=lambda r: r["timestamp"]))[-n:]
@@ -0,0 +1,205 @@
+# backend/agent/metrics.py
+import bisect
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Default bucket bounds, in seconds.
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+PROBE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+SLOW_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _number(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(labels.get(name, "") for name in self.labels)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        super().__init__(name, help, labels)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_labels(self.labels, key)} {_number(v)}" for key, v in sorted(values.items())]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram; observe() costs a bisect and two adds."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, buckets=PROBE_BUCKETS, labels=()):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}   # label values -> [bucket counts..., +Inf count], sum
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][i] += 1
+            series[1] += value
+
+    def render(self):
+        with self._lock:
+            snapshot = {key: (list(counts), total) for key, (counts, total) in self._series.items()}
+        lines = []
+        for key, (counts, total) in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(self.labels, key, [('le', _number(bound))])} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+class Callback(_Metric):
+    """A counter or gauge read at scrape time from a function.
+
+    `fn` returns a number, or {label value(s): number} when `labels` is set,
+    which suits the `stats` dicts most components already keep.
+    """
+
+    def __init__(self, name, help, fn, kind="gauge", labels=()):
+        super().__init__(name, help, labels)
+        self.kind = kind
+        self.fn = fn
+
+    def render(self):
+        value = self.fn()
+        if value is None:
+            return []
+        if not self.labels:
+            return [f"{self.name} {_number(value)}"]
+        return [f"{self.name}{_labels(self.labels, key if isinstance(key, tuple) else (key,))} {_number(v)}"
+                for key, v in sorted(value.items()) if v is not None]
+
+
+class Registry:
+    def __init__(self, prefix="autoops_"):
+        self.prefix = prefix
+        self._metrics = []
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self._add(Counter(self.prefix + name, help, labels))
+
+    def gauge(self, name, help, labels=()):
+        return self._add(Gauge(self.prefix + name, help, labels))
+
+    def histogram(self, name, help, buckets=PROBE_BUCKETS, labels=()):
+        return self._add(Histogram(self.prefix + name, help, buckets, labels))
+
+    def callback(self, name, help, fn, kind="gauge", labels=()):
+        return self._add(Callback(self.prefix + name, help, fn, kind, labels))
+
+    def stats(self, name, help, stats, counters=(), gauges=()):
+        """Export entries of a component's `stats` dict as <name>_total{event} and <name>{field}."""
+        if counters:
+            self.callback(f"{name}_total", help, lambda: {k: stats.get(k) for k in counters},
+                          kind="counter", labels=("event",))
+        if gauges:
+            self.callback(name, help, lambda: {k: stats.get(k) for k in gauges}, labels=("field",))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            try:
+                body = metric.render()
+            except Exception as e:
+                # One broken collector shouldn't take the whole scrape down.
+                body = [f"# {metric.name} unavailable: {e}"]
+            lines += metric.header() + body
+        return "\n".join(lines) + "\n"
+
+
+def serve(registry, port, host="127.0.0.1"):
+    """Expose GET /metrics from a daemon thread.
+
+    Returns the server, or None if `port` is falsy or already taken; metrics
+    are never worth failing the agent over.
+    """
+    if not port:
+        return None
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass   # scrapes every few seconds would drown the agent's own output
+
+    try:
+        server = ThreadingHTTPServer((host, port), Handler)
+    except OSError as e:
+        print(f"Metrics endpoint unavailable on port {port}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    print(f"Serving metrics on http://{host}:{port}/metrics")
+    return server
@@ -1,51 +1,236 @@
 # backend/agent/monitor.py
-import requests
+import asyncio
 import json
-import time
-import datetime
 import os
 
-data_dir = os.path.join(os.path.dirname(__file__), '..', '..', 'data')
+import metrics
+from config import DATA_DIR, SERVERS, TARGETS_FILE
+from event_channel import EventPublisher, default_address
+from fleet_inventory import read_snapshot, snapshot_targets
+from latency_stats import LatencyStats, stats_path
+from log_writer import LogWriter, FSYNC_INTERVAL
+from probe_engine import ProbeEngine
+from probe_schedule import AdaptiveInterval
+from probe_store import ProbeStore
+from retention import ProbeCompactor
+from tracing import TRACE_FILE, IncidentTracker, Tracer
+
+data_dir = DATA_DIR
 if not os.path.exists(data_dir):
     os.makedirs(data_dir)
 
 LOG_FILE = os.path.join(data_dir, 'logs.json')
-SERVERS = {
-    "payment": "http://127.0.0.1:5002/health",
-    # "inventory": "http://127.0.0.1:5002/health"
-    # "payment": "http://54.186.48.127:3000/health"
-}
-
-print("Starting monitoring agent...")
-while True:
-    for name, url in SERVERS.items():
-        log_entry = {
-            "service": name,
-            "url": "http://54.186.48.127:3000/health",
-            "timestamp": datetime.datetime.now().isoformat(),
-            "status_code": None,
-            "response_body": None,
-            "latency_ms": None
-        }
-        
-        # http://54.186.48.127
-        
+LOG_SEGMENT_DIR = os.path.join(data_dir, 'log_segments')
+PROBE_STORE_DIR = os.path.join(data_dir, 'probes')
+
+# EC2 instances found by the healer's fleet inventory are probed too.
+INVENTORY_FILE = os.path.join(data_dir, 'inventory.json')
+INVENTORY_SERVICE_PORT = 3000   # service.py's default port on EC2 hosts
+
+PROBE_INTERVAL = 3.0      # seconds between probes of the same service
+PROBE_TIMEOUT = 4.0       # per-probe deadline
+MAX_IN_FLIGHT = 500       # cap on concurrent probes across the whole fleet
+CONNECTIONS_PER_HOST = 8  # keep-alive pool size per host
+
+# Per-service cadence: back off on long healthy streaks, tighten right
+# after a failure. Set ADAPTIVE_PROBING = False for a flat PROBE_INTERVAL.
+ADAPTIVE_PROBING = os.environ.get('AUTOOPS_ADAPTIVE_PROBING', '1') != '0'
+MIN_PROBE_INTERVAL = 0.5
+# A healthy service is never probed less often than this, so it also bounds
+# how long a crash after a quiet stretch goes unnoticed.
+MAX_PROBE_INTERVAL = 2 * PROBE_INTERVAL
+PROBE_BACKOFF = 1.5       # growth per probe once a service has been healthy a while
+HEALTHY_STREAK = 5        # consecutive 200s before backing off
+CONFIRM_STREAK = 3        # consecutive failures probed at MIN_PROBE_INTERVAL
+PROBE_JITTER = 0.1        # +/- fraction applied to every interval
+
+FLUSH_INTERVAL = 1.0              # seconds between group commits
+FSYNC_POLICY = FSYNC_INTERVAL     # "never", "batch" or "interval"
+MAX_SEGMENT_BYTES = 16 * 1024 * 1024
+MAX_SEGMENT_AGE = 3600            # seconds before the active log rolls over
+TARGETS_RELOAD_INTERVAL = 2.0     # seconds between checks of TARGETS_FILE
+STATS_INTERVAL = 2.0              # seconds between latency stats snapshots
+STATS_FILE = stats_path(data_dir)
+TRACE_PATH = os.path.join(data_dir, TRACE_FILE)   # incident spans; the healer appends to it too
+
+# Retention: raw probes stay in the store for HOT_WINDOW; older ones are
+# rolled up per minute (kept ROLLUP_DAYS) and archived gzipped (kept
+# ARCHIVE_DAYS). Closed log_segments are gzipped once they leave the window.
+HOT_WINDOW = float(os.environ.get('AUTOOPS_HOT_WINDOW', 6 * 3600))
+ARCHIVE_DAYS = 30
+ROLLUP_DAYS = 365
+COMPACT_INTERVAL = 600.0          # seconds between compaction runs
+
+# Prometheus text format on http://127.0.0.1:<port>/metrics; 0 turns it off.
+# Sharded workers serve on SHARD_METRICS_PORT + their index.
+METRICS_PORT = int(os.environ.get('AUTOOPS_MONITOR_METRICS_PORT', 9101))
+SHARD_METRICS_PORT = 9110
+
+# The columnar probe store is the primary history. Set this to keep writing
+# the legacy logs.json alongside it (or use `probe_store.py export`).
+MIRROR_JSONL = False
+
+
+def load_targets():
+    """TARGETS_FILE (or SERVERS) plus the running instances in the inventory snapshot."""
+    targets = dict(SERVERS)
+    if os.path.exists(TARGETS_FILE):
+        with open(TARGETS_FILE, 'r') as f:
+            targets = json.load(f)
+    for name, url in snapshot_targets(read_snapshot(INVENTORY_FILE), port=INVENTORY_SERVICE_PORT).items():
+        targets.setdefault(name, url)
+    return targets
+
+
+def targets_mtime():
+    """Changes whenever either source of targets does."""
+    return tuple(os.path.getmtime(p) if os.path.exists(p) else None for p in (TARGETS_FILE, INVENTORY_FILE))
+
+
+async def follow_targets(engine):
+    """Re-read the targets whenever their files change and retarget the engine."""
+    mtime = targets_mtime()
+    while True:
+        await asyncio.sleep(TARGETS_RELOAD_INTERVAL)
+        current = targets_mtime()
+        if current == mtime:
+            continue
+        mtime = current
         try:
-            start_time = time.time()
-            res = requests.get(url, timeout=4.0) 
-            end_time = time.time()
+            targets = load_targets()
+        except ValueError as e:
+            print(f"Ignoring unreadable targets file: {e}")
+            continue
+        if targets != engine.targets:
+            engine.set_targets(targets)
+            print(f"Reloaded {len(targets)} targets")
+
 
-            log_entry["status_code"] = res.status_code
-            log_entry["response_body"] = res.json()
-            log_entry["latency_ms"] = round((end_time - start_time) * 1000)
+async def publish_stats(stats, path):
+    """Fold buffered probes into `stats` and snapshot it for the healer and dashboard."""
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            await asyncio.sleep(STATS_INTERVAL)
+            stats.flush()
+            # Writing the snapshot is file I/O; keep it off the probe loop.
+            await loop.run_in_executor(None, stats.save, path)
+    finally:
+        stats.flush()
+        stats.save(path)
 
-        except requests.exceptions.RequestException as e:
-            log_entry["status_code"] = "CRASHED"
-            log_entry["response_body"] = str(e)
 
-        with open(LOG_FILE, "a") as f:
-            f.write(json.dumps(log_entry) + "\n")
+class ProbeMetrics:
+    """The monitor's Prometheus series: histograms the engine and writer
+    observe into, plus callbacks that read their stats at scrape time."""
 
+    def __init__(self):
+        self.registry = metrics.Registry()
+        self.probe_duration = self.registry.histogram(
+            "probe_duration_seconds", "Health probe round-trip time.", labels=("service", "result"))
+        self.dispatch_lag = self.registry.histogram(
+            "probe_dispatch_lag_seconds", "How late each probe left its scheduled slot.",
+            buckets=metrics.FAST_BUCKETS)
+        self.flush_duration = self.registry.histogram(
+            "writer_flush_seconds", "Time per group commit to the probe store.",
+            buckets=metrics.FAST_BUCKETS)
+
+    def attach(self, engine, writer):
+        r = self.registry
+        r.stats("probe_engine", "Probe engine events.", engine.stats,
+                counters=("probes", "crashed", "overruns", "tightened"))
+        r.callback("probe_max_lag_seconds", "Worst dispatch lag seen so far.",
+                   lambda: engine.stats["max_lag_ms"] / 1000)
+        r.callback("probes_in_flight", "Probes currently awaiting a response.", lambda: engine.in_flight)
+        r.callback("probe_targets", "Services being probed.", lambda: len(engine.targets))
+        r.callback("writer_queue_depth", "Probe records waiting for the writer thread.", writer.queue.qsize)
+        r.stats("writer", "Log writer events.", writer.stats,
+                counters=("written", "dropped", "batches", "segments"))
+        if writer.maintenance is not None:
+            r.stats("compactor", "Probe store compaction.", writer.maintenance.stats,
+                    counters=("runs", "rows_dropped", "rollup_rows"))
+
+
+def probe_policy():
+    if not ADAPTIVE_PROBING:
+        return None
+    return AdaptiveInterval(
+        base=PROBE_INTERVAL,
+        min_interval=MIN_PROBE_INTERVAL,
+        max_interval=MAX_PROBE_INTERVAL,
+        backoff=PROBE_BACKOFF,
+        healthy_streak=HEALTHY_STREAK,
+        confirm_streak=CONFIRM_STREAK,
+        jitter=PROBE_JITTER,
+    )
+
+
+def main():
+    probe_metrics = ProbeMetrics()
+    writer = LogWriter(
+        LOG_FILE if MIRROR_JSONL else None,
+        LOG_SEGMENT_DIR,
+        flush_interval=FLUSH_INTERVAL,
+        fsync=FSYNC_POLICY,
+        max_segment_bytes=MAX_SEGMENT_BYTES,
+        max_segment_age=MAX_SEGMENT_AGE,
+        store=ProbeStore(PROBE_STORE_DIR, create=True),
+        maintenance=ProbeCompactor(hot_window=HOT_WINDOW, archive_days=ARCHIVE_DAYS,
+                                   rollup_days=ROLLUP_DAYS, segment_dir=LOG_SEGMENT_DIR),
+        maintenance_interval=COMPACT_INTERVAL,
+        flush_duration=probe_metrics.flush_duration,
+    )
+    writer.start()
+
+    # Probe events are also pushed to the healer so it can react to a
+    # failure immediately instead of at its next sweep.
+    publisher = EventPublisher(default_address(data_dir))
+    publisher.start()
+
+    # Per-service latency quantiles and baselines, kept as probes arrive.
+    stats = LatencyStats()
+    # A service's first failing probe opens an incident; its ID rides along
+    # on every failing probe so the healer's spans join up with ours.
+    incidents = IncidentTracker(Tracer(TRACE_PATH))
+
+    def write_log_entry(log_entry):
+        incidents.observe(log_entry)
+        writer.write(log_entry)
+        publisher.publish(log_entry)
+        stats.add(log_entry)
         print(f"Logged: {log_entry['service']} status is {log_entry['status_code']}")
-    
-    time.sleep(3)
\ No newline at end of file
+
+    engine = ProbeEngine(
+        load_targets(),
+        on_result=write_log_entry,
+        interval=PROBE_INTERVAL,
+        timeout=PROBE_TIMEOUT,
+        max_in_flight=MAX_IN_FLIGHT,
+        limit_per_host=CONNECTIONS_PER_HOST,
+        adaptive=probe_policy(),
+        probe_duration=probe_metrics.probe_duration,
+        dispatch_lag=probe_metrics.dispatch_lag,
+    )
+    probe_metrics.attach(engine, writer)
+    metrics.serve(probe_metrics.registry, METRICS_PORT)
+
+    async def run():
+        watcher = asyncio.create_task(follow_targets(engine))
+        publisher_task = asyncio.create_task(publish_stats(stats, STATS_FILE))
+        try:
+            await engine.run()
+        finally:
+            watcher.cancel()
+            publisher_task.cancel()
+
+    print("Starting monitoring agent...")
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        print("Monitoring agent stopped.")
+    finally:
+        writer.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+# backend/agent/probe_engine.py
+import asyncio
+import datetime
+import heapq
+import time
+
+import aiohttp
+
+
+class ProbeEngine:
+    """Probes many /health endpoints concurrently, each on its own cadence.
+
+    The cadence is a fixed `interval`, or per service when an `adaptive`
+    policy (probe_schedule.AdaptiveInterval) is given. Optional
+    metrics.Histograms receive each probe's duration (`probe_duration`,
+    by service and result) and how late each probe left its slot
+    (`dispatch_lag`).
+    """
+
+    def __init__(self, targets, on_result, interval=3.0, timeout=4.0,
+                 max_in_flight=500, limit_per_host=8, adaptive=None,
+                 probe_duration=None, dispatch_lag=None):
+        # targets: {service_name: health_url}
+        self.targets = dict(targets)
+        self.on_result = on_result
+        self.interval = interval
+        self.timeout = timeout
+        self.max_in_flight = max_in_flight
+        self.limit_per_host = limit_per_host
+        self.adaptive = adaptive
+        self.probe_duration = probe_duration
+        self.dispatch_lag = dispatch_lag
+
+        self.stats = {"probes": 0, "crashed": 0, "overruns": 0, "max_lag_ms": 0, "tightened": 0}
+        self._in_flight = set()
+        self._schedule = []
+        self._slots = {}  # name -> seq of its live schedule entry
+        self._seq = 0
+        self._stopped = False
+
+    @property
+    def in_flight(self):
+        return len(self._in_flight)
+
+    def stop(self):
+        """Ask the dispatch loop to exit after the current tick."""
+        self._stopped = True
+
+    def set_targets(self, targets):
+        """Replace the target set while running; must be called on the engine's loop.
+
+        New targets are staggered over the next interval. Removed targets are
+        dropped lazily when their slot comes up.
+        """
+        added = [name for name in targets if name not in self.targets]
+        for name in self.targets:
+            if name not in targets:
+                self._slots.pop(name, None)
+                if self.adaptive:
+                    self.adaptive.forget(name)
+        self.targets = dict(targets)
+        now = asyncio.get_running_loop().time()
+        for i, name in enumerate(added):
+            self._push(now + self.interval * i / max(len(added), 1), name)
+
+    def _push(self, due, name):
+        heapq.heappush(self._schedule, (due, self._seq, name))
+        self._slots[name] = self._seq
+        self._seq += 1
+
+    async def run(self):
+        """Dispatch probes until stop() is called."""
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(self.max_in_flight)
+        connector = aiohttp.TCPConnector(
+            limit=self.max_in_flight,
+            limit_per_host=self.limit_per_host,
+            ttl_dns_cache=300,
+        )
+        client_timeout = aiohttp.ClientTimeout(total=self.timeout)
+
+        async with aiohttp.ClientSession(connector=connector, timeout=client_timeout) as session:
+            # Stagger the first round across one interval so a large fleet
+            # doesn't fire every probe in the same millisecond.
+            start = loop.time()
+            count = max(len(self.targets), 1)
+            for i, name in enumerate(self.targets):
+                self._push(start + self.interval * i / count, name)
+
+            tasks = set()
+            schedule = self._schedule
+            while not self._stopped:
+                if not schedule:
+                    await asyncio.sleep(0.5)
+                    continue
+                due, seq, name = schedule[0]
+                delay = due - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(min(delay, 0.5))
+                    continue
+
+                heapq.heappop(schedule)
+                if self._slots.get(name) != seq:
+                    # Target was removed (or removed and re-added, or
+                    # pulled in by the adaptive policy) since this entry
+                    # was queued.
+                    continue
+                lag_ms = round(-delay * 1000)
+                self.stats["max_lag_ms"] = max(self.stats["max_lag_ms"], lag_ms)
+                if self.dispatch_lag is not None:
+                    self.dispatch_lag.observe(-delay)
+
+                if name in self._in_flight:
+                    # Previous probe for this target is still waiting on its
+                    # deadline; skip rather than stack requests on a slow host.
+                    self.stats["overruns"] += 1
+                else:
+                    self._in_flight.add(name)
+                    task = asyncio.ensure_future(self._probe(session, slots, name, self.targets[name]))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+
+                # Next slot is anchored to the schedule, not to completion, so
+                # one slow target never shifts anyone else's cadence.
+                heapq.heappush(schedule, (due + self._next_interval(name), seq, name))
+
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _next_interval(self, name):
+        return self.adaptive.next_delay(name) if self.adaptive else self.interval
+
+    def _observe(self, name, status):
+        """Feed a result to the adaptive policy; pull the next probe in if it tightened."""
+        if not self.adaptive or name not in self._slots:
+            return
+        if self.adaptive.observe(name, status == 200):
+            # The queued slot was computed from the old, longer interval.
+            # Queue an earlier one; the old entry goes stale via its seq.
+            self.stats["tightened"] += 1
+            self._push(asyncio.get_running_loop().time() + self.adaptive.next_delay(name), name)
+
+    async def _probe(self, session, slots, name, url):
+        log_entry = {
+            "service": name,
+            "url": url,
+            "timestamp": datetime.datetime.now().isoformat(),
+            "status_code": None,
+            "response_body": None,
+            "latency_ms": None
+        }
+
+        try:
+            async with slots:
+                start_time = time.perf_counter()
+                try:
+                    status, body = await asyncio.wait_for(self._fetch(session, url), self.timeout)
+                    log_entry["status_code"] = status
+                    log_entry["response_body"] = body
+                    log_entry["latency_ms"] = round((time.perf_counter() - start_time) * 1000)
+                except asyncio.TimeoutError:
+                    log_entry["status_code"] = "CRASHED"
+                    log_entry["response_body"] = f"{url}: Read timed out. (timeout={self.timeout})"
+                except (aiohttp.ClientError, ValueError) as e:
+                    log_entry["status_code"] = "CRASHED"
+                    log_entry["response_body"] = f"{url}: {type(e).__name__}: {e}"
+
+            self.stats["probes"] += 1
+            if log_entry["status_code"] == "CRASHED":
+                self.stats["crashed"] += 1
+            if self.probe_duration is not None:
+                status = log_entry["status_code"]
+                result = "ok" if status == 200 else "crashed" if status == "CRASHED" else "error"
+                self.probe_duration.observe(time.perf_counter() - start_time, service=name, result=result)
+            self._observe(name, log_entry["status_code"])
+
+            try:
+                self.on_result(log_entry)
+            except Exception as e:
+                print(f"Probe result handler failed for {name}: {e}")
+        finally:
+            self._in_flight.discard(name)
+
+    @staticmethod
+    async def _fetch(session, url):
+        async with session.get(url) as res:
+            body = await res.json(content_type=None)
+            return res.status, body
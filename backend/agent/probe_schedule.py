@@ -0,0 +1,64 @@
+# backend/agent/probe_schedule.py
+import random
+
+
+class AdaptiveInterval:
+    """Per-service probe interval driven by recent health.
+
+    Every service starts at `base`. A non-200 or a timeout drops it straight
+    to `min_interval` so a suspected failure is confirmed within a couple of
+    seconds; once `confirm_streak` failures in a row have confirmed it, the
+    interval relaxes by `backoff` per probe back towards `base`, so a
+    service that stays down isn't hammered. Healthy probes first bring it
+    back up to `base`, and after `healthy_streak` consecutive successes it
+    grows by `backoff` per probe up to `max_interval`, which is therefore
+    the worst-case delay before a long-healthy service's crash is first
+    seen; keep it a small multiple of `base`. next_delay() adds +/- `jitter`
+    (a fraction) so services that changed state together don't stay in
+    lockstep.
+    """
+
+    def __init__(self, base=3.0, min_interval=0.5, max_interval=6.0, backoff=1.5,
+                 healthy_streak=5, confirm_streak=3, jitter=0.1, seed=None):
+        self.base = base
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.healthy_streak = healthy_streak
+        self.confirm_streak = confirm_streak
+        self.jitter = jitter
+        self._rng = random.Random(seed)
+        self._interval = {}
+        self._streak = {}      # consecutive healthy probes
+        self._failures = {}    # consecutive failed probes
+
+    def interval(self, name):
+        return self._interval.get(name, self.base)
+
+    def next_delay(self, name):
+        interval = self.interval(name)
+        return interval * (1 + self._rng.uniform(-self.jitter, self.jitter))
+
+    def observe(self, name, healthy):
+        """Record a probe result; returns True if the interval got shorter."""
+        before = self.interval(name)
+        if not healthy:
+            self._streak[name] = 0
+            failures = self._failures[name] = self._failures.get(name, 0) + 1
+            if failures <= self.confirm_streak:
+                self._interval[name] = self.min_interval
+            else:
+                self._interval[name] = min(self.base, max(self.min_interval, before) * self.backoff)
+        else:
+            self._failures[name] = 0
+            streak = self._streak[name] = self._streak.get(name, 0) + 1
+            if before < self.base:
+                self._interval[name] = min(self.base, before * 2)
+            elif streak >= self.healthy_streak:
+                self._interval[name] = min(self.max_interval, before * self.backoff)
+        return self._interval.get(name, self.base) < before
+
+    def forget(self, name):
+        self._interval.pop(name, None)
+        self._streak.pop(name, None)
+        self._failures.pop(name, None)
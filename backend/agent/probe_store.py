@@ -0,0 +1,370 @@
+# backend/agent/probe_store.py
+import array
+import datetime
+import json
+import os
+import sys
+import time
+
+STATUS_CRASHED = -1   # probe failed (timeout, refused, bad body)
+STATUS_MISSING = -2   # status_code was None
+LATENCY_MISSING = 0xFFFFFFFF
+BODY_NONE = 0
+INCIDENT_NONE = 0
+
+# column name -> (array typecode, file name)
+COLUMNS = {
+    "timestamp": ("q", "timestamp.i64"),  # epoch microseconds
+    "service": ("H", "service.u16"),      # index into the service table
+    "url": ("H", "url.u16"),              # index into the url table
+    "status": ("h", "status.i16"),        # HTTP status or a STATUS_* sentinel
+    "latency": ("I", "latency.u32"),      # milliseconds or LATENCY_MISSING
+    "body": ("I", "body.u32"),            # index into the response-body table
+    "incident": ("I", "incident.u32"),    # index into the incident-ID table
+}
+# Columns added after stores were already in use. A store without the file
+# reads as all zeros (no incident) until its writer adds it.
+OPTIONAL_COLUMNS = ("incident",)
+STRINGS_FILE = "strings.jsonl"
+META_FILE = "meta.json"
+FORMAT_VERSION = 1
+
+assert array.array("I").itemsize == 4, "probe store needs a 4-byte unsigned int"
+
+
+def to_epoch_us(iso_timestamp):
+    dt = datetime.datetime.fromisoformat(iso_timestamp)
+    return int(round(dt.timestamp() * 1_000_000))
+
+
+def from_epoch_us(epoch_us):
+    seconds, micros = divmod(epoch_us, 1_000_000)
+    return datetime.datetime.fromtimestamp(seconds).replace(microsecond=micros).isoformat()
+
+
+class ProbeStore:
+    """Append-only columnar store for probe history.
+
+    Each column is a flat binary file of fixed-width values, so readers get
+    at any row range with a seek and array.fromfile() — no JSON parsing.
+    Services, URLs, response bodies and the monitor's incident IDs are
+    interned into a small append-only dictionary file (strings.jsonl);
+    repeated exception text is stored once and referenced by index.
+
+    Writers append the dictionary first and the columns second, and readers
+    only trust the shortest column, so a reader never sees a half-written
+    row.
+
+    drop_head() lets retention cut old rows off the front. Rows keep a
+    global number (meta "base" + position), so columns_since() cursors stay
+    valid across a compaction, and the meta "generation" is odd while one
+    is in progress so readers can retry instead of mixing old and new files.
+    """
+
+    def __init__(self, root, create=False):
+        self.root = root
+        if create:
+            os.makedirs(root, exist_ok=True)
+            self._write_meta()
+        elif not os.path.exists(os.path.join(root, META_FILE)):
+            raise FileNotFoundError(f"No probe store at '{root}'")
+
+        self._check_meta()
+        # table name -> list of values, plus reverse index for writers
+        self.tables = {"service": [], "url": [], "body": [None], "incident": [None]}
+        self._index = {"service": {}, "url": {}, "body": {json.dumps(None): BODY_NONE},
+                       "incident": {json.dumps(None): INCIDENT_NONE}}
+        self._strings_offset = 0
+        self._files = {}
+        self.refresh()
+
+    @classmethod
+    def exists(cls, root):
+        return os.path.exists(os.path.join(root, META_FILE))
+
+    # ------------------------------------------------------------
+    # Metadata and dictionary
+    # ------------------------------------------------------------
+    def _write_meta(self):
+        path = os.path.join(self.root, META_FILE)
+        if not os.path.exists(path):
+            with open(path, "w") as f:
+                json.dump({"version": FORMAT_VERSION, "byteorder": sys.byteorder}, f)
+
+    def _read_meta(self):
+        with open(os.path.join(self.root, META_FILE), "r") as f:
+            return json.load(f)
+
+    def _check_meta(self):
+        meta = self._read_meta()
+        if meta.get("version") != FORMAT_VERSION or meta.get("byteorder") != sys.byteorder:
+            raise ValueError(f"Unsupported probe store format in '{self.root}': {meta}")
+
+    def _update_meta(self, **changes):
+        meta = dict(self._read_meta(), **changes)
+        path = os.path.join(self.root, META_FILE)
+        with open(path + ".tmp", "w") as f:
+            json.dump(meta, f)
+        os.replace(path + ".tmp", path)
+        return meta
+
+    def compacted_before(self):
+        """Epoch microseconds before which rows have been dropped (0 if never compacted)."""
+        return self._read_meta().get("compacted_before", 0)
+
+    def refresh(self):
+        """Load dictionary entries appended since the last refresh."""
+        path = os.path.join(self.root, STRINGS_FILE)
+        if not os.path.exists(path):
+            return
+        with open(path, "rb") as f:
+            f.seek(self._strings_offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            entry = json.loads(line)
+            table = entry["t"]
+            key = json.dumps(entry["v"])
+            self._index[table][key] = len(self.tables[table])
+            self.tables[table].append(entry["v"])
+        self._strings_offset += end
+
+    @property
+    def services(self):
+        return self.tables["service"]
+
+    def service_id(self, name):
+        return self._index["service"].get(json.dumps(name))
+
+    def _intern(self, table, value, new_entries):
+        key = json.dumps(value)
+        idx = self._index[table].get(key)
+        if idx is None:
+            idx = len(self.tables[table])
+            self._index[table][key] = idx
+            self.tables[table].append(value)
+            new_entries.append(json.dumps({"t": table, "v": value}) + "\n")
+        return idx
+
+    # ------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------
+    def _add_missing_columns(self):
+        """Give a store from before OPTIONAL_COLUMNS existed zero-filled files for them."""
+        for name in OPTIONAL_COLUMNS:
+            code, filename = COLUMNS[name]
+            path = os.path.join(self.root, filename)
+            if os.path.exists(path):
+                continue
+            with open(path + ".tmp", "wb") as f:
+                array.array(code, bytes(len(self) * array.array(code).itemsize)).tofile(f)
+            os.replace(path + ".tmp", path)
+
+    def append(self, records):
+        """Append a batch of monitor log entries (dicts in logs.json format)."""
+        cols = {name: array.array(code) for name, (code, _) in COLUMNS.items()}
+        new_entries = []
+
+        for r in records:
+            status = r.get("status_code")
+            if status == "CRASHED":
+                status = STATUS_CRASHED
+            elif status is None:
+                status = STATUS_MISSING
+            latency = r.get("latency_ms")
+
+            cols["timestamp"].append(to_epoch_us(r["timestamp"]))
+            cols["service"].append(self._intern("service", r["service"], new_entries))
+            cols["url"].append(self._intern("url", r.get("url"), new_entries))
+            cols["status"].append(int(status))
+            cols["latency"].append(LATENCY_MISSING if latency is None else min(int(latency), LATENCY_MISSING - 1))
+            cols["body"].append(self._intern("body", r.get("response_body"), new_entries))
+            cols["incident"].append(self._intern("incident", r.get("incident_id"), new_entries))
+
+        if new_entries:
+            with open(os.path.join(self.root, STRINGS_FILE), "a") as f:
+                f.write("".join(new_entries))
+            self._strings_offset = os.path.getsize(os.path.join(self.root, STRINGS_FILE))
+
+        if not self._files:
+            self._add_missing_columns()
+        for name, (_, filename) in COLUMNS.items():
+            f = self._files.get(name)
+            if f is None:
+                f = self._files[name] = open(os.path.join(self.root, filename), "ab")
+            cols[name].tofile(f)
+            f.flush()
+
+    def sync(self):
+        for f in self._files.values():
+            os.fsync(f.fileno())
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+        self._files = {}
+
+    # ------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------
+    def __len__(self):
+        rows = None
+        for name, (code, filename) in COLUMNS.items():
+            try:
+                size = os.path.getsize(os.path.join(self.root, filename))
+            except FileNotFoundError:
+                if name in OPTIONAL_COLUMNS:
+                    continue
+                return 0
+            n = size // array.array(code).itemsize
+            rows = n if rows is None else min(rows, n)
+        return rows or 0
+
+    def columns(self, start=0, stop=None, names=None):
+        """Return {column: array} for rows [start, stop)."""
+        total = len(self)
+        stop = total if stop is None else min(stop, total)
+        start = max(0, min(start, stop))
+        count = stop - start
+
+        out = {}
+        for name in names or COLUMNS:
+            code, filename = COLUMNS[name]
+            col = array.array(code)
+            path = os.path.join(self.root, filename)
+            if count and name in OPTIONAL_COLUMNS and not os.path.exists(path):
+                col = array.array(code, bytes(count * col.itemsize))
+            elif count:
+                with open(path, "rb") as f:
+                    f.seek(start * col.itemsize)
+                    col.fromfile(f, count)
+            out[name] = col
+        return out
+
+    def columns_since(self, cursor=None):
+        """Columns for rows appended after `cursor`, plus the cursor to pass next time.
+
+        Cursors are global row numbers. Rows dropped by a compaction since
+        the last call are skipped; a cursor past the end (the store was
+        recreated) starts over from the first row.
+        """
+        cursor = cursor or 0
+        while True:
+            meta = self._read_meta()
+            if meta.get("generation", 0) % 2:
+                time.sleep(0.01)   # drop_head() in progress
+                continue
+            base = meta.get("base", 0)
+            # Row count first: the dictionary is always written ahead of the rows
+            # that reference it, so refreshing afterwards covers every new id.
+            total = len(self)
+            self.refresh()
+            start = max(0, cursor - base)
+            if start > total:
+                start = 0
+            cols = self.columns(start, total)
+            if self._read_meta().get("generation", 0) == meta.get("generation", 0):
+                return cols, base + total
+
+    def drop_head(self, rows, compacted_before=None):
+        """Remove the first `rows` rows. Must not run concurrently with append()."""
+        total = len(self)
+        rows = min(rows, total)
+        if rows <= 0:
+            return 0
+        self.close()
+        self._add_missing_columns()
+        meta = self._read_meta()
+        generation = meta.get("generation", 0)
+        self._update_meta(generation=generation + 1)
+        changes = {"generation": generation + 2}
+        try:
+            for name, (code, filename) in COLUMNS.items():
+                # Read straight from the file: once the first column is
+                # replaced, len(self) (the shortest column) no longer applies.
+                path = os.path.join(self.root, filename)
+                col = array.array(code)
+                with open(path, "rb") as f:
+                    f.seek(rows * col.itemsize)
+                    col.fromfile(f, total - rows)
+                with open(path + ".tmp", "wb") as f:
+                    col.tofile(f)
+                os.replace(path + ".tmp", path)
+            changes["base"] = meta.get("base", 0) + rows
+            if compacted_before is not None:
+                changes["compacted_before"] = max(compacted_before, meta.get("compacted_before", 0))
+        finally:
+            # Even on failure, never leave readers waiting on an odd generation.
+            self._update_meta(**changes)
+        return rows
+
+    def records(self, start=0, stop=None):
+        """Decode rows [start, stop) back into logs.json-style dicts."""
+        self.refresh()
+        cols = self.columns(start, stop)
+        services, urls, bodies = self.tables["service"], self.tables["url"], self.tables["body"]
+        incidents = self.tables["incident"]
+
+        for i in range(len(cols["timestamp"])):
+            status = cols["status"][i]
+            latency = cols["latency"][i]
+            record = {
+                "service": services[cols["service"][i]],
+                "url": urls[cols["url"][i]],
+                "timestamp": from_epoch_us(cols["timestamp"][i]),
+                "status_code": "CRASHED" if status == STATUS_CRASHED else (None if status == STATUS_MISSING else status),
+                "response_body": bodies[cols["body"][i]],
+                "latency_ms": None if latency == LATENCY_MISSING else latency,
+            }
+            if cols["incident"][i] != INCIDENT_NONE:
+                record["incident_id"] = incidents[cols["incident"][i]]
+            yield record
+
+    def tail(self, n):
+        """The last n rows as logs.json-style dicts."""
+        total = len(self)
+        return list(self.records(max(0, total - n), total))
+
+    def export_jsonl(self, out_path, start=0, stop=None):
+        """Write rows as JSON lines in the same format monitor.py used to log."""
+        count = 0
+        with open(out_path, "w") as f:
+            for record in self.records(start, stop):
+                f.write(json.dumps(record) + "\n")
+                count += 1
+        return count
+
+
+def import_jsonl(jsonl_path, store):
+    """Load an existing logs.json into a probe store, skipping malformed lines."""
+    batch = []
+    with open(jsonl_path, "r") as f:
+        for line in f:
+            try:
+                batch.append(json.loads(line))
+            except ValueError:
+                continue
+            if len(batch) >= 10000:
+                store.append(batch)
+                batch = []
+    if batch:
+        store.append(batch)
+
+
+# ------------------------------------------------------------
+# 🏁 Entry Point
+# ------------------------------------------------------------
+if __name__ == "__main__":
+    if len(sys.argv) < 4 or sys.argv[1] not in ("export", "import"):
+        print("Usage: python probe_store.py export <store_dir> <out.json>")
+        print("       python probe_store.py import <logs.json> <store_dir>")
+        sys.exit(1)
+
+    if sys.argv[1] == "export":
+        n = ProbeStore(sys.argv[2]).export_jsonl(sys.argv[3])
+        print(f"Exported {n} probes to {sys.argv[3]}")
+    else:
+        store = ProbeStore(sys.argv[3], create=True)
+        import_jsonl(sys.argv[2], store)
+        store.close()
+        print(f"Imported {len(store)} probes into {sys.argv[3]}")
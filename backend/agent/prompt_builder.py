@@ -0,0 +1,140 @@
+# backend/agent/prompt_builder.py
+import json
+import re
+import threading
+from collections import Counter
+
+from rules import failure_streak
+
+# Rough chars-per-token ratio for English/JSON text, used to estimate prompt size.
+CHARS_PER_TOKEN = 4
+
+_EXCEPTION_NAME = re.compile(r"\b([A-Z][A-Za-z]*(?:Error|Exception|Timeout))\b")
+
+
+def error_class(record):
+    """Short class for a failed probe: 'Timeout', 'ClientConnectorError', 'HTTP 500', ..."""
+    status = record.get("status_code")
+    if status == "CRASHED":
+        body = str(record.get("response_body") or "")
+        if "timed out" in body.lower():
+            return "Timeout"
+        match = _EXCEPTION_NAME.search(body)
+        return match.group(1) if match else "Crashed"
+    if status is None:
+        return "NoStatus"
+    return f"HTTP {status}"
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    k = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+def service_digest(service, records, host_status=None, anomaly=None):
+    """One line summarising a service's probe window.
+
+    e.g. 'payment probes=15 status=200:9,500:3,CRASHED:3 streak=3
+    p50=120 p95=2400 max=2900 last_error=Timeout host=impaired'; the host
+    field (the EC2 status checks) is only present when known, and
+    'baseline=<ms> z=<score>' only when latency has drifted (`anomaly`, a
+    latency_stats entry).
+    """
+    statuses = Counter(str(r.get("status_code")) for r in records)
+    histogram = ",".join(f"{status}:{count}" for status, count in sorted(statuses.items()))
+    latencies = sorted(r["latency_ms"] for r in records if r.get("latency_ms") is not None)
+    last_error = next((error_class(r) for r in reversed(records) if r.get("status_code") != 200), "none")
+
+    fields = [
+        service,
+        f"probes={len(records)}",
+        f"status={histogram or 'none'}",
+        f"streak={failure_streak(records)}",
+    ]
+    if latencies:
+        fields += [f"p50={_percentile(latencies, 50)}", f"p95={_percentile(latencies, 95)}", f"max={latencies[-1]}"]
+    else:
+        fields.append("latency=none")
+    fields.append(f"last_error={last_error}")
+    if host_status:
+        fields.append(f"host={host_status}")
+    if anomaly:
+        fields += [f"baseline={round(anomaly['baseline_ms'])}", f"z={anomaly['z']}"]
+    return " ".join(fields)
+
+
+def build_digest(window, host_status=None, anomalies=None):
+    """Render a {service: [records]} window as one digest line per service.
+
+    `host_status` optionally maps services to their host's EC2 status, and
+    `anomalies` to their latency_stats entry if latency has drifted.
+    """
+    host_status = host_status or {}
+    anomalies = anomalies or {}
+    return "".join(service_digest(service, records, host_status.get(service), anomalies.get(service)) + "\n"
+                   for service, records in sorted(window.items()))
+
+
+def chunk_window(window, size):
+    """Split a window into sub-windows of at most `size` services each."""
+    services = sorted(window)
+    return [{service: window[service] for service in services[i:i + size]}
+            for i in range(0, len(services), size)]
+
+
+def parse_batch_reply(text, services):
+    """Validate a batched model reply into a list of per-service action dicts.
+
+    Accepts {"actions": [...]}, a bare list, or a single action object.
+    Entries for services not in `services`, unknown actions and duplicates
+    are dropped; raises ValueError if the reply isn't usable at all.
+    """
+    reply = json.loads(text)
+    if isinstance(reply, dict):
+        reply = reply.get("actions", [reply])
+    if not isinstance(reply, list):
+        raise ValueError(f"Expected a list of actions, got {type(reply).__name__}")
+
+    actions, seen = [], set()
+    for entry in reply:
+        if not isinstance(entry, dict):
+            continue
+        action = entry.get("action")
+        service = entry.get("service_name")
+        if action == "none" and service is None:
+            continue  # fleet-wide "nothing to do"
+        if action not in ("restart", "none") or service not in services or service in seen:
+            continue
+        seen.add(service)
+        actions.append({"action": action, "service_name": service,
+                        "reason": str(entry.get("reason", ""))})
+    return actions
+
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+class TokenMeter:
+    """Running token totals for model calls.
+
+    record() takes the prompt-size estimate made before the call and the
+    `usage` block Bedrock returns with the response (which may be missing,
+    e.g. on errors), so the two can be compared over time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "input_tokens": 0, "output_tokens": 0,
+                      "estimated_input_tokens": 0, "services": 0}
+
+    def record(self, estimated_input, usage=None, services=0):
+        usage = usage or {}
+        with self._lock:
+            self.stats["calls"] += 1
+            self.stats["estimated_input_tokens"] += estimated_input
+            self.stats["input_tokens"] += usage.get("input_tokens", 0)
+            self.stats["output_tokens"] += usage.get("output_tokens", 0)
+            self.stats["services"] += services
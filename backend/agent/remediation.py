@@ -0,0 +1,126 @@
+# backend/agent/remediation.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+class NotSupervised(Exception):
+    """Raised by a restart_fn for a service it has no way to restart."""
+
+
+class RemediationExecutor:
+    """Runs restarts on a worker pool with at most one remediation per service.
+
+    submit() returns immediately. A service that is already being restarted
+    is skipped rather than queued twice. Each attempt calls
+    restart_fn(service, incident) and then polls the service's /health
+    until it answers 200; failed attempts are retried with exponential
+    backoff. A restart_fn that raises NotSupervised ends the remediation
+    at once, since retrying cannot help. on_complete(service, ok, attempts,
+    duration_s, incident) is called when a remediation finishes either way;
+    ok is None for an unsupervised service. `incident` is the
+    correlation ID given to submit(); with a tracing.Tracer the executor
+    emits "remediate", "health_check" and "backoff" spans for it.
+    """
+
+    def __init__(self, restart_fn, health_url_for, on_complete=None, max_workers=8,
+                 max_attempts=3, base_backoff=1.0, health_timeout=30.0, health_poll=0.5,
+                 tracer=None):
+        self.restart_fn = restart_fn
+        self.health_url_for = health_url_for
+        self.on_complete = on_complete
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.health_timeout = health_timeout
+        self.health_poll = health_poll
+        self.tracer = tracer
+
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="remediation")
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self.stats = {"submitted": 0, "skipped_in_flight": 0, "succeeded": 0,
+                      "failed": 0, "unsupervised": 0, "retries": 0}
+
+    def _lock_for(self, service):
+        with self._locks_guard:
+            lock = self._locks.get(service)
+            if lock is None:
+                lock = self._locks[service] = threading.Lock()
+            return lock
+
+    def in_flight(self):
+        with self._locks_guard:
+            return {service for service, lock in self._locks.items() if lock.locked()}
+
+    def submit(self, service, incident=None):
+        """Start remediating a service; returns False if one is already running."""
+        lock = self._lock_for(service)
+        if not lock.acquire(blocking=False):
+            self.stats["skipped_in_flight"] += 1
+            print(f"Restart of {service} already in progress; skipping.")
+            return False
+        self.stats["submitted"] += 1
+        self._pool.submit(self._run, service, lock, incident)
+        return True
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
+
+    def _trace(self, incident, stage, start, **attrs):
+        if self.tracer is not None:
+            self.tracer.emit(incident, stage, start, **attrs)
+
+    def _run(self, service, lock, incident=None):
+        start = time.monotonic()
+        started = time.time()
+        ok = False
+        attempts = 0
+        try:
+            while attempts < self.max_attempts:
+                if attempts:
+                    self.stats["retries"] += 1
+                    backoff_start = time.time()
+                    time.sleep(self.base_backoff * 2 ** (attempts - 1))
+                    self._trace(incident, "backoff", backoff_start, service=service, attempt=attempts + 1)
+                attempts += 1
+                try:
+                    if self.restart_fn(service, incident) is False:
+                        continue
+                except NotSupervised as e:
+                    print(f"Not restarting {service}: {e}")
+                    ok = None
+                    break
+                except Exception as e:
+                    print(f"Restart attempt {attempts} for {service} failed: {e}")
+                    continue
+                check_start = time.time()
+                ok = self._wait_healthy(service)
+                self._trace(incident, "health_check", check_start, service=service, attempt=attempts, ok=ok)
+                if ok:
+                    break
+        finally:
+            lock.release()
+
+        self.stats["unsupervised" if ok is None else "succeeded" if ok else "failed"] += 1
+        self._trace(incident, "remediate", started, service=service, ok=ok, attempts=attempts)
+        if self.on_complete:
+            try:
+                self.on_complete(service, ok, attempts, time.monotonic() - start, incident)
+            except Exception as e:
+                print(f"Remediation callback failed for {service}: {e}")
+
+    def _wait_healthy(self, service):
+        url = self.health_url_for(service)
+        if not url:
+            return False
+        deadline = time.monotonic() + self.health_timeout
+        while time.monotonic() < deadline:
+            try:
+                if requests.get(url, timeout=min(2.0, self.health_timeout)).status_code == 200:
+                    return True
+            except requests.exceptions.RequestException:
+                pass
+            time.sleep(self.health_poll)
+        return False
@@ -0,0 +1,452 @@
+# backend/agent/retention.py
+import datetime
+import glob
+import gzip
+import json
+import os
+import time
+
+import numpy as np
+
+from log_writer import read_manifest, write_manifest
+from merged_store import SHARDS_DIRNAME
+from probe_store import STATUS_CRASHED, STATUS_MISSING, LATENCY_MISSING
+
+ROLLUP_DIRNAME = "rollups"
+ARCHIVE_DIRNAME = "archive"
+ROLLUP_SECONDS = 60
+
+
+def _epoch(iso_timestamp):
+    return datetime.datetime.fromisoformat(iso_timestamp).timestamp() if iso_timestamp else None
+
+
+def _day(epoch_seconds):
+    return time.strftime("%Y-%m-%d", time.gmtime(epoch_seconds))
+
+
+def _open_text(path):
+    return gzip.open(path, "rt") if path.endswith(".gz") else open(path, "r")
+
+
+def _status_key(status):
+    if status == STATUS_CRASHED:
+        return "CRASHED"
+    if status == STATUS_MISSING:
+        return "None"
+    return str(status)
+
+
+# ------------------------------------------------------------
+# Per-minute rollups
+# ------------------------------------------------------------
+def rollup_columns(cols, services):
+    """Per-service, per-minute rollup rows for a block of probe store columns."""
+    ts = np.frombuffer(cols["timestamp"], dtype=np.int64)
+    if not len(ts):
+        return []
+    svc = np.frombuffer(cols["service"], dtype=np.uint16).astype(np.int64)
+    status = np.frombuffer(cols["status"], dtype=np.int16)
+    latency = np.frombuffer(cols["latency"], dtype=np.uint32).astype(np.float64)
+
+    minute = ts // (ROLLUP_SECONDS * 1_000_000)
+    keys, group = np.unique(np.stack([svc, minute]), axis=1, return_inverse=True)
+    group = group.ravel()
+    n = keys.shape[1]
+
+    probes = np.bincount(group, minlength=n)
+    errors = np.bincount(group, weights=status != 200, minlength=n)
+    crashed = np.bincount(group, weights=status == STATUS_CRASHED, minlength=n)
+    has_latency = latency != LATENCY_MISSING
+    lat_count = np.bincount(group[has_latency], minlength=n)
+    lat_sum = np.bincount(group[has_latency], weights=latency[has_latency], minlength=n)
+    lat_min = np.full(n, np.inf)
+    lat_max = np.full(n, -np.inf)
+    np.minimum.at(lat_min, group[has_latency], latency[has_latency])
+    np.maximum.at(lat_max, group[has_latency], latency[has_latency])
+
+    by_status = [{} for _ in range(n)]
+    pairs, counts = np.unique(np.stack([group, status.astype(np.int64)]), axis=1, return_counts=True)
+    for (g, code), count in zip(pairs.T, counts):
+        by_status[g][_status_key(code)] = int(count)
+
+    rows = []
+    for i in range(n):
+        has = lat_count[i] > 0
+        rows.append({
+            "service": services[keys[0, i]],
+            "minute": int(keys[1, i]) * ROLLUP_SECONDS,
+            "probes": int(probes[i]),
+            "errors": int(errors[i]),
+            "crashed": int(crashed[i]),
+            "status": by_status[i],
+            "latency_min": int(lat_min[i]) if has else None,
+            "latency_mean": round(lat_sum[i] / lat_count[i], 1) if has else None,
+            "latency_max": int(lat_max[i]) if has else None,
+        })
+    return rows
+
+
+class RollupStore:
+    """Per-minute probe rollups in one gzip JSON-lines file per UTC day.
+
+    Each append adds a gzip member to the day's file, which gzip readers
+    treat as one stream. Totals for whole days are cached by file size, so
+    a long-range query only decompresses the days at its edges.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._day_totals = {}   # path -> (size, {service: [probes, errors, crashed]})
+
+    def _path(self, day):
+        return os.path.join(self.root, f"{day}.jsonl.gz")
+
+    def days(self):
+        return sorted(os.path.basename(p)[:-len(".jsonl.gz")] for p in glob.glob(self._path("*")))
+
+    def append(self, rows):
+        by_day = {}
+        for row in rows:
+            by_day.setdefault(_day(row["minute"]), []).append(row)
+        if by_day:
+            os.makedirs(self.root, exist_ok=True)
+        for day, day_rows in by_day.items():
+            with gzip.open(self._path(day), "at") as f:
+                f.write("".join(json.dumps(row) + "\n" for row in day_rows))
+        return len(rows)
+
+    def rows(self, since=None, until=None, services=None):
+        """Rollup rows for minutes overlapping [since, until) (epoch seconds)."""
+        for day in self.days():
+            if since is not None and day < _day(since - ROLLUP_SECONDS):
+                continue
+            if until is not None and day > _day(until):
+                break
+            for row in self._read(self._path(day)):
+                if since is not None and row["minute"] + ROLLUP_SECONDS <= since:
+                    continue
+                if until is not None and row["minute"] >= until:
+                    continue
+                if services is None or row["service"] in services:
+                    yield row
+
+    @staticmethod
+    def _read(path):
+        with gzip.open(path, "rt") as f:
+            try:
+                for line in f:
+                    yield json.loads(line)
+            except EOFError:
+                pass   # a member still being appended by the monitor
+
+    def _whole_day(self, day):
+        path = self._path(day)
+        size = os.path.getsize(path)
+        cached = self._day_totals.get(path)
+        if cached is None or cached[0] != size:
+            totals = {}
+            for row in self._read(path):
+                t = totals.setdefault(row["service"], [0, 0, 0])
+                t[0] += row["probes"]
+                t[1] += row["errors"]
+                t[2] += row["crashed"]
+            cached = self._day_totals[path] = (size, totals)
+        return cached[1]
+
+    def error_counts(self, since, until, services=None):
+        """{service: [probes, errors, crashed]} over [since, until) in epoch seconds."""
+        out = {}
+
+        def add(service, probes, errors, crashed):
+            if services is None or service in services:
+                t = out.setdefault(service, [0, 0, 0])
+                t[0] += probes
+                t[1] += errors
+                t[2] += crashed
+
+        first, last = _day(since - ROLLUP_SECONDS), _day(until)
+        for day in self.days():
+            if day < first or day > last:
+                continue
+            day_start = datetime.datetime.strptime(day, "%Y-%m-%d").replace(
+                tzinfo=datetime.timezone.utc).timestamp()
+            if since <= day_start and day_start + 86400 <= until:
+                for service, (probes, errors, crashed) in self._whole_day(day).items():
+                    add(service, probes, errors, crashed)
+            else:
+                for row in self.rows(max(since, day_start), min(until, day_start + 86400)):
+                    add(row["service"], row["probes"], row["errors"], row["crashed"])
+        return out
+
+    def expire(self, before):
+        """Delete whole days older than `before` (epoch seconds)."""
+        removed = 0
+        for day in self.days():
+            if day < _day(before):
+                os.remove(self._path(day))
+                self._day_totals.pop(self._path(day), None)
+                removed += 1
+        return removed
+
+
+class RollupView:
+    """Read-only union of the rollups under a data directory (single monitor or shards)."""
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self._stores = {}
+
+    def stores(self):
+        roots = [os.path.join(self.data_dir, ROLLUP_DIRNAME)]
+        roots += glob.glob(os.path.join(self.data_dir, SHARDS_DIRNAME, "*", ROLLUP_DIRNAME))
+        for root in roots:
+            if root not in self._stores and os.path.isdir(root):
+                self._stores[root] = RollupStore(root)
+        return list(self._stores.values())
+
+    def error_counts(self, since, until, services=None):
+        out = {}
+        for store in self.stores():
+            for service, counts in store.error_counts(since, until, services).items():
+                t = out.setdefault(service, [0, 0, 0])
+                for i, c in enumerate(counts):
+                    t[i] += c
+        return out
+
+
+class ArchiveView:
+    """Raw probes that compaction moved to archive/ (single monitor or shards).
+
+    records() answers the same question as ProbeHistory.window() for the
+    compacted range. Only segments whose time range overlaps the query are
+    opened.
+    """
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+
+    def dirs(self):
+        dirs = [os.path.join(self.data_dir, ARCHIVE_DIRNAME)]
+        dirs += glob.glob(os.path.join(self.data_dir, SHARDS_DIRNAME, "*", ARCHIVE_DIRNAME))
+        return [d for d in dirs if os.path.isdir(d)]
+
+    def records(self, service, since, until):
+        """logs.json-style records for `service` with since <= timestamp < until, oldest first."""
+        out = []
+        for archive_dir in self.dirs():
+            for entry in read_manifest(archive_dir):
+                first, last = _epoch(entry.get("first_timestamp")), _epoch(entry.get("last_timestamp"))
+                if (last is not None and last < since) or (first is not None and first >= until):
+                    continue
+                try:
+                    f = _open_text(os.path.join(archive_dir, entry["file"]))
+                except FileNotFoundError:
+                    continue   # expired since the manifest was read
+                with f:
+                    for line in f:
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            continue
+                        if record.get("service") == service and since <= _epoch(record["timestamp"]) < until:
+                            out.append(record)
+        out.sort(key=lambda r: _epoch(r["timestamp"]))
+        return out
+
+
+# ------------------------------------------------------------
+# Segments (closed JSON-lines files listed in a manifest)
+# ------------------------------------------------------------
+def rotate_log(path, segment_dir, prefix, max_age=86400, max_bytes=16 * 1024 * 1024):
+    """Move a JSON-lines log into segment_dir once it is too big or its first record too old.
+
+    The writer simply opens `path` again and starts a fresh file. Returns
+    True if the log was rotated.
+    """
+    try:
+        size = os.path.getsize(path)
+    except FileNotFoundError:
+        return False
+    if size == 0:
+        return False
+
+    records, first_ts, last_ts = 0, None, None
+    with open(path, "r") as f:
+        for line in f:
+            try:
+                ts = json.loads(line).get("timestamp")
+            except ValueError:
+                continue
+            records += 1
+            if ts:
+                first_ts = min(first_ts or ts, ts)
+                last_ts = max(last_ts or ts, ts)
+    first = _epoch(first_ts)
+    if size < max_bytes and (first is None or time.time() - first < max_age):
+        return False
+
+    os.makedirs(segment_dir, exist_ok=True)
+    segments = read_manifest(segment_dir)
+    seq = segments[-1]["seq"] + 1 if segments else 1
+    name = f"{prefix}-{seq:06d}.json"
+    os.replace(path, os.path.join(segment_dir, name))
+    segments.append({"seq": seq, "file": name, "records": records, "bytes": size,
+                     "first_timestamp": first_ts, "last_timestamp": last_ts})
+    write_manifest(segment_dir, segments)
+    return True
+
+
+def compress_segments(segment_dir, before):
+    """Gzip closed segments whose last record is older than `before` (epoch seconds)."""
+    segments = read_manifest(segment_dir)
+    compressed = 0
+    for entry in segments:
+        last = _epoch(entry.get("last_timestamp"))
+        if entry["file"].endswith(".gz") or last is None or last >= before:
+            continue
+        src = os.path.join(segment_dir, entry["file"])
+        dst = src + ".gz"
+        with open(src, "rb") as fin, gzip.open(dst + ".tmp", "wb") as fout:
+            while True:
+                block = fin.read(1024 * 1024)
+                if not block:
+                    break
+                fout.write(block)
+        os.replace(dst + ".tmp", dst)
+        # Manifest first, so a reader never looks for a file that's gone.
+        entry["file"] = os.path.basename(dst)
+        entry["compressed_bytes"] = os.path.getsize(dst)
+        write_manifest(segment_dir, segments)
+        os.remove(src)
+        compressed += 1
+    return compressed
+
+
+def expire_segments(segment_dir, before):
+    """Drop segments whose last record is older than `before` (epoch seconds)."""
+    segments = read_manifest(segment_dir)
+    keep = [e for e in segments if (_epoch(e.get("last_timestamp")) or before) >= before]
+    if len(keep) == len(segments):
+        return 0
+    write_manifest(segment_dir, keep)
+    for entry in segments:
+        if entry not in keep:
+            try:
+                os.remove(os.path.join(segment_dir, entry["file"]))
+            except FileNotFoundError:
+                pass
+    return len(segments) - len(keep)
+
+
+def read_segments(segment_dir, active_path=None, since=None):
+    """Records from a log's closed segments (plain or gzip), then its active file, oldest first.
+
+    Segments that end before `since` (epoch seconds) are skipped without
+    being opened.
+    """
+    paths = []
+    for entry in read_manifest(segment_dir):
+        last = _epoch(entry.get("last_timestamp"))
+        if since is None or last is None or last >= since:
+            paths.append(os.path.join(segment_dir, entry["file"]))
+    if active_path and os.path.exists(active_path):
+        paths.append(active_path)
+
+    for path in paths:
+        try:
+            f = _open_text(path)
+        except FileNotFoundError:
+            continue   # compressed or expired since the manifest was read
+        with f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if since is None or (_epoch(record.get("timestamp")) or since) >= since:
+                    yield record
+
+
+# ------------------------------------------------------------
+# Probe store compaction
+# ------------------------------------------------------------
+def _first_row_at_or_after(store, cutoff_us, chunk=65536):
+    """Row index of the first probe at or after cutoff_us, reading only the cold prefix."""
+    total = len(store)
+    pos = 0
+    while pos < total:
+        ts = np.frombuffer(store.columns(pos, pos + chunk, names=["timestamp"])["timestamp"], dtype=np.int64)
+        hit = np.flatnonzero(ts >= cutoff_us)
+        if hit.size:
+            return pos + int(hit[0])
+        pos += len(ts)
+    return total
+
+
+class ProbeCompactor:
+    """Retention for a monitor's probe store, run on its LogWriter thread.
+
+    Rows older than `hot_window` seconds (cut at a minute boundary) are
+    rolled up per service and minute into rollups/, written as raw records
+    to a gzip segment in archive/, and dropped from the store, so readers
+    only ever scan the hot window. Archives and closed JSON-lines segments
+    older than `archive_days` are deleted, and rollups after `rollup_days`.
+    The directories sit next to the store, so a sharded monitor's workers
+    each compact their own shard.
+    """
+
+    def __init__(self, hot_window=6 * 3600, archive_days=30, rollup_days=365, segment_dir=None):
+        self.hot_window = hot_window
+        self.archive_days = archive_days
+        self.rollup_days = rollup_days
+        self.segment_dir = segment_dir
+        self.stats = {"runs": 0, "rows_dropped": 0, "rollup_rows": 0, "last_run_ms": 0.0}
+
+    def __call__(self, store):
+        start = time.perf_counter()
+        now = time.time()
+        base_dir = os.path.dirname(os.path.abspath(store.root))
+        archive_dir = os.path.join(base_dir, ARCHIVE_DIRNAME)
+        rollups = RollupStore(os.path.join(base_dir, ROLLUP_DIRNAME))
+
+        cutoff = int(now - self.hot_window) // ROLLUP_SECONDS * ROLLUP_SECONDS
+        cut = _first_row_at_or_after(store, cutoff * 1_000_000)
+        if cut:
+            store.refresh()
+            self.stats["rollup_rows"] += rollups.append(rollup_columns(store.columns(0, cut), store.services))
+            self._archive(store, cut, archive_dir)
+            store.drop_head(cut, compacted_before=cutoff * 1_000_000)
+            self.stats["rows_dropped"] += cut
+
+        expire_before = now - self.archive_days * 86400
+        expire_segments(archive_dir, expire_before)
+        if self.segment_dir and os.path.isdir(self.segment_dir):
+            compress_segments(self.segment_dir, cutoff)
+            expire_segments(self.segment_dir, expire_before)
+        rollups.expire(now - self.rollup_days * 86400)
+
+        self.stats["runs"] += 1
+        self.stats["last_run_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        if cut:
+            print(f"Compacted {cut} probes older than {datetime.datetime.fromtimestamp(cutoff).isoformat()} "
+                  f"in {self.stats['last_run_ms']} ms")
+
+    @staticmethod
+    def _archive(store, rows, archive_dir):
+        os.makedirs(archive_dir, exist_ok=True)
+        segments = read_manifest(archive_dir)
+        seq = segments[-1]["seq"] + 1 if segments else 1
+        name = f"probes-{seq:06d}.json.gz"
+        path = os.path.join(archive_dir, name)
+
+        first_ts = last_ts = None
+        with gzip.open(path + ".tmp", "wt") as f:
+            for record in store.records(0, rows):
+                f.write(json.dumps(record) + "\n")
+                first_ts = min(first_ts or record["timestamp"], record["timestamp"])
+                last_ts = max(last_ts or record["timestamp"], record["timestamp"])
+        os.replace(path + ".tmp", path)
+        segments.append({"seq": seq, "file": name, "records": rows, "bytes": os.path.getsize(path),
+                         "first_timestamp": first_ts, "last_timestamp": last_ts})
+        write_manifest(archive_dir, segments)
@@ -0,0 +1,141 @@
+# backend/agent/rules.py
+VERDICT_HEALTHY = "healthy"
+VERDICT_RESTART = "restart"
+VERDICT_AMBIGUOUS = "ambiguous"
+
+DEFAULT_THRESHOLDS = {
+    "crash_streak": 3,           # trailing CRASHED probes that force a restart
+    "min_probes": 3,             # fewer probes than this is never "clearly" anything
+    "healthy_error_ratio": 0.0,  # at or below: healthy (if latency is fine too)
+    "restart_error_ratio": 0.9,  # at or above: restart without asking the model
+    "latency_ms": 2000,          # any successful probe slower than this is suspect
+    "fallback_streak": 2,        # without the model: trailing failures that warrant a restart
+    "fallback_error_ratio": 0.5, # without the model: error ratio that warrants a restart
+}
+
+
+def crash_streak(records):
+    """Number of consecutive CRASHED probes at the end of a window."""
+    streak = 0
+    for r in reversed(records):
+        if r.get("status_code") != "CRASHED":
+            break
+        streak += 1
+    return streak
+
+
+def failure_streak(records):
+    """Consecutive non-200 probes at the end of a window."""
+    streak = 0
+    for r in reversed(records):
+        if r.get("status_code") == 200:
+            break
+        streak += 1
+    return streak
+
+
+class RuleEngine:
+    """Deterministic first pass over a log window that settles the obvious cases.
+
+    Every service is classified as healthy, needing a restart, or ambiguous.
+    Only windows with at least one ambiguous service (and nothing to
+    restart) need to go to the model.
+    """
+
+    def __init__(self, thresholds=None, overrides=None):
+        self.thresholds = dict(DEFAULT_THRESHOLDS, **(thresholds or {}))
+        # per-service threshold overrides: {service: {name: value}}
+        self.overrides = overrides or {}
+        self.stats = {"windows": 0, "settled_healthy": 0, "settled_restart": 0,
+                      "escalated": 0, "model_calls_avoided": 0, "fallbacks": 0}
+
+    def _limits(self, service):
+        limits = self.thresholds
+        if service in self.overrides:
+            limits = dict(limits, **self.overrides[service])
+        return limits
+
+    def classify(self, service, records, anomaly=None):
+        """Return (verdict, reason) for one service's probe window.
+
+        `anomaly` is the service's latency_stats entry if its latency has
+        drifted above baseline; such a service is never settled as healthy.
+        """
+        limits = self._limits(service)
+        probes = len(records)
+        if probes == 0:
+            return VERDICT_AMBIGUOUS, "No recent probes."
+
+        streak = crash_streak(records)
+        if streak >= limits["crash_streak"]:
+            return VERDICT_RESTART, f"Service is unresponsive with {streak} consecutive CRASHED logs."
+
+        errors = sum(1 for r in records if r.get("status_code") != 200)
+        ratio = errors / probes
+        if probes >= limits["min_probes"] and ratio >= limits["restart_error_ratio"]:
+            return VERDICT_RESTART, f"Service failed {errors} of its last {probes} health checks."
+
+        slow = sum(1 for r in records if (r.get("latency_ms") or 0) > limits["latency_ms"])
+        if probes >= limits["min_probes"] and ratio <= limits["healthy_error_ratio"] and not slow:
+            if anomaly:
+                return VERDICT_AMBIGUOUS, (f"All checks passed but latency is {anomaly['recent_ms']} ms "
+                                           f"against a {anomaly['baseline_ms']} ms baseline (z={anomaly['z']}).")
+            return VERDICT_HEALTHY, "All recent health checks passed."
+
+        return VERDICT_AMBIGUOUS, f"{errors}/{probes} failed, {slow} slow."
+
+    def triage(self, window, anomalies=None):
+        """Split a {service: [records]} window into settled actions and open cases.
+
+        Returns (actions, ambiguous): a restart action dict for every service
+        that clearly needs one, worst first, and the sub-window of services
+        only the model can judge. Healthy services appear in neither.
+        `anomalies` maps services with drifting latency to their stats.
+        """
+        self.stats["windows"] += 1
+        anomalies = anomalies or {}
+        restarts, ambiguous = [], {}
+        for service, records in window.items():
+            verdict, reason = self.classify(service, records, anomalies.get(service))
+            if verdict == VERDICT_RESTART:
+                restarts.append((service, reason))
+            elif verdict == VERDICT_AMBIGUOUS:
+                ambiguous[service] = records
+
+        # Worst first: the longest crash streak is the most urgent.
+        restarts.sort(key=lambda item: crash_streak(window[item[0]]), reverse=True)
+        actions = [{"action": "restart", "service_name": service, "reason": reason, "source": "rules"}
+                   for service, reason in restarts]
+
+        self.stats["settled_restart"] += len(actions)
+        if ambiguous:
+            self.stats["escalated"] += 1
+        else:
+            self.stats["model_calls_avoided"] += 1
+            if not actions and window:
+                self.stats["settled_healthy"] += 1
+        return actions, ambiguous
+
+    def fallback(self, window):
+        """Local stand-in for the model's answer on ambiguous services.
+
+        Used while Bedrock is unreachable. Leans towards restarting: a
+        service that is still failing or has failed most recent probes is
+        restarted, everything else is left alone.
+        """
+        self.stats["fallbacks"] += 1
+        actions = []
+        for service, records in window.items():
+            limits = self._limits(service)
+            streak = failure_streak(records)
+            errors = sum(1 for r in records if r.get("status_code") != 200)
+            if streak >= limits["fallback_streak"]:
+                actions.append({"action": "restart", "service_name": service, "source": "fallback",
+                                "reason": f"Last {streak} health checks failed (model unavailable)."})
+            elif records and errors / len(records) >= limits["fallback_error_ratio"]:
+                actions.append({"action": "restart", "service_name": service, "source": "fallback",
+                                "reason": f"Service failed {errors} of its last {len(records)} health checks (model unavailable)."})
+            else:
+                actions.append({"action": "none", "service_name": service, "source": "fallback",
+                                "reason": "No clear failure (model unavailable)."})
+        return actions
@@ -0,0 +1,213 @@
+# backend/agent/sharded_monitor.py
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import threading
+import time
+
+import metrics
+import monitor
+from event_channel import EventPublisher, default_address
+from hash_ring import HashRing
+from latency_stats import LatencyStats, stats_path
+from log_writer import LogWriter
+from merged_store import shard_store_dir
+from probe_engine import ProbeEngine
+from probe_store import ProbeStore
+from retention import ProbeCompactor
+from tracing import TRACE_FILE, IncidentTracker, Tracer
+
+SUPERVISE_INTERVAL = 5.0  # seconds between liveness / targets-file checks
+
+
+def run_worker(shard_id, targets, control, data_dir, metrics_port=None):
+    """Worker process: probe one shard of the fleet into its own probe store."""
+    # The coordinator owns Ctrl-C and tells workers to stop over `control`.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    probe_metrics = monitor.ProbeMetrics()
+    writer = LogWriter(
+        None,
+        None,
+        flush_interval=monitor.FLUSH_INTERVAL,
+        fsync=monitor.FSYNC_POLICY,
+        store=ProbeStore(shard_store_dir(data_dir, shard_id), create=True),
+        maintenance=ProbeCompactor(hot_window=monitor.HOT_WINDOW, archive_days=monitor.ARCHIVE_DAYS,
+                                   rollup_days=monitor.ROLLUP_DAYS),
+        maintenance_interval=monitor.COMPACT_INTERVAL,
+        flush_duration=probe_metrics.flush_duration,
+    )
+    writer.start()
+    publisher = EventPublisher(default_address(data_dir))
+    publisher.start()
+
+    # Each worker snapshots its own shard; readers merge the sketches.
+    stats = LatencyStats()
+    incidents = IncidentTracker(Tracer(os.path.join(data_dir, TRACE_FILE)))
+
+    def on_result(log_entry):
+        incidents.observe(log_entry)
+        writer.write(log_entry)
+        publisher.publish(log_entry)
+        stats.add(log_entry)
+
+    engine = ProbeEngine(
+        targets,
+        on_result=on_result,
+        interval=monitor.PROBE_INTERVAL,
+        timeout=monitor.PROBE_TIMEOUT,
+        max_in_flight=monitor.MAX_IN_FLIGHT,
+        limit_per_host=monitor.CONNECTIONS_PER_HOST,
+        adaptive=monitor.probe_policy(),
+        probe_duration=probe_metrics.probe_duration,
+        dispatch_lag=probe_metrics.dispatch_lag,
+    )
+    probe_metrics.attach(engine, writer)
+    metrics.serve(probe_metrics.registry, metrics_port)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+
+        def watch_control():
+            while True:
+                message = control.get()
+                if message is None:
+                    loop.call_soon_threadsafe(engine.stop)
+                    return
+                loop.call_soon_threadsafe(engine.set_targets, message)
+
+        threading.Thread(target=watch_control, daemon=True).start()
+        stats_task = asyncio.create_task(monitor.publish_stats(stats, stats_path(data_dir, shard_id)))
+        try:
+            await engine.run()
+        finally:
+            stats_task.cancel()
+
+    print(f"[{shard_id}] probing {len(targets)} targets (pid {os.getpid()})")
+    try:
+        asyncio.run(main())
+    finally:
+        writer.close()
+
+
+class Coordinator:
+    """Splits the target set across worker processes with a consistent hash ring."""
+
+    def __init__(self, targets, workers, data_dir):
+        self.targets = dict(targets)
+        self.data_dir = data_dir
+        self.ring = HashRing([self._shard_name(i) for i in range(workers)])
+        self.assigned = {}  # shard id -> {name: url}
+        self.workers = {}   # shard id -> (Process, control Queue)
+
+    @staticmethod
+    def _shard_name(i):
+        return f"shard-{i:02d}"
+
+    def _assignment(self):
+        return {
+            shard: {name: self.targets[name] for name in names}
+            for shard, names in self.ring.assign(self.targets).items()
+        }
+
+    def _spawn(self, shard, targets):
+        control = multiprocessing.Queue()
+        port = monitor.SHARD_METRICS_PORT + int(shard.rsplit("-", 1)[1]) if monitor.METRICS_PORT else None
+        proc = multiprocessing.Process(target=run_worker, args=(shard, targets, control, self.data_dir, port),
+                                       name=shard)
+        proc.start()
+        self.workers[shard] = (proc, control)
+
+    def rebalance(self):
+        """Push the current ring assignment to the workers; only changed shards are touched."""
+        new = self._assignment()
+        owner_before = {name: shard for shard, names in self.assigned.items() for name in names}
+        moved = sum(1 for shard, names in new.items() for name in names
+                    if owner_before.get(name) not in (None, shard))
+
+        for shard, targets in new.items():
+            if shard not in self.workers:
+                self._spawn(shard, targets)
+            elif targets != self.assigned.get(shard):
+                self.workers[shard][1].put(targets)
+        for shard in list(self.workers):
+            if shard not in new:
+                proc, control = self.workers.pop(shard)
+                control.put(None)
+                proc.join(timeout=15)
+
+        self.assigned = new
+        print(f"Rebalanced {len(self.targets)} targets over {len(new)} workers ({moved} moved).")
+
+    def add_worker(self):
+        used = set(self.ring.nodes)
+        i = 0
+        while self._shard_name(i) in used:
+            i += 1
+        self.ring.add(self._shard_name(i))
+        self.rebalance()
+
+    def remove_worker(self):
+        nodes = self.ring.nodes
+        if len(nodes) > 1:
+            self.ring.remove(nodes[-1])
+            self.rebalance()
+
+    def set_targets(self, targets):
+        self.targets = dict(targets)
+        self.rebalance()
+
+    def supervise(self):
+        """Respawn any worker that died, with the same shard of targets."""
+        for shard, (proc, _) in list(self.workers.items()):
+            if not proc.is_alive():
+                print(f"⚠️ Worker {shard} exited with {proc.exitcode}; restarting.")
+                self._spawn(shard, self.assigned.get(shard, {}))
+
+    def stop(self):
+        for proc, control in self.workers.values():
+            control.put(None)
+        for proc, _ in self.workers.values():
+            proc.join(timeout=15)
+            if proc.is_alive():
+                proc.terminate()
+        self.workers = {}
+
+
+# ------------------------------------------------------------
+# 🏁 Entry Point
+# ------------------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Probe a large fleet with a pool of monitor processes.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    args = parser.parse_args()
+
+    coordinator = Coordinator(monitor.load_targets(), args.workers, monitor.data_dir)
+    coordinator.rebalance()
+
+    # SIGUSR1 / SIGUSR2 grow or shrink the pool by one worker (POSIX only).
+    resize_requests = []
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, lambda *_: resize_requests.append(1))
+        signal.signal(signal.SIGUSR2, lambda *_: resize_requests.append(-1))
+
+    print("Starting sharded monitoring agent...")
+    targets_mtime = monitor.targets_mtime()
+    try:
+        while True:
+            time.sleep(SUPERVISE_INTERVAL)
+            while resize_requests:
+                coordinator.add_worker() if resize_requests.pop(0) > 0 else coordinator.remove_worker()
+
+            mtime = monitor.targets_mtime()
+            if mtime != targets_mtime:
+                targets_mtime = mtime
+                coordinator.set_targets(monitor.load_targets())
+
+            coordinator.supervise()
+    except KeyboardInterrupt:
+        print("Sharded monitoring agent stopped.")
+    finally:
+        coordinator.stop()
@@ -0,0 +1,231 @@
+# backend/agent/summary_service.py
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+import uvicorn
+from fastapi import FastAPI, Request, Response
+
+from config import DATA_DIR
+from history import ProbeHistory
+from latency_stats import StatsReader
+from merged_store import open_probe_store, probe_store_exists
+from retention import RollupView
+from tail_reader import TailReader
+
+SUMMARY_PORT = int(os.environ.get('AUTOOPS_SUMMARY_PORT', 8600))
+REFRESH_INTERVAL = 2.0          # seconds between rebuilds, however many viewers there are
+SUMMARY_WINDOW_SECONDS = 600    # uptime and p95 are computed over this window
+LONG_UPTIME_DAYS = 7            # long-range uptime, mostly from per-minute rollups
+LONG_UPTIME_REFRESH = 300.0     # seconds between long-range uptime recomputations
+RECENT_PROBES = 20
+RECENT_ACTIONS = 10
+LEGACY_PROBES = 200             # logs.json rows kept when there is no probe store
+
+
+def _json_default(value):
+    # NumPy scalars from the latency sketches.
+    return value.item() if hasattr(value, "item") else str(value)
+
+
+class SummaryBuilder:
+    """Computes the dashboard's summary once per refresh and keeps it serialized.
+
+    refresh() follows the probe store (or the legacy logs.json) and the
+    action log incrementally, builds the summary, and swaps in the new body
+    and its ETag only when the content changed. The long-range uptime is
+    recomputed every LONG_UPTIME_REFRESH seconds, not on every refresh.
+    snapshot() is what every request reads, so a viewer costs a dict
+    lookup, not a parse of the data files.
+    """
+
+    def __init__(self, data_dir=DATA_DIR):
+        self.data_dir = data_dir
+        self._history = None
+        self._latency = StatsReader(data_dir)
+        self._log_tail = TailReader(os.path.join(data_dir, 'logs.json'), backfill=LEGACY_PROBES)
+        self._legacy = deque(maxlen=LEGACY_PROBES)
+        self._totals = {}   # service -> [probes, ok, latency_sum, latency_count, latency_max]
+        self._action_tail = TailReader(os.path.join(data_dir, 'agent_actions.json'), backfill=RECENT_ACTIONS)
+        self._actions = deque(maxlen=RECENT_ACTIONS)
+        self._long_rates = None
+        self._long_rates_at = 0.0
+        self._snapshot = (b"{}", '"empty"')
+        self._stop = threading.Event()
+        self.stats = {"builds": 0, "changes": 0, "last_build_ms": 0.0}
+
+    # ------------------------------------------------------------
+    # Inputs
+    # ------------------------------------------------------------
+    @staticmethod
+    def _read(tail):
+        records = []
+        try:
+            lines = tail.read_new()
+        except FileNotFoundError:
+            return records
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+        return records
+
+    def _long_uptime(self, history, now):
+        # Days of rollups barely move in a few minutes, and each recomputation
+        # re-reads the compressed rollup files at the window's edges.
+        if self._long_rates is None or now - self._long_rates_at >= LONG_UPTIME_REFRESH:
+            self._long_rates = history.error_rates(now - LONG_UPTIME_DAYS * 86400)
+            self._long_rates_at = now
+        return self._long_rates
+
+    def _store_summary(self):
+        if self._history is None:
+            self._history = ProbeHistory(open_probe_store(self.data_dir), rollups=RollupView(self.data_dir))
+        history = self._history
+        history.refresh()
+        now = time.time()
+        since = now - SUMMARY_WINDOW_SECONDS
+        rates = history.error_rates(since)
+        long_rates = self._long_uptime(history, now)
+        p95 = history.latency_percentile(95, since)
+
+        services = history.services()
+        stats = self._latency.get()
+        latency = stats.summary(services) if stats else {}
+        uptime = []
+        for s in services:
+            drift = latency.get(s, {})
+            # A service newer than the cached long-range rates has all its probes in the short window.
+            long_rate = long_rates.get(s, rates[s])
+            uptime.append({
+                "service": s,
+                "uptime_pct": (1 - rates[s]["error_rate"]) * 100 if rates[s]["probes"] else 0,
+                "uptime_long_pct": (1 - long_rate["error_rate"]) * 100 if long_rate["probes"] else 0,
+                "p95_latency_ms": p95[s],
+                "p50_ms": drift.get("p50"),
+                "p99_ms": drift.get("p99"),
+                "baseline_ms": drift.get("baseline_ms"),
+                "latency_z": drift.get("z"),
+                "anomalous": drift.get("anomalous", False),
+            })
+        return {
+            "source": "store",
+            "latest": [r for s in services for r in history.last(s)],
+            "uptime": uptime,
+            "recent_probes": history.store.tail(RECENT_PROBES),
+        }
+
+    def _legacy_summary(self):
+        for r in self._read(self._log_tail):
+            self._legacy.append(r)
+            t = self._totals.setdefault(r.get("service"), [0, 0, 0.0, 0, None])
+            t[0] += 1
+            t[1] += r.get("status_code") == 200
+            latency = r.get("latency_ms")
+            if isinstance(latency, (int, float)):
+                t[2] += latency
+                t[3] += 1
+                t[4] = latency if t[4] is None else max(t[4], latency)
+        latest = {r.get("service"): r for r in self._legacy}
+        return {
+            "source": "logs",
+            "latest": list(latest.values()),
+            "uptime": [{"service": s,
+                        "uptime_pct": ok / probes * 100,
+                        "avg_latency_ms": round(lsum / lcount, 1) if lcount else None,
+                        "max_latency_ms": lmax,
+                        "probes": probes}
+                       for s, (probes, ok, lsum, lcount, lmax) in self._totals.items()],
+            "recent_probes": list(self._legacy)[-RECENT_PROBES:],
+        }
+
+    # ------------------------------------------------------------
+    # Building and serving
+    # ------------------------------------------------------------
+    def refresh(self):
+        """Rebuild the summary; returns True if its content changed."""
+        start = time.perf_counter()
+        summary = self._store_summary() if probe_store_exists(self.data_dir) else self._legacy_summary()
+        self._actions.extend(self._read(self._action_tail))
+        summary["actions"] = list(self._actions)
+        summary["window_seconds"] = SUMMARY_WINDOW_SECONDS
+        summary["long_uptime_days"] = LONG_UPTIME_DAYS
+
+        body = json.dumps(summary, sort_keys=True, default=_json_default).encode()
+        etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+        changed = etag != self._snapshot[1]
+        if changed:
+            self._snapshot = (body, etag)   # one assignment, so readers never see a torn pair
+            self.stats["changes"] += 1
+        self.stats["builds"] += 1
+        self.stats["last_build_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return changed
+
+    def snapshot(self):
+        """(body, etag) of the latest summary."""
+        return self._snapshot
+
+    def start(self, interval=REFRESH_INTERVAL):
+        def refresh():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Summary refresh failed: {e}")
+
+        # The first build happens before the server accepts requests.
+        refresh()
+
+        def loop():
+            while not self._stop.wait(interval):
+                refresh()
+
+        threading.Thread(target=loop, name="summary-refresh", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+builder = SummaryBuilder()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    builder.start()
+    yield
+    builder.stop()
+
+
+app = FastAPI(title="AutoOps summary", lifespan=lifespan)
+
+
+@app.get("/summary")
+async def summary(request: Request):
+    body, etag = builder.snapshot()
+    # no-cache: clients may keep the body but must revalidate, which is a 304.
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+@app.get("/stats")
+async def stats():
+    return builder.stats
+
+
+if __name__ == "__main__":
+    print(f"Serving the dashboard summary on http://127.0.0.1:{SUMMARY_PORT}/summary")
+    uvicorn.run(app, host="127.0.0.1", port=SUMMARY_PORT, log_level="warning")
@@ -0,0 +1,324 @@
+# backend/agent/supervisor.py
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+
+
+def port_in_use(host, port):
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.settimeout(0.2)
+        return s.connect_ex((host, port)) == 0
+
+
+def listening_pids(port):
+    """PIDs with a TCP socket listening on `port` (read from /proc; empty where there is none)."""
+    inodes = set()
+    for table in ("/proc/net/tcp", "/proc/net/tcp6"):
+        try:
+            with open(table, "r") as f:
+                next(f)
+                for line in f:
+                    fields = line.split()
+                    # fields[3] == "0A" is TCP_LISTEN; fields[1] is local addr:port in hex.
+                    if fields[3] == "0A" and int(fields[1].rsplit(":", 1)[1], 16) == port:
+                        inodes.add(f"socket:[{fields[9]}]")
+        except (OSError, StopIteration):
+            continue
+    if not inodes:
+        return []
+    pids = []
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+        try:
+            if any(os.readlink(f"/proc/{pid}/fd/{fd}") in inodes for fd in os.listdir(f"/proc/{pid}/fd")):
+                pids.append(int(pid))
+        except OSError:
+            continue
+    return pids
+
+
+class ServiceSupervisor:
+    """Owns the local service processes the healer restarts.
+
+    `specs` maps a service name to {"command": [script, arg, ...],
+    "ports": [port, ...], "health_path": "/health"}; "{port}" in the command
+    is replaced with the port the process should listen on. Each service
+    alternates between its ports. A standby never takes the port the
+    registry publishes for the service, so it can't answer the monitor's
+    probes in place of a service that is down.
+
+    restart() terminates the old process (killing it if it won't exit),
+    brings up a replacement and only reports success once the
+    replacement's /health answers 200. A hung process on the published port
+    that the supervisor didn't start (one left over from before the healer
+    started, say) is killed too, as long as it runs the service's own
+    script. With warm standbys enabled a second
+    process is kept idling on the spare port, so a restart is a port swap
+    instead of a cold interpreter + Flask start; the standby is replaced in
+    the background afterwards. Whenever a service moves port the registry
+    file ({name: health_url}, the monitor's targets file) is rewritten so
+    the monitor follows it; `registry_seed` is what the file starts from if
+    it doesn't exist yet.
+
+    Given a tracing.Tracer, a restart for an incident emits "spawn"
+    (standby handover or Popen), "terminate" and "startup" spans.
+    """
+
+    def __init__(self, specs, registry_path=None, registry_seed=None, python=sys.executable,
+                 host="127.0.0.1", ready_timeout=15.0, stop_timeout=5.0, warm_standby=True,
+                 tracer=None):
+        self.specs = specs
+        self.registry_path = registry_path
+        self.registry_seed = dict(registry_seed or {})
+        self.python = python
+        self.host = host
+        self.ready_timeout = ready_timeout
+        self.stop_timeout = stop_timeout
+        self.warm_standby = warm_standby
+        self.tracer = tracer
+
+        self._active = {}    # name -> (Popen or None, port)
+        self._standby = {}   # name -> (Popen, port)
+        self._locks = {name: threading.Lock() for name in specs}
+        self._registry_lock = threading.Lock()
+        self.stats = {"restarts": 0, "failovers": 0, "cold_starts": 0, "kills": 0, "failed": 0}
+
+    # ------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------
+    def supervises(self, name):
+        return name in self.specs
+
+    def url(self, name):
+        """Health URL of the process currently serving `name`, if this supervisor started it."""
+        active = self._active.get(name)
+        if active is None:
+            return None
+        return f"http://{self.host}:{active[1]}{self.specs[name].get('health_path', '/health')}"
+
+    # ------------------------------------------------------------
+    # Process control
+    # ------------------------------------------------------------
+    def _spawn(self, name, port):
+        command = [arg.replace("{port}", str(port)) for arg in self.specs[name]["command"]]
+        return subprocess.Popen([self.python, *command])
+
+    def _terminate(self, proc):
+        if proc is None or proc.poll() is not None:
+            return
+        proc.terminate()
+        try:
+            proc.wait(self.stop_timeout)
+        except subprocess.TimeoutExpired:
+            self.stats["kills"] += 1
+            proc.kill()
+            proc.wait()
+
+    def _healthy(self, name, port):
+        url = f"http://{self.host}:{port}{self.specs[name].get('health_path', '/health')}"
+        try:
+            return requests.get(url, timeout=2.0).status_code == 200
+        except requests.exceptions.RequestException:
+            return False
+
+    def _wait_listening(self, proc, port, deadline):
+        while time.monotonic() < deadline:
+            if proc.poll() is not None:
+                return False
+            if port_in_use(self.host, port):
+                return True
+            time.sleep(0.1)
+        return False
+
+    def _wait_healthy(self, proc, name, port, deadline):
+        while time.monotonic() < deadline:
+            if proc.poll() is not None:
+                return False
+            if self._healthy(name, port):
+                return True
+            time.sleep(0.2)
+        return False
+
+    def _published_ports(self):
+        """{service: port} for the URLs in the registry (the monitor's targets)."""
+        targets = self.registry_seed
+        if self.registry_path and os.path.exists(self.registry_path):
+            try:
+                with open(self.registry_path, "r") as f:
+                    targets = json.load(f)
+            except ValueError:
+                pass
+        ports = {}
+        for service, url in targets.items():
+            try:
+                port = urlsplit(url).port if url else None
+            except ValueError:
+                continue
+            if port is not None:
+                ports[service] = port
+        return ports
+
+    def _published_port(self, name):
+        return self._published_ports().get(name)
+
+    def _spare_port(self, name, exclude=()):
+        # Any published port, not just this service's: a standby there would
+        # answer the monitor's probes for whichever service owns it.
+        exclude = set(exclude) | set(self._published_ports().values())
+        for port in self.specs[name]["ports"]:
+            if port not in exclude and not port_in_use(self.host, port):
+                return port
+        return None
+
+    def _kill_strays(self, name, port):
+        """Kill processes running this service's script that hold `port` but aren't ours."""
+        script = os.path.basename(self.specs[name]["command"][0])
+        ours = {entry[0].pid for entry in (self._active.get(name), self._standby.get(name))
+                if entry and entry[0] is not None}
+        for pid in listening_pids(port):
+            if pid in ours or pid == os.getpid():
+                continue
+            try:
+                with open(f"/proc/{pid}/cmdline", "rb") as f:
+                    cmdline = f.read().replace(b"\0", b" ").decode(errors="replace")
+            except OSError:
+                continue
+            if script not in cmdline:
+                print(f"Supervisor: port {port} is held by pid {pid} ({cmdline.strip()}); not ours to kill")
+                continue
+            print(f"Supervisor: killing stray {name} process {pid} on port {port}")
+            self._kill_pid(pid)
+
+    def _kill_pid(self, pid):
+        try:
+            os.kill(pid, signal.SIGTERM)
+            deadline = time.monotonic() + self.stop_timeout
+            while time.monotonic() < deadline:
+                try:
+                    if os.waitpid(pid, os.WNOHANG)[0]:
+                        return   # our own child (an orphaned standby, say), now reaped
+                except ChildProcessError:
+                    os.kill(pid, 0)
+                time.sleep(0.1)
+            self.stats["kills"] += 1
+            os.kill(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    def _start_standby(self, name):
+        """Pre-fork an idle replacement on a free port (no-op if one is running)."""
+        with self._locks[name]:
+            standby = self._standby.get(name)
+            if standby is not None and standby[0].poll() is None:
+                return
+            active = self._active.get(name)
+            # _spare_port also skips the published port, so the standby
+            # can't stand in for a primary that is down.
+            port = self._spare_port(name, exclude=[active[1]] if active else [])
+            if port is None:
+                return
+            self._standby[name] = (self._spawn(name, port), port)
+
+    def start_standbys(self):
+        if not self.warm_standby:
+            return
+        for name in self.specs:
+            self._start_standby(name)
+
+    def _trace(self, incident, stage, start, **attrs):
+        if self.tracer is not None:
+            self.tracer.emit(incident, stage, start, **attrs)
+
+    def restart(self, name, incident=None):
+        """Replace the process serving `name`; True once the new one passes /health."""
+        if name not in self.specs:
+            return False
+        with self._locks[name]:
+            self.stats["restarts"] += 1
+            old_proc, old_port = self._active.get(name, (None, None))
+            deadline = time.monotonic() + self.ready_timeout
+
+            started = time.time()
+            standby = self._standby.pop(name, None)
+            if standby is not None and not self._wait_listening(standby[0], standby[1], deadline):
+                self._terminate(standby[0])
+                standby = None
+            if standby is not None:
+                self._trace(incident, "spawn", started, service=name, mode="failover")
+
+            started = time.time()
+            self._terminate(old_proc)
+            if old_proc is None:
+                # Not started by us, so possibly hung on the port the monitor probes.
+                old_port = self._published_port(name)
+                if old_port is not None:
+                    self._kill_strays(name, old_port)
+            self._trace(incident, "terminate", started, service=name)
+            if standby is not None:
+                proc, port = standby
+                self.stats["failovers"] += 1
+            else:
+                port = old_port
+                if port is None or port_in_use(self.host, port):
+                    port = self._spare_port(name)
+                if port is None:
+                    print(f"Supervisor: no free port for {name} in {self.specs[name]['ports']}")
+                    self.stats["failed"] += 1
+                    return False
+                started = time.time()
+                proc = self._spawn(name, port)
+                self._trace(incident, "spawn", started, service=name, mode="cold")
+                self.stats["cold_starts"] += 1
+
+            started = time.time()
+            healthy = self._wait_healthy(proc, name, port, deadline)
+            self._trace(incident, "startup", started, service=name, ok=healthy)
+            if not healthy:
+                self._terminate(proc)
+                self._active.pop(name, None)
+                self.stats["failed"] += 1
+                return False
+
+            self._active[name] = (proc, port)
+            print(f"Supervisor: {name} serving on port {port} (pid {proc.pid})")
+
+        self._publish()
+        if self.warm_standby:
+            threading.Thread(target=self._start_standby, args=(name,), daemon=True).start()
+        return True
+
+    def stop_standbys(self):
+        for name in list(self._standby):
+            proc, _ = self._standby.pop(name)
+            self._terminate(proc)
+
+    # ------------------------------------------------------------
+    # Registry
+    # ------------------------------------------------------------
+    def _publish(self):
+        """Point the monitor's targets file at the ports now in use."""
+        if not self.registry_path:
+            return
+        with self._registry_lock:
+            targets = dict(self.registry_seed)
+            if os.path.exists(self.registry_path):
+                try:
+                    with open(self.registry_path, "r") as f:
+                        targets = json.load(f)
+                except ValueError:
+                    pass
+            for name in self._active:
+                targets[name] = self.url(name)
+            tmp = self.registry_path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(targets, f, indent=2)
+            os.replace(tmp, self.registry_path)
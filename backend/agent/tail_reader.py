@@ -0,0 +1,106 @@
+# backend/agent/tail_reader.py
+import os
+
+BLOCK_SIZE = 8192
+
+
+class TailReader:
+    """Follows a JSON-lines file by byte offset, returning only newly appended lines.
+
+    The first call seeks backwards from the end of the file to pick up the
+    last `backfill` lines instead of reading the whole history. Later calls
+    read from the remembered offset. A file that shrinks is treated as
+    truncated and re-read from the start; a file whose inode changes is
+    treated as rotated, and the old handle is drained before switching.
+    """
+
+    def __init__(self, path, backfill=15):
+        self.path = path
+        self.backfill = backfill
+        self._file = None
+        self._inode = None
+        self._partial = ""
+        self.stats = {"bytes_read": 0, "truncations": 0, "rotations": 0}
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def read_new(self):
+        """Return complete lines appended since the last call.
+
+        Raises FileNotFoundError if the file does not exist yet.
+        """
+        lines = []
+
+        if self._file is None:
+            self._open(cold=True)
+        else:
+            try:
+                st = os.stat(self.path)
+            except FileNotFoundError:
+                # Mid-rotation: keep draining the old handle until the new
+                # file appears.
+                return self._read_lines()
+
+            if st.st_ino != self._inode:
+                lines.extend(self._read_lines())
+                self._partial = ""
+                self._file.close()
+                self._open(cold=False)
+                self.stats["rotations"] += 1
+            elif st.st_size < self._file.tell():
+                self._file.seek(0)
+                self._partial = ""
+                self.stats["truncations"] += 1
+
+        lines.extend(self._read_lines())
+        return lines
+
+    def _open(self, cold):
+        f = open(self.path, "rb")
+        self._inode = os.fstat(f.fileno()).st_ino
+        self._file = f
+        if cold:
+            f.seek(self._backfill_offset(f))
+
+    def _backfill_offset(self, f):
+        """Byte offset where the last `backfill` complete lines begin."""
+        end = f.seek(0, os.SEEK_END)
+        if self.backfill <= 0:
+            return end
+
+        pos = end
+        newlines = 0
+        # A trailing newline terminates the last line rather than starting
+        # a new one, so it doesn't count.
+        if end > 0:
+            f.seek(end - 1)
+            if f.read(1) == b"\n":
+                newlines = -1
+
+        while pos > 0:
+            step = min(BLOCK_SIZE, pos)
+            pos -= step
+            f.seek(pos)
+            block = f.read(step)
+            for i in range(len(block) - 1, -1, -1):
+                if block[i] == 0x0A:
+                    newlines += 1
+                    if newlines == self.backfill:
+                        return pos + i + 1
+        return 0
+
+    def _read_lines(self):
+        chunk = self._file.read()
+        if not chunk:
+            return []
+        self.stats["bytes_read"] += len(chunk)
+
+        text = self._partial + chunk.decode("utf-8", errors="replace")
+        parts = text.split("\n")
+        # The last element is either "" or an incomplete line still being
+        # written; hold it back until its newline arrives.
+        self._partial = parts.pop()
+        return [line + "\n" for line in parts if line.strip()]
@@ -0,0 +1,120 @@
+# backend/agent/trace_report.py
+import argparse
+import math
+import os
+import time
+
+from config import DATA_DIR
+from retention import read_segments
+from tracing import TRACE_FILE, TRACE_SEGMENT_DIR
+
+# The path from first failing probe to the first healthy one, in order.
+# Gaps between spans are stages too: pickup is the log/event hop to the
+# healer, confirm is the healer waiting for enough evidence, queue is
+# waiting for a remediation worker and recover is the monitor noticing.
+STAGES = ["detect", "pickup", "confirm", "decide", "queue", "remediate", "recover"]
+# Spans nested inside a stage, reported under it.
+SUBSTAGES = {"decide": ["bedrock"], "remediate": ["terminate", "spawn", "startup", "health_check", "backoff"]}
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[max(0, math.ceil(pct / 100 * len(values)) - 1)]
+
+
+def load_incidents(data_dir, since=None):
+    """{incident: [span, ...]} from the trace file and its rotated segments."""
+    incidents = {}
+    for span in read_segments(os.path.join(data_dir, TRACE_SEGMENT_DIR), os.path.join(data_dir, TRACE_FILE), since):
+        if since is None or span.get("end", 0) >= since:
+            incidents.setdefault(span.get("incident"), []).append(span)
+    return incidents
+
+
+def breakdown(spans):
+    """Seconds per stage for one incident, or None if it hasn't recovered yet."""
+    by_stage = {}
+    for span in sorted(spans, key=lambda s: s["start"]):
+        by_stage.setdefault(span["stage"], []).append(span)
+    if "incident" not in by_stage:
+        return None
+
+    incident = by_stage["incident"][0]
+    stages = {"mttr": incident["end"] - incident["start"]}
+    detect = by_stage.get("detect", [None])[0]
+    seen = by_stage.get("seen", [None])[0]
+    decides = by_stage.get("decide", [])
+    decide = next((s for s in decides if s.get("action") == "restart"), decides[0] if decides else None)
+    remediations = [s for s in by_stage.get("remediate", []) if decide is None or s["start"] >= decide["start"]]
+
+    if detect:
+        stages["detect"] = detect["end"] - detect["start"]
+    if detect and seen:
+        stages["pickup"] = max(0.0, seen["start"] - detect["end"])
+    if seen and decide:
+        stages["confirm"] = max(0.0, decide["start"] - seen["start"])
+    if decide:
+        stages["decide"] = decide["end"] - decide["start"]
+    if decide and remediations:
+        stages["queue"] = max(0.0, remediations[0]["start"] - decide["end"])
+        stages["remediate"] = remediations[-1]["end"] - remediations[0]["start"]
+        stages["recover"] = max(0.0, incident["end"] - remediations[-1]["end"])
+    for subs in SUBSTAGES.values():
+        for sub in subs:
+            if sub in by_stage:
+                stages[sub] = sum(s["end"] - s["start"] for s in by_stage[sub])
+    stages["other"] = stages["mttr"] - sum(stages.get(stage, 0.0) for stage in STAGES)
+    stages["remediated"] = bool(remediations)
+    stages["service"] = incident.get("service")
+    return stages
+
+
+def report(incidents):
+    rows = []
+    still_open = untraced = 0
+    for spans in incidents.values():
+        b = breakdown(spans)
+        if b is not None:
+            rows.append(b)
+        elif any(s.get("stage") == "detect" for s in spans):
+            still_open += 1
+        else:
+            # No monitor spans: an ID the healer had to mint, or one whose
+            # detect span has already rotated out of the trace.
+            untraced += 1
+    if untraced:
+        print(f"{untraced} incident(s) without monitor spans could not be broken down")
+    if not rows:
+        print(f"No recovered incidents in the trace yet ({still_open} still open).")
+        return
+    remediated = [r for r in rows if r["remediated"]]
+    print(f"{len(rows)} recovered incident(s), {len(remediated)} remediated, {still_open} still open")
+
+    def line(label, values, total):
+        share = f"{100 * sum(values) / total:5.1f}%" if total else "     -"
+        print(f"{label:<16}{len(values):>5}{percentile(values, 50):>10.3f}{percentile(values, 95):>10.3f}"
+              f"{percentile(values, 99):>10.3f}{sum(values) / len(values):>10.3f}  {share}")
+
+    print(f"{'stage (s)':<16}{'n':>5}{'p50':>10}{'p95':>10}{'p99':>10}{'mean':>10}  share of MTTR")
+    line("mttr (all)", [r["mttr"] for r in rows], 0)
+    if not remediated:
+        return
+    total = sum(r["mttr"] for r in remediated)
+    line("mttr (healed)", [r["mttr"] for r in remediated], 0)
+    for stage in STAGES + ["other"]:
+        values = [r[stage] for r in remediated if stage in r]
+        if values:
+            line(stage, values, total)
+        for sub in SUBSTAGES.get(stage, []):
+            values = [r[sub] for r in remediated if sub in r]
+            if values:
+                line(f"  {sub}", values, total)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-stage time-to-recovery breakdown from incident traces.")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--hours", type=float, default=None, help="only incidents active in the last N hours")
+    args = parser.parse_args()
+    since = time.time() - args.hours * 3600 if args.hours else None
+    report(load_incidents(args.data_dir, since))
@@ -0,0 +1,83 @@
+# backend/agent/tracing.py
+import datetime
+import json
+import threading
+import time
+import uuid
+
+TRACE_FILE = "traces.jsonl"
+TRACE_SEGMENT_DIR = "trace_segments"
+
+
+def new_incident_id():
+    return uuid.uuid4().hex[:12]
+
+
+def probe_started(log_entry):
+    """Epoch seconds at which a probe was dispatched (its ISO timestamp)."""
+    return datetime.datetime.fromisoformat(log_entry["timestamp"]).timestamp()
+
+
+class Tracer:
+    """Appends timed spans for an incident to a JSON-lines trace file.
+
+    Each line is {"incident", "stage", "timestamp", "start", "end",
+    "duration_ms", ...}; start and end are wall-clock epoch seconds so spans
+    from the monitor and the healer line up. The file is reopened for every
+    span: spans are rare (a few per incident), each is a single small
+    append, so several processes can share one file and the healer can
+    rotate it underneath them.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def emit(self, incident, stage, start, end=None, **attrs):
+        if incident is None or self.path is None:
+            return
+        end = time.time() if end is None else end
+        span = {"incident": incident, "stage": stage,
+                "timestamp": datetime.datetime.fromtimestamp(start).isoformat(),
+                "start": round(start, 6), "end": round(end, 6),
+                "duration_ms": round((end - start) * 1000, 1)}
+        span.update(attrs)
+        line = json.dumps(span) + "\n"
+        with self._lock:
+            try:
+                with open(self.path, "a") as f:
+                    f.write(line)
+            except OSError as e:
+                print(f"Trace span dropped ({e})")
+
+
+class IncidentTracker:
+    """Monitor side: mints an incident ID on a service's first failing probe.
+
+    Every failing probe of the incident carries "incident_id" in its log
+    entry, which is how the ID reaches the healer. The first healthy probe
+    closes the incident with an "incident" span covering the whole outage,
+    i.e. the time to recovery.
+    """
+
+    def __init__(self, tracer):
+        self.tracer = tracer
+        self._open = {}   # service -> (incident, first failing probe start, failing probes)
+
+    def observe(self, log_entry):
+        service = log_entry["service"]
+        current = self._open.get(service)
+        if log_entry["status_code"] != 200:
+            if current is None:
+                incident = new_incident_id()
+                start = probe_started(log_entry)
+                current = (incident, start, 0)
+                # The failing probe itself: dispatch to result, timeouts included.
+                self.tracer.emit(incident, "detect", start, service=service,
+                                 status_code=log_entry["status_code"])
+            self._open[service] = (current[0], current[1], current[2] + 1)
+            log_entry["incident_id"] = current[0]
+        elif current is not None:
+            del self._open[service]
+            incident, start, failures = current
+            self.tracer.emit(incident, "incident", start, service=service, failed_probes=failures)
@@ -0,0 +1,305 @@
+# backend/benchmarks/bench_e2e.py
+import argparse
+import datetime
+import json
+import math
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+AGENT_DIR = os.path.join(BENCH_DIR, "..", "agent")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+sys.path.insert(0, AGENT_DIR)
+
+from local_fleet import LocalFleet
+from monitor import CONFIRM_STREAK, PROBE_INTERVAL
+from probe_store import ProbeStore, STATUS_CRASHED
+from stub_bedrock import StubBedrock
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[max(0, math.ceil(pct / 100 * len(values)) - 1)]
+
+
+def summarize(values, digits=1):
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "p50": round(percentile(values, 50), digits),
+        "p95": round(percentile(values, 95), digits),
+        "p99": round(percentile(values, 99), digits),
+        "max": round(max(values), digits),
+    }
+
+
+def assign_scenarios(n):
+    """~10% error, ~10% crash, ~5% late crash (at least one of each), the rest healthy.
+
+    Late crashes happen once healthy services have backed off to their
+    longest probe interval, which is when a crash is slowest to detect.
+    """
+    faulty = max(1, n // 10)
+    late = max(1, n // 20)
+    assignments = {}
+    for i in range(n):
+        mode = ("error" if i < faulty else "crash" if i < 2 * faulty
+                else "late-crash" if i < 2 * faulty + late else "healthy")
+        assignments[f"svc-{i:04d}"] = mode
+    return assignments
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def launch(script, env, log_path):
+    log = open(log_path, "w")
+    return subprocess.Popen([sys.executable, script], cwd=AGENT_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+def stop(proc):
+    if proc.poll() is not None:
+        return
+    # SIGINT lets the monitor flush its writer queue before exiting.
+    proc.send_signal(signal.SIGINT)
+    try:
+        proc.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+# ------------------------------------------------------------
+# Measurements
+# ------------------------------------------------------------
+def probe_metrics(store_dir, warmup_until, fixed_schedule=False):
+    store = ProbeStore(store_dir)
+    cols = store.columns(names=["timestamp", "service", "status"])
+    per_service = {}
+    for ts, svc in zip(cols["timestamp"], cols["service"]):
+        if ts >= warmup_until * 1_000_000:
+            per_service.setdefault(svc, []).append(ts)
+
+    steady = [ts for series in per_service.values() for ts in series]
+    elapsed = (max(steady) - min(steady)) / 1_000_000 if len(steady) > 1 else 0
+    # With adaptive probing the gap between probes is the schedule itself,
+    # so report its distribution rather than the deviation from a fixed one.
+    intervals = []
+    for series in per_service.values():
+        for a, b in zip(series, series[1:]):
+            intervals.append((b - a) / 1000)
+
+    metrics = {
+        "probes": len(steady),
+        "probes_per_second": round(len(steady) / elapsed, 1) if elapsed else None,
+        "probe_interval_ms": summarize(intervals),
+    }
+    if fixed_schedule:
+        # Comparable with runs from before adaptive scheduling.
+        metrics["interval_jitter_ms"] = summarize([abs(i - PROBE_INTERVAL * 1000) for i in intervals])
+    return store, cols, metrics
+
+
+def healer_metrics(actions_path, store, cols, assignments, onsets):
+    decisions = []
+    if os.path.exists(actions_path):
+        with open(actions_path, "r") as f:
+            decisions = [json.loads(line) for line in f if line.strip()]
+
+    # restart_result records are the executor reporting back, not decisions.
+    results = [d for d in decisions if d.get("action") == "restart_result"]
+    decisions = [d for d in decisions if d.get("action") != "restart_result"]
+    sources = {}
+    for d in decisions:
+        sources[d.get("source", "unknown")] = sources.get(d.get("source", "unknown"), 0) + 1
+    outcomes = {}
+    for r in results:
+        outcome = "unsupervised" if r.get("ok") is None else "healthy" if r["ok"] else "unhealthy"
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    # Detection = first CRASHED probe after the service's onset (its time
+    # to detect is measured from onset); confirmation = the
+    # CONFIRM_STREAK-th consecutive one; restart = first restart decision
+    # for that service issued after detection. The fleet is not supervised
+    # by the healer, so nothing is actually restarted: the latency measured
+    # is detection to restart decision, not time to recovery.
+    first_crash = {}
+    confirmed = {}
+    streaks = {}
+    names = store.services
+    for ts, svc, status in zip(cols["timestamp"], cols["service"], cols["status"]):
+        name = names[svc]
+        onset = onsets.get(assignments.get(name))
+        if onset is None or ts < onset * 1_000_000:
+            continue
+        if status != STATUS_CRASHED:
+            streaks[name] = 0
+            continue
+        first_crash.setdefault(name, ts / 1_000_000)
+        streaks[name] = streaks.get(name, 0) + 1
+        if streaks[name] == CONFIRM_STREAK and name not in confirmed:
+            confirmed[name] = ts / 1_000_000 - first_crash[name]
+
+    detect = {mode: [] for mode in onsets}
+    for name, detected in first_crash.items():
+        detect[assignments[name]].append(detected - onsets[assignments[name]])
+
+    to_restart = []
+    crashed = [name for name, mode in assignments.items() if mode in onsets]
+    for name in crashed:
+        detected = first_crash.get(name)
+        if detected is None:
+            continue
+        for d in decisions:
+            if d.get("action") != "restart" or d.get("service_name") != name:
+                continue
+            issued = datetime.datetime.fromisoformat(d["timestamp"]).timestamp()
+            if issued >= detected:
+                to_restart.append(issued - detected)
+                break
+
+    return {
+        "decisions": len(decisions),
+        "decision_sources": sources,
+        "cycle_ms": summarize([d["cycle_ms"] for d in decisions if "cycle_ms" in d]),
+        "detect_seconds": summarize(detect["crash"], digits=2),
+        "late_detect_seconds": summarize(detect["late-crash"], digits=2),
+        "confirm_seconds": summarize(list(confirmed.values()), digits=2),
+        "detect_to_restart_seconds": summarize(to_restart, digits=2),
+        "crashed_services": len(crashed),
+        "no_restart_decision": len(crashed) - len(to_restart),
+        "restart_results": outcomes,
+    }
+
+
+def run_size(n, args):
+    print(f"▶ Benchmarking {n} targets for {args.duration}s...")
+    work_dir = tempfile.mkdtemp(prefix=f"autoops-bench-{n}-")
+    assignments = assign_scenarios(n)
+    crash_at = time.time() + args.warmup + 2
+    onsets = {"crash": crash_at, "late-crash": crash_at + args.late_crash_after}
+
+    fleet = LocalFleet(assignments, base_port=args.base_port, crash_at=onsets["crash"],
+                       late_crash_at=onsets["late-crash"]).start()
+    stub = StubBedrock(latency=args.bedrock_latency).start()
+
+    targets_file = os.path.join(work_dir, "targets.json")
+    with open(targets_file, "w") as f:
+        json.dump(fleet.targets(), f)
+    # The fleet lives in this process; the healer has no local services to
+    # supervise, so its restarts end as "unsupervised" without being retried.
+    services_file = os.path.join(work_dir, "services.json")
+    with open(services_file, "w") as f:
+        json.dump({}, f)
+
+    env = dict(os.environ)
+    env.update({
+        "AUTOOPS_DATA_DIR": work_dir,
+        "AUTOOPS_TARGETS_FILE": targets_file,
+        "AUTOOPS_SERVICES_FILE": services_file,
+        "AUTOOPS_HEALER_INTERVAL": str(args.healer_interval),
+        "BEDROCK_ENDPOINT_URL": stub.url,
+        "PYTHONUNBUFFERED": "1",
+    })
+    if args.fixed_schedule:
+        env["AUTOOPS_ADAPTIVE_PROBING"] = "0"
+    env.setdefault("AWS_ACCESS_KEY_ID", "bench")
+    env.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+
+    monitor = launch("monitor.py", env, os.path.join(work_dir, "monitor.log"))
+    time.sleep(1)
+    healer = launch("healer.py", env, os.path.join(work_dir, "healer.log"))
+    try:
+        time.sleep(args.duration)
+    finally:
+        stop(healer)
+        stop(monitor)
+        fleet.stop()
+        stub.stop()
+
+    store, cols, probes = probe_metrics(os.path.join(work_dir, "probes"), time.time() - args.duration + args.warmup,
+                                        args.fixed_schedule)
+    result = {
+        "targets": n,
+        "duration_s": args.duration,
+        "monitor": probes,
+        "healer": healer_metrics(os.path.join(work_dir, "agent_actions.json"), store, cols, assignments, onsets),
+        "bedrock_calls": stub.calls,
+    }
+
+    if args.keep:
+        result["work_dir"] = work_dir
+    else:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    print(json.dumps(result, indent=2))
+    return result
+
+
+def compare(old_path, new):
+    with open(old_path, "r") as f:
+        old = json.load(f)
+    old_runs = {r["targets"]: r for r in old.get("runs", [])}
+    print(f"Δ vs {old.get('commit')} ({old_path}):")
+    for run in new["runs"]:
+        prev = old_runs.get(run["targets"])
+        if not prev:
+            continue
+        for label, path in [("probes/s", ("monitor", "probes_per_second")),
+                            ("interval p50 ms", ("monitor", "probe_interval_ms", "p50")),
+                            ("jitter p99 ms", ("monitor", "interval_jitter_ms", "p99")),
+                            ("late detect p50 s", ("healer", "late_detect_seconds", "p50")),
+                            ("confirm p50 s", ("healer", "confirm_seconds", "p50")),
+                            ("cycle p95 ms", ("healer", "cycle_ms", "p95")),
+                            ("restart p50 s", ("healer", "detect_to_restart_seconds", "p50"))]:
+            a, b = prev, run
+            for key in path:
+                a = (a or {}).get(key)
+                b = (b or {}).get(key)
+            print(f"  {run['targets']:>5} targets  {label:<18} {a} → {b}")
+
+
+# ------------------------------------------------------------
+# 🏁 Entry Point
+# ------------------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end AutoOps benchmark against a local fleet.")
+    parser.add_argument("--sizes", default="10,100,1000", help="comma-separated target counts")
+    parser.add_argument("--duration", type=float, default=60, help="seconds per size")
+    parser.add_argument("--warmup", type=float, default=10, help="seconds excluded from probe stats")
+    parser.add_argument("--healer-interval", type=float, default=15)
+    parser.add_argument("--bedrock-latency", type=float, default=0.5, help="stub think time per call")
+    parser.add_argument("--base-port", type=int, default=18000)
+    parser.add_argument("--compare", help="previous results JSON to diff against")
+    parser.add_argument("--keep", action="store_true", help="keep each run's data directory")
+    parser.add_argument("--late-crash-after", type=float, default=30,
+                        help="seconds after the first crashes that the late-crash group goes down")
+    parser.add_argument("--fixed-schedule", action="store_true", help="probe every target at the base interval (no adaptive scheduling)")
+    args = parser.parse_args()
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": datetime.datetime.now().isoformat(),
+        "config": vars(args),
+        "runs": [run_size(int(n), args) for n in args.sizes.split(",")],
+    }
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out_path = os.path.join(RESULTS_DIR, f"{datetime.datetime.now():%Y%m%d-%H%M%S}-{results['commit'] or 'nogit'}.json")
+    with open(out_path, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"✅ Results written to {out_path}")
+
+    if args.compare:
+        compare(args.compare, results)
@@ -0,0 +1,36 @@
+# backend/benchmarks/local_fleet.py
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "simulated_servers"))
+
+from virtual_fleet import Timeline, VirtualFleet
+
+
+class LocalFleet(VirtualFleet):
+    """In-process stand-in for N copies of simulated_servers/service.py.
+
+    Each service follows the [behavior] table of its scenario TOML, read
+    through virtual_fleet's legacy conversion (delays in milliseconds). A
+    crash-mode service is healthy until crash_at, then drops every
+    connection the way a dead process would; a late-crash one does the same
+    at late_crash_at.
+    """
+
+    def __init__(self, assignments, base_port=18000, services_per_port=50, crash_at=None,
+                 late_crash_at=None):
+        # assignments: {service_name: "healthy" | "error" | "crash" | "late-crash"}
+        onsets = {"crash": crash_at, "late-crash": late_crash_at}
+        timelines = {}
+        for mode in set(assignments.values()):
+            timeline = Timeline.load("crash" if mode == "late-crash" else mode)
+            if mode in onsets and onsets[mode] is not None:
+                timeline = Timeline({
+                    "name": mode,
+                    "latency": timeline.latency,
+                    "phase": [{"duration": max(0.0, onsets[mode] - time.time())}, {"down": True}],
+                })
+            timelines[mode] = timeline
+        super().__init__({name: (timelines[mode], 0.0) for name, mode in assignments.items()},
+                         base_port=base_port, services_per_port=services_per_port)
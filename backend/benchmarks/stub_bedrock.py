@@ -0,0 +1,103 @@
+# backend/benchmarks/stub_bedrock.py
+import json
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubBedrock:
+    """Local HTTP stand-in for the bedrock-runtime InvokeModel API.
+
+    Answers like the healer's system prompt asks: one action per digest
+    line, restarting every service that shows CRASHED or 5xx probes.
+    `latency` adds a fixed think time per call so benchmarks see a
+    realistic round-trip. Setting `fail_with` to an HTTP status makes every
+    call fail like a misconfigured account does (UnrecognizedClientException).
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.5, fail_with=None):
+        self.latency = latency
+        self.fail_with = fail_with
+        self.calls = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                if not re.match(r"^/model/[^/]+/invoke", self.path):
+                    self.send_error(404)
+                    return
+
+                with stub._lock:
+                    stub.calls += 1
+                time.sleep(stub.latency)
+
+                if stub.fail_with:
+                    body = json.dumps({"message": "The security token included in the request is invalid."}).encode()
+                    self.send_response(stub.fail_with)
+                    self.send_header("x-amzn-ErrorType", "UnrecognizedClientException")
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+
+                body = json.dumps({
+                    "content": [{"type": "text", "text": json.dumps(stub.decide(request))}],
+                    "usage": {"input_tokens": len(json.dumps(request)) // 4, "output_tokens": 30},
+                }).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.url = f"http://{host}:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @staticmethod
+    def decide(request):
+        text = " ".join(m.get("content", "") for m in request.get("messages", []) if isinstance(m.get("content"), str))
+        actions = []
+        for line in text.splitlines():
+            # Digest lines: "<service> probes=15 status=200:9,CRASHED:6 streak=6 ..."
+            service, _, rest = line.partition(" ")
+            fields = dict(field.split("=", 1) for field in rest.split() if "=" in field)
+            if "status" not in fields:
+                continue
+            failing = [status for status, _, _ in (entry.rpartition(":") for entry in fields["status"].split(","))
+                       if status == "CRASHED" or (status.isdigit() and int(status) >= 500)]
+            if failing:
+                actions.append({"service_name": service, "action": "restart",
+                                "reason": f"Stub saw status {failing[0]}."})
+            else:
+                actions.append({"service_name": service, "action": "none",
+                                "reason": "Service is operating normally."})
+        return {"actions": actions}
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8900
+    stub = StubBedrock(port=port).start()
+    print(f"Stub Bedrock listening on {stub.url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        stub.stop()
@@ -3,6 +3,7 @@ from flask import Flask, jsonify
 import random
 import time
 import os
+import sys
 
 app = Flask(__name__)
 
@@ -22,5 +23,6 @@ def health_check():
     return jsonify({"status": "ok", "service": "inventory", "pid": os.getpid()}), 200
 
 if __name__ == '__main__':
-    # Runs on port 5002
-    app.run(port=5002, debug=True, use_reloader=False)
\ No newline at end of file
+    # Runs on port 5002 unless another is given
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 5002
+    app.run(port=port, debug=True, use_reloader=False)
\ No newline at end of file
@@ -3,6 +3,7 @@ from flask import Flask, jsonify
 import random
 import time
 import os
+import sys
 
 app = Flask(__name__)
 
@@ -22,6 +23,8 @@ def health_check():
     return jsonify({"status": "ok", "service": "payment", "pid": os.getpid()}), 200
 
 if __name__ == '__main__':
-    # Runs on port 5001. use_reloader=False is important for our restart script to work properly.
+    # Runs on port 5001 unless another is given (the supervisor's warm standby uses a spare one).
+    # use_reloader=False is important for our restart script to work properly.
     # app.run(port=5001, debug=True, use_reloader=False)
-    app.run(host='0.0.0.0', port=5001, debug=True, use_reloader=False)
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 5001
+    app.run(host='0.0.0.0', port=port, debug=True, use_reloader=False)
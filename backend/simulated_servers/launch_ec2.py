@@ -1,5 +1,7 @@
 # launch_ec2.py
+import argparse
 import boto3
+import threading
 import time
 import sys
 from flask import Flask, jsonify
@@ -9,20 +11,85 @@ import atexit
 INSTANCE_ID = None
 app = Flask(__name__)
 
+REGION = "us-west-2"
+AMI_ID = "ami-0e6af742d565ff61c"  # Amazon Linux 2 x86_64 for us-west-2
+INSTANCE_TYPE = "t3.micro"
+KEY_NAME = "autoops-key"  # your EC2 key pair name
+SECURITY_GROUP_IDS = ["sg-05b93c1804021efe6"]  # must allow inbound 5001
+
+WARM_POOL_NAME = "autoops-warm"
+WARM_POOL_SIZE = 2            # stopped, fully provisioned instances kept in reserve
+WARM_POOL_REFILL_INTERVAL = 60.0
+
+# Pool members carry these tags; a member with no service tag is unassigned.
+POOL_TAG = "AutoOpsPool"
+SERVICE_TAG = "AutoOpsService"
+CONFIG_TAG = "AutoOpsConfig"
+
+# First boot of a pool instance: install everything, register a unit that
+# starts whatever service the instance's tags name on every later boot, then
+# power off. A stopped pool instance is therefore ready to hand out, and
+# handing it out is just tag + start. Needs instance metadata tags enabled.
+WARM_POOL_USER_DATA = """#!/bin/bash
+exec > /home/ec2-user/startup.log 2>&1
+
+# --- System setup ---
+yum update -y
+yum install -y python3 python3-pip git -y
+pip3 install flask boto3 tomli
+
+# --- Clone your repository ---
+cd /home/ec2-user
+git clone https://github.com/Preet37/AutoOps.git
+cd AutoOps
+git checkout additional-functionality
+chown -R ec2-user:ec2-user /home/ec2-user/AutoOps
+
+# --- Start the assigned service on every boot ---
+cat > /usr/local/bin/autoops-service <<'SCRIPT'
+#!/bin/bash
+TOKEN=$(curl -s -X PUT http://169.254.169.254/latest/api/token -H "X-aws-ec2-metadata-token-ttl-seconds: 60")
+tag() { curl -s -f -H "X-aws-ec2-metadata-token: $TOKEN" "http://169.254.169.254/latest/meta-data/tags/instance/$1"; }
+SERVICE=$(tag AutoOpsService) || exit 0   # still in the pool
+CONFIG=$(tag AutoOpsConfig)
+cd /home/ec2-user/AutoOps/backend/simulated_servers
+exec python3 service.py "$SERVICE" "$CONFIG"
+SCRIPT
+chmod +x /usr/local/bin/autoops-service
+
+cat > /etc/systemd/system/autoops-service.service <<'UNIT'
+[Unit]
+After=network-online.target
+Wants=network-online.target
+
+[Service]
+User=ec2-user
+ExecStart=/usr/local/bin/autoops-service
+Restart=on-failure
+
+[Install]
+WantedBy=multi-user.target
+UNIT
+systemctl enable autoops-service
+
+# --- Provisioned: stop and wait in the pool ---
+shutdown -h now
+"""
+
 
 def launch_ec2_instance(service_name: str, config_filename: str) -> str:
     """Launch a new EC2 instance and start the specified service remotely."""
     global INSTANCE_ID
 
-    ec2 = boto3.resource("ec2", region_name="us-west-2")
+    ec2 = boto3.resource("ec2", region_name=REGION)
     
     instances = ec2.create_instances(
-    ImageId="ami-0e6af742d565ff61c",  # Amazon Linux 2 x86_64 for us-west-2
+    ImageId=AMI_ID,
     MinCount=1,
     MaxCount=1,
-    InstanceType="t3.micro",
-    KeyName="autoops-key",  # your EC2 key pair name
-    SecurityGroupIds=["sg-05b93c1804021efe6"],  # must allow inbound 5001
+    InstanceType=INSTANCE_TYPE,
+    KeyName=KEY_NAME,
+    SecurityGroupIds=SECURITY_GROUP_IDS,
     UserData=f"""#!/bin/bash
 exec > /home/ec2-user/startup.log 2>&1
 
@@ -48,7 +115,8 @@ nohup python3 service.py {service_name} {config_filename} > /home/ec2-user/servi
 
     TagSpecifications=[{
         "ResourceType": "instance",
-        "Tags": [{"Key": "Name", "Value": f"{service_name}-instance"}],
+        "Tags": [{"Key": "Name", "Value": f"{service_name}-instance"},
+                 {"Key": SERVICE_TAG, "Value": service_name}],
     }],
     )
 
@@ -75,11 +143,144 @@ def terminate_ec2(instance_id: str):
         print("⚠️ No EC2 instance to terminate.")
         return
 
-    ec2 = boto3.client("ec2", region_name="us-west-2")
+    ec2 = boto3.client("ec2", region_name=REGION)
     ec2.terminate_instances(InstanceIds=[instance_id])
     print(f"🛑 Terminated instance {instance_id}")
 
 
+class WarmPool:
+    """Keeps `size` provisioned, stopped instances ready for host replacement.
+
+    A cold launch spends minutes in yum/pip/git before the service answers.
+    Pool instances do that work ahead of time (WARM_POOL_USER_DATA) and
+    power themselves off, so acquire() only has to tag one with its service
+    and start it. The pool lives entirely in EC2 tags: members are found
+    with server-side filters and nothing is kept locally, so a restarted
+    launcher picks the same pool back up. Refills run in the background
+    after every hand-out and every `refill_interval` seconds.
+    """
+
+    def __init__(self, size=WARM_POOL_SIZE, name=WARM_POOL_NAME, region=REGION,
+                 refill_interval=WARM_POOL_REFILL_INTERVAL):
+        self.size = size
+        self.name = name
+        self.refill_interval = refill_interval
+        self.ec2 = boto3.client("ec2", region_name=region)
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self.stats = {"launched": 0, "handed_out": 0, "cold_fallbacks": 0}
+
+    def _members(self, states):
+        """Unassigned pool instances in the given states."""
+        filters = [
+            {"Name": f"tag:{POOL_TAG}", "Values": [self.name]},
+            {"Name": "instance-state-name", "Values": states},
+        ]
+        members = []
+        for page in self.ec2.get_paginator("describe_instances").paginate(Filters=filters):
+            for reservation in page["Reservations"]:
+                for instance in reservation["Instances"]:
+                    tags = {t["Key"]: t["Value"] for t in instance.get("Tags", [])}
+                    if SERVICE_TAG not in tags:
+                        members.append(instance)
+        return members
+
+    def warm(self):
+        """IDs of instances that finished provisioning and can be handed out."""
+        return [i["InstanceId"] for i in self._members(["stopped"])]
+
+    def refill(self):
+        """Launch enough new pool instances to get back to `size`."""
+        with self._lock:
+            existing = self._members(["pending", "running", "stopping", "stopped"])
+            missing = self.size - len(existing)
+            if missing <= 0:
+                return 0
+            self.ec2.run_instances(
+                ImageId=AMI_ID,
+                MinCount=missing,
+                MaxCount=missing,
+                InstanceType=INSTANCE_TYPE,
+                KeyName=KEY_NAME,
+                SecurityGroupIds=SECURITY_GROUP_IDS,
+                UserData=WARM_POOL_USER_DATA,
+                InstanceInitiatedShutdownBehavior="stop",
+                MetadataOptions={"HttpTokens": "required", "InstanceMetadataTags": "enabled"},
+                TagSpecifications=[{
+                    "ResourceType": "instance",
+                    "Tags": [{"Key": "Name", "Value": f"{self.name}-standby"},
+                             {"Key": POOL_TAG, "Value": self.name}],
+                }],
+            )
+            self.stats["launched"] += missing
+            print(f"♻️ Provisioning {missing} instance(s) for warm pool '{self.name}'")
+            return missing
+
+    def acquire(self, service_name, config_filename, timeout=120):
+        """Start a warm instance as `service_name`; returns (instance_id, public_ip).
+
+        Falls back to a cold launch if the pool is empty.
+        """
+        start = time.monotonic()
+        with self._lock:
+            warm = self.warm()
+            instance_id = warm[0] if warm else None
+            if instance_id:
+                # Claim it before starting so neither refill() nor another
+                # acquire() counts it as free.
+                self.ec2.create_tags(Resources=[instance_id], Tags=[
+                    {"Key": SERVICE_TAG, "Value": service_name},
+                    {"Key": CONFIG_TAG, "Value": config_filename},
+                    {"Key": "Name", "Value": f"{service_name}-instance"},
+                ])
+
+        if instance_id is None:
+            print("⚠️ Warm pool is empty; falling back to a cold launch.")
+            self.stats["cold_fallbacks"] += 1
+            ip = launch_ec2_instance(service_name, config_filename)
+            self._refill_async()
+            return INSTANCE_ID, ip
+
+        self.ec2.start_instances(InstanceIds=[instance_id])
+        self.ec2.get_waiter("instance_running").wait(
+            InstanceIds=[instance_id],
+            WaiterConfig={"Delay": 2, "MaxAttempts": max(1, int(timeout // 2))},
+        )
+        ip = None
+        for _ in range(10):
+            reservations = self.ec2.describe_instances(InstanceIds=[instance_id])["Reservations"]
+            ip = reservations[0]["Instances"][0].get("PublicIpAddress")
+            if ip:
+                break
+            time.sleep(1)
+
+        self.stats["handed_out"] += 1
+        print(f"✅ Warm instance {instance_id} started as {service_name} in {time.monotonic() - start:.1f}s, public IP: {ip}")
+        self._refill_async()
+        return instance_id, ip
+
+    def _refill_async(self):
+        threading.Thread(target=self._safe_refill, daemon=True).start()
+
+    def _safe_refill(self):
+        try:
+            self.refill()
+        except Exception as e:
+            print(f"⚠️ Warm pool refill failed: {e}")
+
+    def start(self):
+        """Keep the pool topped up from a background thread."""
+        def loop():
+            while not self._stopped.is_set():
+                self._safe_refill()
+                self._stopped.wait(self.refill_interval)
+        threading.Thread(target=loop, name="warm-pool", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+
+
 def cleanup():
     """Cleanup handler triggered when the launcher exits."""
     terminate_ec2(INSTANCE_ID)
@@ -89,14 +290,30 @@ def cleanup():
 # 🏁 Entry Point
 # ------------------------------------------------------------
 if __name__ == "__main__":
-    if len(sys.argv) < 3:
-        print("Usage: python launch_ec2.py <service_name> <config_filename>")
+    parser = argparse.ArgumentParser(description="Run a simulated service on EC2.")
+    parser.add_argument("service_name", nargs="?")
+    parser.add_argument("config_filename", nargs="?")
+    parser.add_argument("--warm", action="store_true", help="take a pre-provisioned instance from the warm pool")
+    parser.add_argument("--pool-size", type=int, default=WARM_POOL_SIZE)
+    parser.add_argument("--fill-pool", action="store_true", help="only top up the warm pool, then exit")
+    args = parser.parse_args()
+
+    if args.fill_pool:
+        WarmPool(size=args.pool_size).refill()
+        sys.exit(0)
+    if not args.service_name or not args.config_filename:
+        print("Usage: python launch_ec2.py <service_name> <config_filename> [--warm] [--pool-size N]")
+        print("       python launch_ec2.py --fill-pool [--pool-size N]")
         sys.exit(1)
 
-    service_name = sys.argv[1]
-    config_filename = sys.argv[2]
+    service_name = args.service_name
+    config_filename = args.config_filename
 
-    ip = launch_ec2_instance(service_name, config_filename)
+    if args.warm:
+        pool = WarmPool(size=args.pool_size).start()
+        INSTANCE_ID, ip = pool.acquire(service_name, config_filename)
+    else:
+        ip = launch_ec2_instance(service_name, config_filename)
     print(f"Service will run remotely on EC2 at {ip}")
 
     atexit.register(cleanup)
@@ -39,12 +39,13 @@ import os
 # Argument parsing
 # -------------------------------------------------------------------
 if len(sys.argv) < 3:
-    print("Usage: python service.py <service_name> <mode_toml_file>")
+    print("Usage: python service.py <service_name> <mode_toml_file> [port]")
     sys.exit(1)
 
 SERVICE_NAME = sys.argv[1]
 # MODE_FILE = sys.argv[2]  # e.g., healthy.toml, slow.toml, crash.toml
 MODE_FILE = os.path.join(os.path.dirname(__file__), "scenarios", f"{sys.argv[2]}_config.toml")
+PORT = int(sys.argv[3]) if len(sys.argv) > 3 else 3000
 
 
 # -------------------------------------------------------------------
@@ -84,6 +85,6 @@ def health():
 # Entry point
 # -------------------------------------------------------------------
 if __name__ == "__main__":
-    print(f"🚀 Starting {SERVICE_NAME} service using config '{MODE_FILE}'")
+    print(f"🚀 Starting {SERVICE_NAME} service using config '{MODE_FILE}' on port {PORT}")
     print(f"    → status: {STATUS}, delay: {DELAY}, crash: {CRASH}")
-    app.run(host="0.0.0.0", port=3000, debug=False)
+    app.run(host="0.0.0.0", port=PORT, debug=False)
@@ -0,0 +1,256 @@
+# backend/simulated_servers/virtual_fleet.py
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import threading
+import time
+
+import tomli
+from aiohttp import web
+
+SCENARIO_DIR = os.path.join(os.path.dirname(__file__), "scenarios")
+
+
+# ------------------------------------------------------------
+# Scenario timelines
+# ------------------------------------------------------------
+def _ramp(value, progress):
+    """A number, or a [from, to] pair interpolated over the phase."""
+    if isinstance(value, list):
+        start, end = value
+        return start + (end - start) * progress
+    return value
+
+
+def sample_latency(spec, rng):
+    """Draw one latency (ms) from a [latency] table."""
+    kind = spec.get("distribution", "constant")
+    if kind == "constant":
+        return spec.get("ms", 0)
+    if kind == "uniform":
+        return rng.uniform(spec["min"], spec["max"])
+    if kind == "normal":
+        return max(0.0, rng.gauss(spec["mean"], spec.get("stddev", 0)))
+    if kind == "lognormal":
+        return rng.lognormvariate(math.log(spec["median"]), spec.get("sigma", 0.5))
+    raise ValueError(f"Unknown latency distribution '{kind}'")
+
+
+class Timeline:
+    """A service's scripted behaviour over time, from a *_timeline.toml file.
+
+    [latency] is the baseline distribution. Each [[phase]] runs for
+    `duration` seconds (the last one may omit it and last forever) and can
+    set `error_rate`, `latency_scale` ([from, to] pairs ramp linearly over
+    the phase), `error_status`, `down = true` (connections are dropped, as
+    for a crashed process) and `burst = {every, length, error_rate}`. With
+    `repeat = true` the phases loop.
+    """
+
+    def __init__(self, config, name="scenario"):
+        self.name = config.get("name", name)
+        self.latency = config.get("latency", {"distribution": "constant", "ms": 0})
+        self.repeat = config.get("repeat", False)
+        self.phases = config.get("phase") or [{}]
+        for phase in self.phases[:-1]:
+            if "duration" not in phase:
+                raise ValueError(f"{self.name}: only the last phase may omit 'duration'")
+        self.length = sum(p.get("duration", 0) for p in self.phases)
+
+    @classmethod
+    def load(cls, name):
+        """scenarios/<name>_timeline.toml, or a legacy <name>_config.toml [behavior] table."""
+        path = os.path.join(SCENARIO_DIR, f"{name}_timeline.toml")
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                return cls(tomli.load(f), name)
+        with open(os.path.join(SCENARIO_DIR, f"{name}_config.toml"), "rb") as f:
+            return cls.from_behavior(tomli.load(f).get("behavior", {}), name)
+
+    @classmethod
+    def from_behavior(cls, behavior, name="legacy"):
+        """The static status/delay/crash table service.py reads, as a one-phase timeline."""
+        return cls({
+            "name": name,
+            # service.py sleeps `delay` seconds, but the shipped TOMLs
+            # (100, 200) only make sense as milliseconds.
+            "latency": {"distribution": "constant", "ms": behavior.get("delay", 0)},
+            "phase": [{
+                "error_rate": 1.0 if behavior.get("status") == "error" else 0.0,
+                "down": bool(behavior.get("crash")),
+            }],
+        }, name)
+
+    def phase_at(self, elapsed):
+        """(phase, seconds into it, progress 0..1) at `elapsed` seconds."""
+        if self.repeat and self.length > 0:
+            elapsed %= self.length
+        for phase in self.phases:
+            duration = phase.get("duration")
+            if duration is None or elapsed < duration:
+                progress = elapsed / duration if duration else 0.0
+                return phase, elapsed, progress
+            elapsed -= duration
+        last = self.phases[-1]
+        return last, last.get("duration", 0), 1.0
+
+    def respond(self, elapsed, rng):
+        """What a probe at `elapsed` gets: ("drop", 0, None) or (action, latency_ms, status)."""
+        phase, into, progress = self.phase_at(elapsed)
+        if phase.get("down"):
+            return "drop", 0, None
+
+        error_rate = _ramp(phase.get("error_rate", 0.0), progress)
+        burst = phase.get("burst")
+        if burst and into % burst["every"] < burst["length"]:
+            error_rate = max(error_rate, burst.get("error_rate", 1.0))
+
+        latency = sample_latency(self.latency, rng) * _ramp(phase.get("latency_scale", 1.0), progress)
+        if rng.random() < error_rate:
+            return "error", latency, phase.get("error_status", 500)
+        return "ok", latency, 200
+
+
+# ------------------------------------------------------------
+# Fleet
+# ------------------------------------------------------------
+def load_fleet(path):
+    """Expand a *_fleet.toml into ({service: (Timeline, offset_s)}, [fleet] settings)."""
+    with open(path, "rb") as f:
+        config = tomli.load(f)
+    fleet = config.get("fleet", {})
+    rng = random.Random(fleet.get("seed", 0))
+    timelines = {}
+    services = {}
+    for group in config.get("group", []):
+        scenario = group["scenario"]
+        if scenario not in timelines:
+            timelines[scenario] = Timeline.load(scenario)
+        prefix = group.get("prefix", scenario)
+        # Stagger start points so the whole group doesn't fail in lockstep.
+        stagger = group.get("stagger", fleet.get("stagger", 0))
+        for i in range(group["count"]):
+            services[f"{prefix}-{i:04d}"] = (timelines[scenario], rng.uniform(0, stagger))
+    return services, fleet
+
+
+class VirtualFleet:
+    """Hundreds of virtual services in one asyncio process.
+
+    Each service answers GET /<name>/health following its Timeline, with
+    time measured from start() plus its offset. Services are spread over
+    listeners `services_per_port` at a time (1 gives every service its own
+    port), so per-host connection limits in the monitor behave as they
+    would against separate hosts.
+    """
+
+    def __init__(self, services, host="127.0.0.1", base_port=19000, services_per_port=50, seed=0):
+        # services: {name: (Timeline, offset_seconds)}
+        self.services = services
+        self.host = host
+        self.ports = {name: base_port + i // services_per_port for i, name in enumerate(sorted(services))}
+        self.rng = random.Random(seed)
+        self.started_at = None
+        self.stats = {"requests": 0, "errors": 0, "drops": 0}
+        self._loop = None
+        self._runners = []
+        self._thread = None
+        self._ready = threading.Event()
+
+    def targets(self):
+        return {name: f"http://{self.host}:{port}/{name}/health" for name, port in self.ports.items()}
+
+    async def _health(self, request):
+        name = request.match_info["name"]
+        service = self.services.get(name)
+        if service is None:
+            raise web.HTTPNotFound()
+        timeline, offset = service
+
+        self.stats["requests"] += 1
+        action, latency_ms, status = timeline.respond(time.monotonic() - self.started_at + offset, self.rng)
+        if action == "drop":
+            self.stats["drops"] += 1
+            request.transport.close()
+            raise web.HTTPServiceUnavailable()
+
+        if latency_ms > 0:
+            await asyncio.sleep(latency_ms / 1000)
+        if action == "error":
+            self.stats["errors"] += 1
+        return web.json_response({"status": action, "service": name, "scenario": timeline.name}, status=status)
+
+    async def serve(self):
+        app = web.Application()
+        app.router.add_get("/{name}/health", self._health)
+        for port in sorted(set(self.ports.values())):
+            runner = web.AppRunner(app, access_log=None)
+            await runner.setup()
+            await web.TCPSite(runner, self.host, port).start()
+            self._runners.append(runner)
+        self.started_at = time.monotonic()
+
+    async def shutdown(self):
+        for runner in self._runners:
+            await runner.cleanup()
+        self._runners = []
+
+    # Thread mode, for embedding in benchmarks.
+    def start(self):
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self.serve())
+            self._ready.set()
+            self._loop.run_forever()
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self.shutdown(), self._loop).result(timeout=10)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+# ------------------------------------------------------------
+# 🏁 Entry Point
+# ------------------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a fleet of virtual services from a *_fleet.toml.")
+    parser.add_argument("fleet", help="fleet name (scenarios/<name>_fleet.toml) or path")
+    parser.add_argument("--targets", help="write {service: health_url} here for monitor.py (AUTOOPS_TARGETS_FILE)")
+    parser.add_argument("--base-port", type=int)
+    parser.add_argument("--services-per-port", type=int)
+    args = parser.parse_args()
+
+    path = args.fleet if os.path.exists(args.fleet) else os.path.join(SCENARIO_DIR, f"{args.fleet}_fleet.toml")
+    services, settings = load_fleet(path)
+    fleet = VirtualFleet(
+        services,
+        base_port=args.base_port or settings.get("base_port", 19000),
+        services_per_port=args.services_per_port or settings.get("services_per_port", 50),
+        seed=settings.get("seed", 0),
+    )
+
+    async def main():
+        await fleet.serve()
+        if args.targets:
+            tmp = args.targets + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(fleet.targets(), f, indent=2)
+            os.replace(tmp, args.targets)
+        print(f"🚀 Serving {len(services)} virtual services on {len(set(fleet.ports.values()))} port(s)")
+        try:
+            while True:
+                await asyncio.sleep(30)
+                print(f"    {fleet.stats['requests']} requests, {fleet.stats['errors']} errors, {fleet.stats['drops']} dropped")
+        finally:
+            await fleet.shutdown()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("Virtual fleet stopped.")
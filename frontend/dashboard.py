@@ -79,40 +79,56 @@
 
 import streamlit as st
 import pandas as pd
-import json
 import os
 from streamlit_autorefresh import st_autorefresh
 
+from summary_client import SummaryClient
+
 st.set_page_config(page_title="AutoOps Dashboard", layout="wide")
 st.title("🤖 AutoOps: AI-Powered Self-Healing System")
 
-DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
-LOG_FILE = os.path.join(DATA_DIR, 'logs.json')
-ACTION_LOG_FILE = os.path.join(DATA_DIR, 'agent_actions.json')
+# backend/agent/summary_service.py reads the data files once per update for
+# every viewer; this page only renders what it serves.
+SUMMARY_URL = os.environ.get('AUTOOPS_SUMMARY_URL', 'http://127.0.0.1:8600/summary')
 
-# Auto-refresh every 2 seconds
+# Auto-refresh every 15 seconds
 st_autorefresh(interval=15000, key="data_refresh")
 
-def load_data(file_path):
-    if os.path.exists(file_path) and os.path.getsize(file_path) > 0:
-        try:
-            return pd.read_json(file_path, lines=True)
-        except Exception:
-            pass
-    return pd.DataFrame()
-
-logs_df = load_data(LOG_FILE).tail(200)
-actions_df = load_data(ACTION_LOG_FILE).tail(10)
+@st.cache_resource
+def get_client():
+    """One client for all sessions; unchanged summaries come back as 304s."""
+    return SummaryClient(SUMMARY_URL)
+
+def uptime_columns(summary):
+    """Display names for the summary's per-service uptime and latency fields."""
+    return {
+        "uptime_pct": "uptime (%)",
+        "uptime_long_pct": f"uptime {summary.get('long_uptime_days')}d (%)",
+        "p95_latency_ms": "p95 latency (ms)",
+        "p50_ms": "p50 (ms)",
+        "p99_ms": "p99 (ms)",
+        "baseline_ms": "baseline (ms)",
+        "latency_z": "latency z",
+        "avg_latency_ms": "avg latency (ms)",
+        "max_latency_ms": "max latency (ms)",
+    }
+
+summary, error = get_client().get()
+if summary is None:
+    st.error(f"Summary service unavailable at {SUMMARY_URL} ({error}). "
+             "Start it with `python backend/agent/summary_service.py`.")
+    st.stop()
+if error:
+    st.warning(f"Showing the last summary received; refresh failed: {error}")
+
+latest_logs = pd.DataFrame(summary["latest"])
+uptime_df = pd.DataFrame(summary["uptime"]).rename(columns=uptime_columns(summary))
+actions_df = pd.DataFrame(summary["actions"])
 
 col_summary, col_actions = st.columns(2)
 with col_summary:
     st.header("📊 Live System Health")
-    if not logs_df.empty:
-        latest_logs = logs_df.drop_duplicates(subset='service', keep='last')
-        uptime_df = logs_df.groupby('service')['status_code'].apply(
-            lambda x: (x == 200).sum() / len(x) * 100 if len(x) > 0 else 0
-        ).reset_index(name='uptime (%)')
-
+    if not latest_logs.empty:
         st.dataframe(latest_logs[['timestamp', 'service', 'status_code', 'latency_ms']], use_container_width=True)
         st.dataframe(uptime_df, use_container_width=True)
     else:
@@ -121,13 +137,14 @@ with col_summary:
 with col_actions:
     st.header("🧠 AI Agent Actions")
     if not actions_df.empty:
-        st.dataframe(actions_df[['timestamp', 'action', 'service_name', 'reason']].tail(5), use_container_width=True)
+        st.dataframe(actions_df.reindex(columns=['timestamp', 'action', 'service_name', 'reason']).tail(5),
+                     use_container_width=True)
     else:
         st.info("No AI actions have been recorded yet.")
 
 st.header("📜 Raw Logs")
-if not logs_df.empty:
-    log_lines = logs_df.to_json(orient='records', lines=True).split('\n')
+if summary["recent_probes"]:
+    log_lines = pd.DataFrame(summary["recent_probes"]).to_json(orient='records', lines=True).split('\n')
     st.text_area("Latest Logs", "\n".join(log_lines[-20:]), height=300, key="log_area")
 else:
     st.warning("Log file is empty.")
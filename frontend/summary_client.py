@@ -0,0 +1,49 @@
+# frontend/summary_client.py
+import threading
+import time
+
+import requests
+
+
+class SummaryClient:
+    """Fetches backend/agent/summary_service.py's /summary with ETag revalidation.
+
+    One instance is shared by every Streamlit session (st.cache_resource).
+    Calls within `min_interval` of the last fetch reuse it without touching
+    the network, and later ones send If-None-Match, so an unchanged summary
+    costs a 304 with no body. get() returns (summary, error): the last good
+    summary (or None) and the error of the latest attempt, if any.
+    """
+
+    def __init__(self, url, timeout=3.0, min_interval=1.0):
+        self.url = url
+        self.timeout = timeout
+        self.min_interval = min_interval
+        self._session = requests.Session()
+        self._lock = threading.Lock()
+        self._etag = None
+        self._summary = None
+        self._error = None
+        self._fetched_at = 0.0
+        self.stats = {"fetches": 0, "not_modified": 0, "errors": 0}
+
+    def get(self):
+        with self._lock:
+            if time.monotonic() - self._fetched_at < self.min_interval:
+                return self._summary, self._error
+            self._fetched_at = time.monotonic()
+            headers = {"If-None-Match": self._etag} if self._etag else {}
+            try:
+                response = self._session.get(self.url, headers=headers, timeout=self.timeout)
+                self.stats["fetches"] += 1
+                if response.status_code == 304:
+                    self.stats["not_modified"] += 1
+                else:
+                    response.raise_for_status()
+                    self._summary = response.json()
+                    self._etag = response.headers.get("ETag")
+                self._error = None
+            except (requests.exceptions.RequestException, ValueError) as e:
+                self.stats["errors"] += 1
+                self._error = str(e)
+            return self._summary, self._error